@@ -0,0 +1,936 @@
+"""Benchmarks de Snipper, sur des snapshots générés (sample_payloads) et le stub tldb local (stub_server).
+
+    python run_benchmarks.py                    # Tous les benchmarks
+    python run_benchmarks.py decoder depth      # Une sélection
+    python run_benchmarks.py --list
+
+Avec --prices (réponse /api/ah/prices), --data (__data.json) ou --log (journal SnapshotLog), decoder,
+prices_parser, parallel_decode, multi_server_scan, devalue et replay mesurent des données enregistrées au
+lieu de données générées.
+"""
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from collections import deque
+
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Snipper"))
+from async_poller import AsyncPoller
+from buyout_planner import BuyoutPlanner
+from compress_json import decompress as reference_decompress
+from compressed_json import columns_from_data, decompress, decompress_columns
+from data_processor import DataProcessor, append_row, evaluate_listings, evaluate_units, new_columns
+from devalue import unflatten
+from hedging import HedgingPolicy, latency_summary
+from item_index import ItemIndex
+from multi_server_scan import MultiServerScanner, ScanSettings
+from parallel_decode import decompress_servers
+from pipeline import FetchProcessPipeline
+from prices_client import HEADERS, PricesClient
+from prices_parser import extract_server_payloads
+from replay import ReplayClient, ReplayFinished
+from sample_payloads import (load_catalog, generate_data_json, generate_prices_history, generate_prices_response,
+                             generate_server_data, mutate_server_data)
+from snapshot_daemon import SnapshotClient, SnapshotDaemon
+from snapshot_delta import SnapshotDiffer, apply_events, counter_groups
+from snapshot_log import SnapshotLog
+from stub_server import StubTldbServer, mutate_prices_body
+from tldb_urls import data_url, icon_url, prices_url
+
+REGION = tuple(str(30001 + number) for number in range(10))  # Une région complète
+BENCHMARKS = {}
+
+
+def benchmark(function):
+    """Enregistre function(catalog, args) sous son nom, sans le préfixe bench_."""
+    BENCHMARKS[function.__name__[len("bench_"):]] = function
+    return function
+
+
+def best_of(function, repeat=10):
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+def repeated(function, runs=10):
+    """(durées de chaque appel, résultat du dernier)."""
+    durations, result = [], None
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start_time)
+    return durations, result
+
+
+def peak_memory(function):
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def available_engines():
+    engines = ["python"]
+    try:
+        import numpy  # noqa: F401
+        engines.append("numpy")
+    except ImportError:
+        print("numpy absent : moteur numpy ignoré")
+    return engines
+
+
+def load_prices_body(args, servers):
+    """Réponse /api/ah/prices enregistrée (--prices), sinon une réponse générée pour servers."""
+    if args.prices:
+        with open(args.prices, 'rb') as infile:
+            return infile.read()
+    return json.dumps(generate_prices_response(load_catalog(), servers), separators=(",", ":")).encode()
+
+
+# Résolution des noms (ItemIndex)
+
+class LinearScanIndex(ItemIndex):
+    """Reproduit l'ancienne résolution : parcours de data_name['items'] à chaque appel."""
+
+    def name(self, item_id):
+        temp_name = item_id
+        for info in self.data_name['items']:
+            if info['num'] == int(item_id):
+                temp_name = info['name']
+        return temp_name
+
+
+class PerResultIndex(LinearScanIndex):
+    """Ancien coût réel : une résolution par (item, trait, profondeur) et non par groupe."""
+
+    def __init__(self, data_name, depth):
+        super().__init__(data_name)
+        self.depth = depth
+
+    def name(self, item_id):
+        for _ in range(self.depth):
+            temp_name = super().name(item_id)
+        return temp_name
+
+
+@benchmark
+def bench_item_index(catalog, args):
+    data = generate_server_data(catalog)
+    processor = DataProcessor()
+    print(f"Catalogue : {len(catalog['items'])} items")
+
+    for depth in (1, 5):
+        before = best_of(lambda: processor.process_data(data, PerResultIndex(catalog, depth + 1), 20, 3000, depth, 10),
+                         repeat=3)
+        index = ItemIndex(catalog)
+        after = best_of(lambda: processor.process_data(data, index, 20, 3000, depth, 10), repeat=3)
+        print(f"Profondeur {depth} : avant {before * 1000:.1f} ms, après {after * 1000:.1f} ms "
+              f"(x{before / after:.1f})")
+
+
+# Moteurs d'analyse
+
+@benchmark
+def bench_engines(catalog, args):
+    index = ItemIndex(catalog)
+    for max_sales in (40, 200):
+        data = generate_server_data(catalog, max_sales=max_sales)
+        nb_sales = sum(len(item['sales']) for item in data.values())
+        print(f"Snapshot : {len(data)} items, {nb_sales} ventes")
+        for depth in (1, 10):
+            python_time, numpy_time = (
+                best_of(lambda: DataProcessor(engine=engine).process_data(data, index, 20, 3000, depth, 10), repeat=5)
+                for engine in ("python", "numpy"))
+            print(f"  Profondeur {depth} : python {python_time * 1000:.1f} ms, numpy {numpy_time * 1000:.1f} ms "
+                  f"(x{python_time / numpy_time:.1f})")
+
+
+@benchmark
+def bench_incremental(catalog, args):
+    index = ItemIndex(catalog)
+    depth = 10
+
+    def time_cycles(processor, snapshots):
+        start_time = time.perf_counter()
+        for snapshot in snapshots:
+            processor.process_data(snapshot, index, 20, 3000, depth, 10)
+        return (time.perf_counter() - start_time) / len(snapshots)
+
+    for rate in (0.01, 0.05, 0.25):
+        snapshots = [generate_server_data(catalog)]
+        for step in range(10):
+            snapshots.append(mutate_server_data(snapshots[-1], rate=rate, seed=step))
+
+        incremental = DataProcessor(incremental=True)
+        incremental.process_data(snapshots[0], index, 20, 3000, depth, 10)  # Remplit le cache
+        incremental_time = time_cycles(incremental, snapshots[1:])
+        full_time = time_cycles(DataProcessor(), snapshots[1:])
+        numpy_time = time_cycles(DataProcessor(engine="numpy"), snapshots[1:])
+        print(f"{rate:.0%} des items modifiés par cycle : complet {full_time * 1000:.1f} ms, "
+              f"numpy {numpy_time * 1000:.1f} ms, incrémental {incremental_time * 1000:.1f} ms "
+              f"({incremental.groups_recomputed} recalculés / {incremental.groups_reused} réutilisés)")
+
+
+# Téléchargements (stub tldb)
+
+FETCH_PROFILES = (  # (nom, latence en s, bande passante en octets/s, taux d'erreur) ; les prix changent chaque seconde
+    ("local", 0.0, None, 0.0),
+    ("WAN 80 ms, 4 Mo/s, 2 % d'erreurs", 0.08, 4e6, 0.02),
+)
+FETCH_REQUESTS = 20
+
+
+def timed_request(function):
+    """(durée, exception requests ou None)."""
+    start_time = time.perf_counter()
+    try:
+        function()
+        return time.perf_counter() - start_time, None
+    except requests.RequestException as e:
+        return time.perf_counter() - start_time, e
+
+
+def report_requests(label, results):
+    durations = [duration for duration, error in results]
+    errors = sum(error is not None for _, error in results)
+    print(f"    {label}: {len(results) / sum(durations):.1f} requêtes/s | {latency_summary(durations)} | "
+          f"échecs: {errors}")
+
+
+@benchmark
+def bench_fetchers(catalog, args):
+    prices_body = json.dumps(generate_prices_response(catalog)).encode()
+    data_body = json.dumps(generate_data_json(catalog)).encode()
+    print(f"Corps : prix {len(prices_body) / 1e6:.1f} Mo, __data.json {len(data_body) / 1e6:.1f} Mo")
+
+    history = [prices_body]
+    for number in range(1, 3):
+        history.append(mutate_prices_body(history[-1], 0.02, seed=number))
+    icons = [f"icons/item_{info['num']}" for info in catalog['items'][:100]]
+    for name, latency, bandwidth, error_rate in FETCH_PROFILES:
+        with StubTldbServer(data_body=data_body, delay=latency, bandwidth=bandwidth, error_rate=error_rate) as stub:
+            stub.set_prices_history(history, interval=1.0)
+            print(f"Profil {name} :")
+
+            # Snipper : PricesClient (keep-alive, ETag, seule la chaîne du serveur est décodée)
+            client = PricesClient(url=prices_url(stub.base_url), columnar=True)
+            report_requests("PricesClient (Snipper)",
+                            [timed_request(lambda: client.fetch_server("30001")) for _ in range(FETCH_REQUESTS)])
+            client.close()
+
+            # decode.py / fetch_data.py : requests.get sans session, corps entier lu et parsé
+            report_requests("requests.get des prix (scripts JsonFileTest)",
+                            [timed_request(lambda: requests.get(prices_url(stub.base_url), headers=HEADERS)
+                                           .raise_for_status()) for _ in range(FETCH_REQUESTS)])
+            report_requests("__data.json", [timed_request(lambda: requests.get(data_url(stub.base_url),
+                                                                               headers=HEADERS).json())
+                                            for _ in range(5)])
+
+            # images_fetcher.py : une icône après l'autre, avec une session keep-alive
+            with requests.Session() as session:
+                report_requests("Icônes (images_fetcher)",
+                                [timed_request(lambda icon=icon: session.get(icon_url(icon, stub.base_url))
+                                               .raise_for_status()) for icon in icons])
+            print(f"    {stub.summary()}")
+
+
+# Décodage
+
+@benchmark
+def bench_prices_parser(catalog, args):
+    body = load_prices_body(args, [str(30001 + i) for i in range(12)])
+    all_servers = list(json.loads(body)["list"])
+    print(f"Réponse : {len(body) / 1e6:.1f} Mo, {len(all_servers)} serveurs")
+
+    def full_parse(servers):
+        list_data = json.loads(body)["list"]
+        return {server: list_data[server] for server in servers}
+
+    for servers in (all_servers[:1], all_servers[-1:], all_servers[:3]):
+        measures = [(best_of(lambda: parse(servers), repeat=20), peak_memory(lambda: parse(servers)))
+                    for parse in (full_parse, lambda servers: extract_server_payloads(body, servers))]
+        (full_time, full_peak), (partial_time, partial_peak) = measures
+        print(f"{', '.join(servers)} : complet {full_time * 1000:.2f} ms / {full_peak / 1e6:.1f} Mo, "
+              f"partiel {partial_time * 1000:.2f} ms / {partial_peak / 1e6:.1f} Mo")
+
+
+@benchmark
+def bench_decoder(catalog, args):
+    list_data = json.loads(load_prices_body(args, ("30001", "30002", "30003")))["list"]
+    total_reference = total_decoder = 0
+    for server, payload in list_data.items():
+        compressed = json.loads(payload)
+        if decompress(compressed) != reference_decompress(compressed):
+            raise AssertionError(f"Décodage différent pour le serveur {server}")
+
+        reference_time = best_of(lambda: reference_decompress(compressed))
+        decoder_time = best_of(lambda: decompress(compressed))
+        total_reference += reference_time
+        total_decoder += decoder_time
+        print(f"Serveur {server} ({len(compressed[0])} valeurs) : compress_json {reference_time * 1000:.2f} ms, "
+              f"compressed_json {decoder_time * 1000:.2f} ms (x{reference_time / decoder_time:.1f})")
+
+    print(f"Total : compress_json {total_reference * 1000:.2f} ms, compressed_json {total_decoder * 1000:.2f} ms")
+
+
+@benchmark
+def bench_columnar(catalog, args):
+    index = ItemIndex(catalog)
+    compressed = json.loads(generate_prices_response(catalog, servers=("30001",))["list"]["30001"])
+
+    for engine in available_engines():
+        for label, decode in (("dicts", decompress), ("colonnes", decompress_columns)):
+            def decode_and_scan():
+                return DataProcessor(engine=engine).process_data(decode(compressed), index, 20, 3000, 5, 10)
+
+            elapsed = best_of(decode_and_scan, repeat=5)
+            print(f"Moteur {engine}, {label} : décompression + analyse {elapsed * 1000:.1f} ms, "
+                  f"pic mémoire {peak_memory(decode_and_scan) / 1e6:.1f} Mo")
+
+
+@benchmark
+def bench_parallel_decode(catalog, args):
+    list_data = json.loads(load_prices_body(args, REGION[:8]))["list"]
+    print(f"{len(list_data)} serveurs, {os.cpu_count()} CPU")
+
+    serial_time = best_of(lambda: decompress_servers(list_data, workers=1), repeat=3)
+    print(f"Série : {serial_time:.3f} s")
+    for workers in sorted({2, args.workers}):
+        parallel_time = best_of(lambda: decompress_servers(list_data, workers=workers), repeat=3)
+        print(f"{workers} processus : {parallel_time:.3f} s (x{serial_time / parallel_time:.2f}, "
+              f"création du pool comprise)")
+    _, errors = decompress_servers(list_data, workers=args.workers)
+    if errors:
+        print(f"Serveurs mal formés : {', '.join(errors)}")
+
+
+@benchmark
+def bench_devalue(catalog, args):
+    if args.data:
+        with open(args.data, 'rb') as infile:
+            document = json.loads(infile.read())
+    else:
+        document = generate_data_json(catalog)
+    values = next(node for node in document["nodes"] if node and node.get("type") == "data")["data"]
+    elapsed = best_of(lambda: unflatten(values))
+    print(f"__data.json : {len(values)} valeurs, unflatten {elapsed * 1000:.2f} ms "
+          f"({elapsed / len(values) * 1e9:.0f} ns par valeur)")
+
+    # Temps linéaire et pas de limite de récursion : chaîne de listes imbriquées
+    for depth in (10_000, 100_000, 1_000_000):
+        chain = [[i + 1] for i in range(depth)] + [[]]
+        elapsed = best_of(lambda: unflatten(chain), repeat=3)
+        print(f"Imbrication {depth} : {elapsed * 1000:.1f} ms ({elapsed / depth * 1e9:.0f} ns par niveau)")
+
+
+# Polling et pipeline
+
+POLLER_SERVERS = ["30001", "30002", "30003", "30004"]
+POLLER_CYCLES = 10
+
+
+def poller_scenarios(catalog):
+    """Scénarios : pour chaque cycle, corps de la réponse et nombre de serveurs modifiés depuis le précédent."""
+    base = generate_prices_response(catalog, POLLER_SERVERS, seed=0)["list"]
+    other = generate_prices_response(catalog, POLLER_SERVERS, seed=100)["list"]
+
+    def body(list_data):
+        return json.dumps({"list": list_data, "total": 0, "regions": {}}, separators=(",", ":")).encode()
+
+    # Tous les serveurs changent à chaque cycle
+    all_changed = [(body(base if cycle % 2 == 0 else other), len(POLLER_SERVERS)) for cycle in range(POLLER_CYCLES)]
+
+    # Un seul serveur change par cycle
+    current = dict(base)
+    one_changed = [(body(current), len(POLLER_SERVERS))]
+    for cycle in range(1, POLLER_CYCLES):
+        server = POLLER_SERVERS[cycle % len(POLLER_SERVERS)]
+        current[server] = other[server] if current[server] == base[server] else base[server]
+        one_changed.append((body(current), 1))
+    return {"tous les serveurs changent": all_changed, "un serveur change par cycle": one_changed}
+
+
+def blocking_per_server(stub, scenario):
+    """Ancien fonctionnement de Snipper : une requête bloquante par serveur et par cycle, nouvelle connexion."""
+    start_time = time.perf_counter()
+    for body, _ in scenario:
+        stub.set_prices(body)
+        for server in POLLER_SERVERS:
+            response = requests.get(stub.base_url + "/api/ah/prices", timeout=10)
+            decompress(json.loads(response.json()["list"][server]))
+    return time.perf_counter() - start_time
+
+
+async def async_poller(stub, scenario):
+    poller = AsyncPoller(POLLER_SERVERS, base_url=stub.base_url, prices_interval=0, data_interval=None)
+    queue = poller.subscribe()
+    start_time = time.perf_counter()
+    task = asyncio.create_task(poller.run())
+    for body, changed in scenario:
+        stub.set_prices(body)
+        for _ in range(changed):
+            await queue.get()
+    elapsed = time.perf_counter() - start_time
+    poller.stop()
+    await task
+    return elapsed, poller.stats
+
+
+@benchmark
+def bench_async_poller(catalog, args):
+    print(f"{len(POLLER_SERVERS)} serveurs, {POLLER_CYCLES} cycles")
+    for name, scenario in poller_scenarios(catalog).items():
+        print(f"{name} :")
+        with StubTldbServer() as stub:
+            elapsed = blocking_per_server(stub, scenario)
+            print(f"  requests bloquant par serveur : {elapsed:.2f} s, {stub.requests} requêtes, "
+                  f"{stub.connections} connexions")
+
+        with StubTldbServer() as stub:
+            elapsed, stats = asyncio.run(async_poller(stub, scenario))
+            print(f"  AsyncPoller : {elapsed:.2f} s, {stub.requests} requêtes ({stats.not_modified} en 304), "
+                  f"{stub.connections} connexions, {stats.published} snapshots publiés")
+
+
+PIPELINE_CYCLES = 10
+NETWORK_DELAY = 0.15  # Latence simulée par le stub : sans elle, fetch et traitement se disputent le même CPU
+
+
+class AlternatingStub(StubTldbServer):
+    """Stub dont la réponse change à chaque requête : chaque fetch apporte un nouveau snapshot."""
+
+    def __init__(self, bodies):
+        super().__init__(bodies[0], use_etag=False, delay=NETWORK_DELAY)
+        self.bodies = bodies
+        self.lock = threading.Lock()
+        self.next_body = 0
+
+    def fetch_with_rotation(self, client):
+        with self.lock:
+            self.next_body += 1
+            self.set_prices(self.bodies[self.next_body % len(self.bodies)])
+        return client.fetch_server("30001")
+
+
+def serial_cycles(stub, index):
+    """Ancien cycle de Snipper : fetch, puis traitement, puis fetch suivant."""
+    client, processor = PricesClient(url=stub.base_url + "/api/ah/prices"), DataProcessor()
+    fetch_time = process_time = 0.0
+    start_time = time.perf_counter()
+    for _ in range(PIPELINE_CYCLES):
+        fetch_start = time.perf_counter()
+        data = stub.fetch_with_rotation(client)
+        process_start = time.perf_counter()
+        processor.process_data(data, index, 20, 3000, 5, 10)
+        fetch_time += process_start - fetch_start
+        process_time += time.perf_counter() - process_start
+    return (time.perf_counter() - start_time) / PIPELINE_CYCLES, fetch_time / PIPELINE_CYCLES, \
+        process_time / PIPELINE_CYCLES
+
+
+def pipelined_cycles(stub, index):
+    client, processor = PricesClient(url=stub.base_url + "/api/ah/prices"), DataProcessor()
+    done = threading.Event()
+    results = []
+
+    def on_result(result, timings):
+        results.append(result)
+        if len(results) == PIPELINE_CYCLES:
+            done.set()
+
+    pipeline = FetchProcessPipeline(lambda: stub.fetch_with_rotation(client),
+                                    lambda data: processor.process_data(data, index, 20, 3000, 5, 10), on_result)
+    start_time = time.perf_counter()
+    pipeline.start()
+    done.wait()
+    elapsed = time.perf_counter() - start_time
+    pipeline.stop()
+    timings = pipeline.timings
+    return elapsed / PIPELINE_CYCLES, timings.fetch, timings.process, timings.dropped
+
+
+@benchmark
+def bench_pipeline(catalog, args):
+    index = ItemIndex(catalog)
+    bodies = [json.dumps(generate_prices_response(catalog, ("30001",), seed=seed), separators=(",", ":")).encode()
+              for seed in range(3)]
+
+    with AlternatingStub(bodies) as stub:
+        cycle, fetch, process = serial_cycles(stub, index)
+        print(f"Série : cycle {cycle * 1000:.0f} ms (fetch {fetch * 1000:.0f} ms + "
+              f"traitement {process * 1000:.0f} ms)")
+
+    with AlternatingStub(bodies) as stub:
+        cycle, fetch, process, dropped = pipelined_cycles(stub, index)
+        print(f"Pipeline : cycle {cycle * 1000:.0f} ms (fetch {fetch * 1000:.0f} ms, "
+              f"traitement {process * 1000:.0f} ms, {dropped} snapshots abandonnés)")
+
+
+HEDGING_REQUESTS = 200
+SLOW_RATE = 0.05  # Proportion de réponses lentes (serveur ou réseau bloqué)
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def histogram(latencies):
+    counts, lower = [], 0.0
+    for upper in LATENCY_BUCKETS:
+        counts.append(f"{lower * 1000:.0f}-{upper * 1000:.0f} ms: {sum(lower <= l < upper for l in latencies)}")
+        lower = upper
+    counts.append(f">{lower * 1000:.0f} ms: {sum(l >= lower for l in latencies)}")
+    return " | ".join(counts)
+
+
+@benchmark
+def bench_hedging(catalog, args):
+    body = json.dumps(generate_prices_response(catalog, ("30001",), seed=0), separators=(",", ":")).encode()
+
+    for name, hedging in (("Sans couverture", None), ("Avec couverture", HedgingPolicy())):
+        rng = random.Random(7)
+        with StubTldbServer(body, use_etag=False,
+                            delay=lambda: 1.0 if rng.random() < SLOW_RATE else 0.02 * (1 + rng.random())) as stub:
+            client = PricesClient(url=stub.base_url + "/api/ah/prices", hedging=hedging)
+            latencies = []
+            for _ in range(HEDGING_REQUESTS):
+                client.body_hash = None  # Pas de court-circuit « inchangé » : seule la latence compte
+                start_time = time.perf_counter()
+                client.fetch_body()
+                latencies.append(time.perf_counter() - start_time)
+            client.close()
+        print(f"{name} : {latency_summary(latencies)} | {stub.requests} requêtes envoyées pour {HEDGING_REQUESTS}")
+        print(f"    {histogram(latencies)}")
+        if hedging is not None:
+            print(f"    {hedging.summary()}")
+
+
+# Partage des snapshots entre processus
+
+DAEMON_CLIENTS = 4
+DAEMON_SERVERS = ("30001", "30002", "30003")
+
+
+def direct_clients(stub):
+    """Chaque client fetch et décompresse lui-même (Snipper, impossible.py, scripts lancés en parallèle)."""
+    start_cpu, start_time = time.process_time(), time.perf_counter()
+    for _ in range(DAEMON_CLIENTS):
+        client = PricesClient(url=stub.base_url + "/api/ah/prices")
+        for server in DAEMON_SERVERS:
+            client.body_hash = None  # Même corps pour chaque serveur : on force la relecture
+            client.fetch_server(server)
+        client.close()
+    return time.perf_counter() - start_time, time.process_time() - start_cpu
+
+
+def daemon_clients(stub, address):
+    poller = AsyncPoller(DAEMON_SERVERS, base_url=stub.base_url, prices_interval=1.0, data_interval=None)
+    daemon = SnapshotDaemon(poller, address)
+    started = threading.Event()
+
+    async def serve():
+        task = asyncio.create_task(daemon.serve())
+        while daemon.ready is None or not daemon.ready.is_set():
+            await asyncio.sleep(0.01)
+        started.set()
+        await task
+
+    thread = threading.Thread(target=asyncio.run, args=(serve(),), daemon=True)
+    start_cpu, start_time = time.process_time(), time.perf_counter()
+    thread.start()
+    started.wait()
+    clients = [SnapshotClient(daemon.address) for _ in range(DAEMON_CLIENTS)]
+    for client in clients:
+        for server in DAEMON_SERVERS:
+            client.fetch_server(server, timeout=30)
+    elapsed, cpu = time.perf_counter() - start_time, time.process_time() - start_cpu
+    poller.stop()
+    thread.join()
+    for client in clients:
+        client.close()
+    return elapsed, cpu, daemon.stats
+
+
+@benchmark
+def bench_snapshot_daemon(catalog, args):
+    body = json.dumps(generate_prices_response(catalog, DAEMON_SERVERS, seed=0), separators=(",", ":")).encode()
+
+    with StubTldbServer(body, use_etag=False) as stub:
+        elapsed, cpu = direct_clients(stub)
+        print(f"Sans démon : {elapsed:.3f} s ({cpu:.3f} s CPU), {stub.requests} requêtes pour "
+              f"{DAEMON_CLIENTS} clients")
+
+    with StubTldbServer(body, use_etag=False) as stub, tempfile.TemporaryDirectory() as directory:
+        address = os.path.join(directory, "snapshots.sock") if hasattr(socket, "AF_UNIX") else "127.0.0.1:0"
+        elapsed, cpu, stats = daemon_clients(stub, address)
+        print(f"Avec démon : {elapsed:.3f} s ({cpu:.3f} s CPU), {stub.requests} requête(s) pour {DAEMON_CLIENTS} "
+              f"clients | {stats.summary()}")
+
+
+@benchmark
+def bench_shared_snapshot(catalog, args):
+    from shared_snapshot import SharedSnapshotReader, SharedSnapshotWriter
+
+    index = ItemIndex(catalog)
+    data = generate_server_data(catalog, seed=0)
+    columns = columns_from_data(data)
+
+    # Passage d'un processus à l'autre : pickle (multiprocessing) contre bloc partagé
+    for label, snapshot in (("dicts", data), ("colonnes", columns)):
+        elapsed = best_of(lambda: pickle.loads(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)), repeat=20)
+        print(f"Pickle {label} : {elapsed * 1000:.2f} ms (dumps + loads, {len(columns)} ventes)")
+
+    writer = SharedSnapshotWriter(f"bench{os.getpid()}")
+    reader = SharedSnapshotReader(writer.server)
+    try:
+        print(f"Écriture mémoire partagée : {best_of(lambda: writer.publish(columns), repeat=20) * 1000:.2f} ms")
+        print(f"Lecture mémoire partagée : {best_of(reader.read, repeat=1000) * 1e6:.1f} µs (vues, sans copie)")
+        print(f"Test de génération : {best_of(lambda: reader.generation, repeat=1000) * 1e6:.2f} µs")
+
+        view = reader.read()
+        for engine in ("numpy", "python"):
+            elapsed = best_of(lambda: DataProcessor(engine=engine).analyse(view, index, 10), repeat=5)
+            print(f"Analyse {engine} depuis la vue : {elapsed * 1000:.1f} ms")
+        elapsed = best_of(lambda: DataProcessor(engine="numpy").analyse(columns, index, 10), repeat=5)
+        print(f"Analyse numpy depuis les colonnes en listes : {elapsed * 1000:.1f} ms")
+        del view
+    finally:
+        reader.close()
+        writer.close()
+
+
+# Historique des snapshots
+
+def stored_size(value):
+    return len(zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)))
+
+
+@benchmark
+def bench_snapshot_delta(catalog, args):
+    previous = generate_server_data(catalog, seed=0)
+    full_size = stored_size(previous)
+    print(f"Snapshot complet : {full_size / 1e3:.0f} ko (pickle + zlib)")
+
+    for rate in (0.01, 0.05, 0.2):
+        current = mutate_server_data(previous, rate=rate, seed=1)
+        differ = SnapshotDiffer()
+        differ.diff("30001", previous)
+        start_time = time.perf_counter()
+        events = differ.diff("30001", current)
+        diff_time = time.perf_counter() - start_time
+
+        groups = counter_groups(previous)
+        start_time = time.perf_counter()
+        apply_events(groups, events)
+        apply_time = time.perf_counter() - start_time
+        assert groups == counter_groups(current)
+
+        size = stored_size(events)
+        print(f"{rate:.0%} des items modifiés : {len(events)} événements, diff {diff_time * 1000:.1f} ms, "
+              f"application {apply_time * 1000:.2f} ms, {size / 1e3:.1f} ko ({size / full_size:.1%} du snapshot)")
+
+
+HISTORY_SNAPSHOTS = 30
+LOOKUP_ENTRIES = 100_000
+
+
+def directory_size(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+@benchmark
+def bench_snapshot_log(catalog, args):
+    bodies = generate_prices_history(catalog, count=HISTORY_SNAPSHOTS)
+    pretty_size = sum(len(json.dumps(data, ensure_ascii=False, indent=2).encode()) for data, _ in bodies)
+    raw_size = sum(len(body) for _, body in bodies)
+    print(f"{HISTORY_SNAPSHOTS} relevés : {raw_size / 1e6:.1f} Mo bruts, {pretty_size / 1e6:.1f} Mo en JSON indenté "
+          f"décompressé")
+
+    for codec in ("zlib", "lzma"):
+        with tempfile.TemporaryDirectory() as directory:
+            with SnapshotLog(directory, codec=codec) as log:
+                start_time = time.perf_counter()
+                for timestamp, (_, body) in enumerate(bodies):
+                    log.append(body, timestamp=float(timestamp))
+                append_time = (time.perf_counter() - start_time) / HISTORY_SNAPSHOTS
+                start_time = time.perf_counter()
+                log.body_at(HISTORY_SNAPSHOTS / 2)
+                read_time = time.perf_counter() - start_time
+            print(f"{codec} : {directory_size(directory) / 1e6:.2f} Mo sur disque, ajout {append_time * 1000:.1f} ms, "
+                  f"lecture {read_time * 1000:.1f} ms | {log.stats.summary()}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        with SnapshotLog(directory) as log:
+            for timestamp in range(LOOKUP_ENTRIES):
+                log.append(b"%d" % (timestamp % 7), timestamp=float(timestamp))
+        start_time = time.perf_counter()
+        with SnapshotLog(directory, readonly=True) as log:
+            open_time = time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            for timestamp in range(0, LOOKUP_ENTRIES, 10):
+                log.entry_at(timestamp + 0.5)
+            lookup_time = (time.perf_counter() - start_time) / (LOOKUP_ENTRIES // 10)
+        print(f"Index de {LOOKUP_ENTRIES} entrées : ouverture {open_time * 1000:.0f} ms, "
+              f"recherche par date {lookup_time * 1e6:.2f} µs")
+
+
+def replay_log(directory, index, speed, engine, server):
+    """Rejoue le journal dans le pipeline de Snipper ; renvoie les stats de relecture et les durées d'analyse."""
+    client = ReplayClient(SnapshotLog(directory, readonly=True), speed=speed, columnar=True)
+    processor = DataProcessor(engine=engine, incremental=engine == "python")
+    process_times, results, finished = deque(), [], threading.Event()
+
+    def process(data):
+        start_time = time.perf_counter()
+        result = processor.process_data(data, index, 20, 3000, 5, 10)
+        process_times.append(time.perf_counter() - start_time)
+        return result
+
+    def on_error(stage, error):
+        if not isinstance(error, ReplayFinished):
+            print(f"Erreur ({stage}) : {error}")
+        finished.set()
+
+    pipeline = FetchProcessPipeline(lambda: client.fetch_server(server), process,
+                                    lambda result, timings: results.append(result), on_error=on_error,
+                                    slot_capacity=HISTORY_SNAPSHOTS)  # Aucun snapshot abandonné : on mesure tout
+    pipeline.start()
+    finished.wait()
+    while len(results) < client.stats.decoded:
+        time.sleep(0.001)
+    client.close()
+    end_to_end = len(results) / (time.perf_counter() - client.stats.started_at)
+    pipeline.stop()
+    return client.stats, process_times, end_to_end
+
+
+@benchmark
+def bench_replay(catalog, args):
+    index = ItemIndex(catalog)
+    engines = available_engines()
+    with tempfile.TemporaryDirectory() as directory:
+        if args.log:
+            directory = args.log
+        else:
+            with SnapshotLog(directory) as log:
+                for number, (_, body) in enumerate(generate_prices_history(catalog, count=HISTORY_SNAPSHOTS)):
+                    log.append(body, timestamp=number * 5.0)
+
+        for engine in engines:
+            for speed in (None, 200.0):  # Sans attente, puis 200× (relevés espacés de 5 s : 25 ms)
+                stats, process_times, end_to_end = replay_log(directory, index, speed, engine, args.server)
+                label = "sans attente" if speed is None else f"{speed:g}×"
+                print(f"Moteur {engine}, {label} : {end_to_end:.1f} snapshots analysés/s de bout en bout")
+                print(f"    {stats.summary()}")
+                print(f"    Analyse {latency_summary(process_times)}"
+                      + (f" | Retard {latency_summary(stats.lag)}" if stats.lag else ""))
+
+
+# Profondeur, top-K et plans d'achat
+
+@benchmark
+def bench_top_k(catalog, args):
+    index = ItemIndex(catalog)
+    data = generate_server_data(catalog, max_sales=60)
+    engines = available_engines()
+
+    # (seuil de rentabilité, coût maximal, profit minimal) : ceux de Snipper, puis presque tout accepté
+    for percentage_threshold, cost_threshold, mini_profit in ((20, 3000, 10), (-100, 10 ** 9, -10 ** 9)):
+        for depth in (10, 40):
+            print(f"Seuils {(percentage_threshold, cost_threshold, mini_profit)}, profondeur {depth} :")
+            for engine in engines:
+                for top_k in (None, 1, 50):
+                    processor = DataProcessor(engine=engine, top_k=top_k)
+                    durations, results = repeated(lambda: processor.process_data(
+                        data, index, percentage_threshold, cost_threshold, depth, mini_profit), runs=3)
+                    peak = peak_memory(lambda: processor.process_data(data, index, percentage_threshold,
+                                                                      cost_threshold, depth, mini_profit))
+                    label = "tous les résultats" if top_k is None else f"top {top_k}"
+                    print(f"    {engine}, {label} : {sum(durations) / len(durations) * 1000:.1f} ms, "
+                          f"pic mémoire {peak / 1e6:.1f} Mo ({len(results)} résultats)")
+
+
+def resummed_scan(prices, depth):
+    """Ancienne boucle de profondeur : le coût du préfixe est resommé à chaque profondeur, O(depth²)."""
+    columns = new_columns()
+    for depth_incr in range(min(depth, len(prices) - 1) + 1):
+        total_cost = 0
+        for p, c in prices[:depth_incr]:
+            total_cost += p * c
+        sale_price = prices[depth_incr + 1][0] if depth_incr + 1 < len(prices) else -1
+        append_row(columns, depth_incr, total_cost, prices[depth_incr][0], sale_price)
+    return columns
+
+
+@benchmark
+def bench_depth(catalog, args):
+    index = ItemIndex(catalog)
+    data = generate_server_data(catalog, max_sales=250)  # Carnets profonds : jusqu'à 250 annonces par item
+    groups = [sorted(rows) for _, _, rows in DataProcessor().group_sales(data) if len(rows) >= 5]
+    print(f"{len(groups)} groupes, {sum(map(len, groups))} annonces")
+
+    processors = [("python, annonces", DataProcessor()), ("python, unités", DataProcessor(depth_unit="units"))]
+    if "numpy" in available_engines():
+        processors.append(("numpy, annonces", DataProcessor(engine="numpy")))
+
+    def scan_time(scan, depth):
+        return best_of(lambda: [scan(prices, depth) for prices in groups], repeat=1)
+
+    for depth in (1, 10, 100):
+        print(f"Profondeur {depth} :")
+        print(f"    Balayage seul : resommé {scan_time(resummed_scan, depth) * 1000:.1f} ms, "
+              f"sommes cumulées {scan_time(evaluate_listings, depth) * 1000:.1f} ms, "
+              f"en unités {scan_time(evaluate_units, depth) * 1000:.1f} ms")
+        print("    process_data : " + ", ".join(
+            f"{label} {best_of(lambda: processor.process_data(data, index, 20, 10 ** 6, depth, 10), 1) * 1000:.1f} ms"
+            for label, processor in processors))
+
+
+def scan_units_for(rows, budget):
+    """Sans carnet : tri et parcours des annonces à chaque budget."""
+    units = cost = 0
+    for p, c in sorted(rows, key=lambda row: row[0]):
+        if cost + p * c <= budget:
+            units, cost = units + c, cost + p * c
+        else:
+            partial = int((budget - cost) // p)
+            return units + partial, cost + partial * p
+    return units, cost
+
+
+@benchmark
+def bench_buyout_planner(catalog, args):
+    budgets = [500 * step for step in range(1, 101)]  # 100 valeurs du Seuil de Coût essayées par groupe
+    planner = BuyoutPlanner(generate_server_data(catalog, max_sales=120), ItemIndex(catalog))
+    start_time = time.perf_counter()
+    planner.load_groups()
+    keys = list(planner.rows)
+    print(f"{len(keys)} groupes regroupés en {(time.perf_counter() - start_time) * 1000:.1f} ms")
+
+    start_time = time.perf_counter()
+    scanned = [scan_units_for(planner.rows[key], budget) for key in keys for budget in budgets]
+    scan_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    books = [planner.book(*key) for key in keys]
+    build_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    planned = [book.units_for(budget) for book in books for budget in budgets]
+    search_time = time.perf_counter() - start_time
+
+    assert planned == scanned
+    evaluations = len(keys) * len(budgets)
+    print(f"{evaluations} budgets évalués : parcours des annonces {scan_time * 1000:.1f} ms, "
+          f"carnets {build_time * 1000:.1f} ms + dichotomie {search_time * 1000:.1f} ms "
+          f"({search_time / evaluations * 1e6:.2f} µs par budget)")
+
+
+# Balayage de la région
+
+@benchmark
+def bench_multi_server_scan(catalog, args):
+    index = ItemIndex(catalog)
+    body = load_prices_body(args, REGION)
+    settings = ScanSettings(20, 3000, 5, 10)
+    print(f"Corps : {len(json.loads(body)['list'])} serveurs, {len(body) / 1e6:.1f} Mo, {os.cpu_count()} cœur(s)")
+
+    for label, workers in (("En série (workers=1)", 1), ("Pool de processus", None)):
+        with MultiServerScanner(index, workers=workers) as scanner:
+            scanner.scan(body, settings)  # Premier balayage : démarrage des processus du pool
+            reports = [scanner.scan(body, settings) for _ in range(3)]
+        print(f"{label} : {latency_summary([report.elapsed for report in reports])} | "
+              f"{sum(report.fits(args.interval) for report in reports)}/{len(reports)} balayages dans "
+              f"l'intervalle de {args.interval:g} s")
+        print(f"    {reports[-1].summary(args.interval)}")
+        for line in reports[-1].breakdown():
+            print(f"    {line}")
+
+
+# Écarts entre serveurs
+
+def python_spreads(columns_by_server, k):
+    """Sans matrice : dict des prix les plus bas par (item, trait), puis écart groupe par groupe."""
+    lowest = {}
+    for server, columns in columns_by_server.items():
+        for item, trait, price in zip(columns.item, columns.trait, columns.price):
+            asks = lowest.setdefault((item, trait), {})
+            if price < asks.get(server, float('inf')):
+                asks[server] = price
+    gaps = []
+    for key, asks in lowest.items():
+        if len(asks) >= 2:
+            low_server = min(asks, key=asks.get)
+            high_server = max(asks, key=asks.get)
+            gaps.append((asks[high_server] - asks[low_server], key, low_server, high_server))
+    gaps.sort(key=lambda gap: gap[0], reverse=True)
+    return gaps[:k]
+
+
+@benchmark
+def bench_price_spread(catalog, args):
+    from price_spread import SpreadMatrix
+
+    top = 20
+    index = ItemIndex(catalog)
+    columns_by_server = {server: columns_from_data(generate_server_data(catalog, seed, max_sales=40))
+                         for seed, server in enumerate(REGION)}
+    sales = sum(len(columns) for columns in columns_by_server.values())
+    print(f"{len(catalog['items'])} items, {len(REGION)} serveurs, {sales} ventes (colonnes déjà décodées)")
+
+    python_durations, expected = repeated(lambda: python_spreads(columns_by_server, top))
+    print(f"Dicts Python : {latency_summary(python_durations)}")
+
+    build_durations, matrix = repeated(lambda: SpreadMatrix.from_columns(columns_by_server))
+    top_durations, spreads = repeated(lambda: matrix.top(top, item_index=index))
+    print(f"Matrice {matrix.asks.shape[0]} x {matrix.asks.shape[1]} : construction {latency_summary(build_durations)}")
+    print(f"    Écarts + top {top} : {latency_summary(top_durations)}")
+
+    assert [spread['Gap'] for spread in spreads] == [gap[0] for gap in expected]
+    widest = spreads[0]
+    print(f"Plus gros écart : {widest['Name']} ({widest['Trait']}) {widest['Low Server']} {widest['Low Price']} -> "
+          f"{widest['High Server']} {widest['High Price']} (+{widest['Gap (%)']} %)")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks de Snipper")
+    parser.add_argument("benchmarks", nargs="*", metavar="benchmark", help="Noms à lancer (tous par défaut)")
+    parser.add_argument("--list", action="store_true", help="Affiche les benchmarks disponibles")
+    parser.add_argument("--prices", help="Réponse /api/ah/prices enregistrée (decoder, prices_parser, "
+                                         "parallel_decode, multi_server_scan)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processus du pool de parallel_decode (nombre de CPU par défaut)")
+    parser.add_argument("--interval", type=float, default=5.0,
+                        help="Intervalle que doit tenir multi_server_scan (SCAN_INTERVAL de Snipper/main.py)")
+    parser.add_argument("--data", help="__data.json enregistré (devalue)")
+    parser.add_argument("--log", help="Répertoire d'un journal SnapshotLog (replay)")
+    parser.add_argument("--server", default="30001", help="Serveur rejoué par replay")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Benchmark inconnu : {', '.join(unknown)} (disponibles : {', '.join(BENCHMARKS)})")
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        sys.exit()
+
+    catalog = load_catalog()
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"== {name}")
+        BENCHMARKS[name](catalog, args)
@@ -0,0 +1,119 @@
+import json
+import math
+import os
+import random
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CATALOG_FILE = os.path.join(BASE_DIR, "..", "Snipper", "auction_house_data.json")
+
+
+def load_catalog(filename=CATALOG_FILE):
+    """Charge le catalogue auction_house_data.json livré avec Snipper."""
+    with open(filename, 'r', encoding='utf-8') as infile:
+        return json.load(infile)
+
+
+def generate_server_data(catalog, seed=0, max_sales=40):
+    """Génère un snapshot décompressé d'un serveur, au format de /api/ah/prices.
+
+    {item_id: {"quantity": q, "sales": [{"p": prix, "c": quantité, "t": trait}, ...]}}
+    Les items à traits reçoivent un 't' sur chaque vente, comme sur tldb.info.
+    """
+    rng = random.Random(seed)
+    server_data = {}
+    for info in catalog['items']:
+        nb_sales = rng.randint(1, max_sales)
+        base_price = rng.randint(5, 5000)
+        traits = info.get('traits') or []
+        sales = []
+        for _ in range(nb_sales):
+            sale = {'p': max(1, int(base_price * rng.uniform(0.5, 2.0))), 'c': rng.choice((1, 1, 1, 2, 5))}
+            if traits:
+                sale['t'] = rng.choice(traits)
+            sales.append(sale)
+        server_data[str(info['num'])] = {
+            'quantity': sum(sale['c'] for sale in sales),
+            'sales': sales,
+        }
+    return server_data
+
+
+def generate_prices_response(catalog, servers=("30001", "30002", "30003"), seed=0):
+    """Génère un corps de réponse /api/ah/prices complet (chaque serveur compressé en chaîne JSON)."""
+    from compress_json import compress
+
+    list_data = {}
+    for offset, server in enumerate(servers):
+        list_data[server] = json.dumps(compress(generate_server_data(catalog, seed + offset)))
+    return {'list': list_data, 'total': len(catalog['items']), 'regions': {}}
+
+
+def flatten_devalue(value):
+    """Sérialise au format devalue (liste plate de valeurs, doublons partagés), comme les nœuds de __data.json."""
+    values = []
+    indexes = {}
+
+    def flatten(thing):
+        if isinstance(thing, float) and not math.isfinite(thing):
+            return -3 if math.isnan(thing) else (-4 if thing > 0 else -5)
+        if isinstance(thing, float) and thing == 0 and math.copysign(1, thing) < 0:
+            return -6
+        key = id(thing) if isinstance(thing, (list, dict)) else (type(thing), thing)
+        if key in indexes:
+            return indexes[key]
+        index = indexes[key] = len(values)
+        values.append(None)
+        if isinstance(thing, list):
+            values[index] = [flatten(child) for child in thing]
+        elif isinstance(thing, dict):
+            values[index] = {name: flatten(child) for name, child in thing.items()}
+        else:
+            values[index] = thing
+        return index
+
+    flatten(value)
+    return values
+
+
+def generate_data_json(catalog):
+    """Génère un document __data.json : nœud "data" avec les items compressés (compress_json) et les traits."""
+    from compress_json import compress
+
+    data = flatten_devalue({'items': compress(catalog['items']), 'traits': catalog['traits']})
+    return {'type': 'data', 'nodes': [{'type': 'skip'}, {'type': 'data', 'data': data, 'uses': {}}]}
+
+
+def mutate_server_data(server_data, rate=0.05, seed=0):
+    """Copie d'un snapshot où une fraction `rate` des items a changé (nouvelle vente, vente partie, prix modifié)."""
+    rng = random.Random(seed)
+    mutated = {}
+    for item_id, item_data in server_data.items():
+        sales = [dict(sale) for sale in item_data['sales']]
+        if rng.random() < rate:
+            action = rng.choice(("add", "remove", "reprice"))
+            if action == "add" or len(sales) == 1:
+                new_sale = dict(rng.choice(sales))
+                new_sale['p'] = max(1, int(new_sale['p'] * rng.uniform(0.5, 1.5)))
+                sales.append(new_sale)
+            elif action == "remove":
+                sales.pop(rng.randrange(len(sales)))
+            else:
+                sale = rng.choice(sales)
+                sale['p'] = max(1, int(sale['p'] * rng.uniform(0.8, 1.2)))
+        mutated[item_id] = {'quantity': sum(sale['c'] for sale in sales), 'sales': sales}
+    return mutated
+
+
+def generate_prices_history(catalog, count=30, server="30001", rate=0.02, seed=0):
+    """Relevés successifs de /api/ah/prices pour un serveur : [(snapshot décompressé, corps brut)].
+
+    Un relevé sur trois est identique au précédent, les autres modifient une fraction `rate` des items.
+    """
+    from compress_json import compress
+
+    data, history = generate_server_data(catalog, seed=seed), []
+    for number in range(count):
+        if number % 3:
+            data = mutate_server_data(data, rate=rate, seed=seed + number)
+        history.append((data, json.dumps({"list": {server: json.dumps(compress(data))}}).encode()))
+    return history
@@ -0,0 +1,295 @@
+"""Faux tldb.info local : /api/ah/prices, /auction-house/__data.json et les icônes du CDN, sans réseau.
+
+Latence, bande passante, erreurs et rythme de mutation des prix sont réglables, pour mesurer chaque
+script de fetch hors ligne (ils lisent TLDB_URL / TLDB_CDN_URL, voir Snipper/tldb_urls.py) :
+
+    python stub_server.py --port 8000 --latency 0.08 --bandwidth 2e6 --error-rate 0.02 --mutation-rate 0.02
+    python stub_server.py --prices ../JsonFileTest/prices_log --data __data.json --icons ../WebsiteTools/icons
+
+Sans fixtures, les corps sont générés depuis le catalogue de Snipper (sample_payloads.py).
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import struct
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Snipper"))
+from tldb_urls import DATA_PATH, ICONS_PATH, PRICES_PATH
+
+THROTTLE_STEP = 0.02  # Secondes de bande passante par morceau écrit
+
+
+def placeholder_png():
+    """PNG 1×1 transparent, servi pour toute icône quand aucun répertoire d'icônes n'est fourni."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(b"\x00\x00\x00\x00\x00")) + chunk(b"IEND", b""))
+
+
+def make_etag(body):
+    return '"' + hashlib.md5(body).hexdigest() + '"'
+
+
+def mutate_prices_body(body, rate, seed):
+    """Corps /api/ah/prices dont une fraction `rate` des items de chaque serveur a changé."""
+    from compress_json import compress
+    from compressed_json import decompress
+    from sample_payloads import mutate_server_data
+
+    document = json.loads(body)
+    for offset, (server, payload) in enumerate(document.get("list", {}).items()):
+        data = mutate_server_data(decompress(json.loads(payload)), rate=rate, seed=seed + offset)
+        document["list"][server] = json.dumps(compress(data))
+    return json.dumps(document).encode()
+
+
+class StubTldbHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, comme tldb.info
+    disable_nagle_algorithm = True  # En-têtes et petit corps (icônes) ne doivent pas attendre l'ACK retardé
+
+    def log_message(self, format, *args):
+        pass  # Pas de log par requête pendant les benchmarks
+
+    def setup(self):
+        super().setup()
+        self.server.stub.connections += 1
+
+    def do_GET(self):
+        stub = self.server.stub
+        stub.requests += 1
+        path = self.path.split('?')[0]
+        route = stub.lookup(path)
+        if route is None:
+            self.send_body(404, b"Not Found")
+            return
+        stub.requests_by_path[path] = stub.requests_by_path.get(path, 0) + 1
+        delay = stub.delay() if callable(stub.delay) else stub.delay
+        if delay:
+            time.sleep(delay)  # Latence réseau simulée (fixe, ou tirée par une fonction)
+        if stub.error_rate and stub.rng.random() < stub.error_rate:
+            stub.errors += 1
+            self.send_body(stub.error_status, b'{"message":"Service Unavailable"}')
+            return
+
+        body, etag, content_type = route
+        if stub.use_etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_body(200, body, {"ETag": etag} if stub.use_etag else {}, content_type)
+
+    def send_body(self, status, body, headers=None, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.write_throttled(body)
+
+    def write_throttled(self, body):
+        bandwidth = self.server.stub.bandwidth
+        self.server.stub.bytes_sent += len(body)
+        if not bandwidth:
+            self.wfile.write(body)
+        else:
+            # Débit limité par connexion : chaque morceau part après le temps qu'il prendrait à ce débit
+            step = max(1, int(bandwidth * THROTTLE_STEP))
+            for start in range(0, len(body), step):
+                chunk = body[start:start + step]
+                time.sleep(len(chunk) / bandwidth)
+                self.wfile.write(chunk)
+
+
+class StubTldbServer:
+    """Faux tldb.info local servant /api/ah/prices, /auction-house/__data.json et les icônes du CDN.
+
+    delay : latence par requête (secondes, ou fonction qui la tire) ; bandwidth : octets/s par connexion ;
+    error_rate : probabilité de répondre error_status au lieu du corps ; icons_dir : répertoire de PNG
+    (nom = dernier élément du chemin de l'icône, comme WebsiteTools/icons), sinon un PNG 1×1 pour tout.
+    Les prix sont un corps fixe (set_prices) ou une suite de corps servis tour à tour toutes les
+    `interval` secondes (set_prices_history, mutate_prices).
+    """
+
+    PRICES_PATH = PRICES_PATH
+    DATA_PATH = DATA_PATH
+    ICONS_PATH = ICONS_PATH
+
+    def __init__(self, prices_body=None, use_etag=True, host="127.0.0.1", port=0, data_body=None, delay=0.0,
+                 bandwidth=None, error_rate=0.0, error_status=503, icons_dir=None, seed=0):
+        self.use_etag = use_etag
+        self.delay = delay
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.icons_dir = icons_dir
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.requests_by_path = {}
+        self.connections = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.routes = {}  # Chemin -> (corps, ETag)
+        self.prices_history = []  # (corps, ETag) servis tour à tour
+        self.history_interval = None
+        self.history_started = None
+        self.icons = {}  # Nom de fichier -> (corps, ETag), lus une seule fois
+        self.placeholder = placeholder_png()
+        if prices_body is not None:
+            self.set_prices(prices_body)
+        if data_body is not None:
+            self.set_data(data_body)
+
+        self.httpd = ThreadingHTTPServer((host, port), StubTldbHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def set_body(self, path, body):
+        self.routes[path] = (body, make_etag(body))
+
+    def set_prices(self, body):
+        self.prices_history = []
+        self.set_body(self.PRICES_PATH, body)
+
+    def set_data(self, body):
+        self.set_body(self.DATA_PATH, body)
+
+    def set_prices_history(self, bodies, interval=5.0):
+        """Sert bodies[0], puis bodies[1] après interval secondes, etc. ; reprend au début après le dernier."""
+        self.history_interval = interval
+        self.history_started = time.monotonic()
+        self.prices_history = [(body, make_etag(body)) for body in bodies]
+        self.routes[self.PRICES_PATH] = self.prices_history[0]
+
+    def mutate_prices(self, rate, variants=4, interval=5.0):
+        """Suite de variants corps à partir du corps actuel, chacun modifiant une fraction rate des items.
+
+        Les variantes sont calculées ici, pas pendant le service : le serveur ne vole pas de CPU au
+        client mesuré.
+        """
+        bodies = [self.routes[self.PRICES_PATH][0]]
+        for number in range(1, variants):
+            bodies.append(mutate_prices_body(bodies[-1], rate, seed=number * 1000))
+        self.set_prices_history(bodies, interval)
+
+    def current_prices(self):
+        if len(self.prices_history) < 2:
+            return self.routes.get(self.PRICES_PATH)
+        position = int((time.monotonic() - self.history_started) / self.history_interval)
+        return self.prices_history[position % len(self.prices_history)]
+
+    def icon(self, name):
+        if self.icons_dir is None:
+            return self.placeholder, '"placeholder"'
+        if name not in self.icons:
+            path = os.path.join(self.icons_dir, os.path.basename(name))
+            if not os.path.isfile(path):
+                return None
+            with open(path, "rb") as infile:
+                body = infile.read()
+            self.icons[name] = (body, make_etag(body))
+        return self.icons[name]
+
+    def lookup(self, path):
+        """(corps, ETag, Content-Type) servi pour ce chemin, ou None (404)."""
+        if path == self.PRICES_PATH:
+            route = self.current_prices()
+        elif path.startswith(self.ICONS_PATH) and path.endswith(".png"):
+            route = self.icon(path[len(self.ICONS_PATH):])
+            return None if route is None else (*route, "image/png")
+        else:
+            route = self.routes.get(path)
+        return None if route is None else (*route, "application/json")
+
+    def summary(self):
+        return (f"Requêtes: {self.requests} sur {self.connections} connexions | Erreurs injectées: {self.errors} | "
+                f"Envoyé: {self.bytes_sent / 1e6:.1f} Mo")
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def load_prices_fixture(path):
+    """Corps enregistrés : un fichier (un corps) ou un répertoire de snapshot_log (tous ses corps, dans l'ordre)."""
+    if os.path.isdir(path):
+        from snapshot_log import SnapshotLog
+        with SnapshotLog(path, readonly=True) as prices_log:
+            return [body for _, body in prices_log.replay()]
+    with open(path, "rb") as infile:
+        return [infile.read()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Faux tldb.info local pour les benchmarks hors ligne")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--prices", help="corps /api/ah/prices enregistré, ou répertoire de snapshot_log")
+    parser.add_argument("--data", help="corps __data.json enregistré")
+    parser.add_argument("--icons", help="répertoire des PNG (par défaut : un PNG 1×1 pour toute icône)")
+    parser.add_argument("--latency", type=float, default=0.0, help="secondes ajoutées à chaque requête")
+    parser.add_argument("--bandwidth", type=float, help="octets/s par connexion (par défaut : sans limite)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probabilité d'une réponse 503")
+    parser.add_argument("--mutation-rate", type=float, default=0.0,
+                        help="fraction des items modifiée à chaque nouveau relevé de prix")
+    parser.add_argument("--interval", type=float, default=5.0, help="secondes entre deux relevés de prix")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from sample_payloads import generate_data_json, generate_prices_response, load_catalog
+    catalog = None if args.prices and args.data else load_catalog()
+    prices = (load_prices_fixture(args.prices) if args.prices
+              else [json.dumps(generate_prices_response(catalog, seed=args.seed)).encode()])
+    if args.data:
+        with open(args.data, "rb") as infile:
+            data = infile.read()
+    else:
+        data = json.dumps(generate_data_json(catalog)).encode()
+
+    stub = StubTldbServer(prices[0], host=args.host, port=args.port, data_body=data, delay=args.latency,
+                          bandwidth=args.bandwidth, error_rate=args.error_rate, icons_dir=args.icons, seed=args.seed)
+    if len(prices) > 1:
+        stub.set_prices_history(prices, args.interval)
+    elif args.mutation_rate:
+        print("Calcul des relevés modifiés...")
+        stub.mutate_prices(args.mutation_rate, interval=args.interval)
+    print(f"Faux tldb.info sur {stub.base_url} ({len(stub.prices_history) or 1} relevé(s) de prix)")
+    print(f"    TLDB_URL={stub.base_url} TLDB_CDN_URL={stub.base_url} python <script de fetch>")
+    try:
+        stub.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.httpd.server_close()
+        print(stub.summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@ import threading
 import hashlib
 import pickle
 import datetime
+import os
 import sys
 from dataclasses import dataclass
 from typing import Optional
@@ -10,7 +11,6 @@ from typing import Optional
 import requests
 import time
 import pyperclip
-from compress_json import decompress
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QLabel, QLineEdit, QVBoxLayout, QHBoxLayout,
                              QGridLayout, QPushButton, QTreeWidget, QTreeWidgetItem, QHeaderView, QMessageBox,
@@ -22,7 +22,26 @@ from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as Navigatio
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Snipper"))
+from item_index import ItemIndex
+from poll_scheduler import AdaptivePollScheduler
+from prices_client import PricesClient
+from replay import ReplayClient, ReplayFinished
+from results_cache import TopResults, passes_thresholds
+from snapshot_daemon import SnapshotClient
+from snapshot_log import SnapshotLog
+from tldb_urls import TLDB_URL, prices_url
+
 MAX_PRICE = 999999999
+# Base de tldb.info (variable d'environnement TLDB_URL) : http://127.0.0.1:8000 pour Benchmarks/stub_server.py
+BASE_URL = TLDB_URL
+# Snapshots lus depuis le démon local (Snipper/snapshot_daemon.py) au lieu d'interroger tldb.info
+SNAPSHOT_DAEMON = False
+# Relecture hors ligne d'un journal de snapshot_log (répertoire), à la vitesse REPLAY_SPEED (None : sans attente)
+REPLAY_LOG = None
+REPLAY_SPEED = 10.0
+# Nombre de résultats affichés : seuls les TOP_K meilleurs sont gardés (None : tous)
+TOP_K = None
 
 @dataclass
 class Item:
@@ -34,40 +53,48 @@ class Item:
 
 class DataFetcher(QThread):
     data_ready = pyqtSignal(dict, float)
+    data_unchanged = pyqtSignal(float)
+    replay_finished = pyqtSignal(str)  # Fin du journal relu : plus rien à fetcher
 
-    def __init__(self, server):
+    def __init__(self, server, prices_client):
         super().__init__()
         self.server = server
+        self.prices_client = prices_client  # Partagé entre les fetchs : connexion keep-alive et ETag conservés
 
     def run(self):
         start_time = time.time()
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
-        url = "https://tldb.info/api/ah/prices"
         try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            list_data = data["list"]
-            fetched_data = decompress(json.loads(list_data[self.server]))
+            fetched_data = self.prices_client.fetch_server(self.server)
             end_time = time.time()
             latency = end_time - start_time
-            self.data_ready.emit(fetched_data, latency)
-        except requests.exceptions.RequestException as e:
+            if fetched_data is None:
+                self.data_unchanged.emit(latency)
+            else:
+                self.data_ready.emit(fetched_data, latency)
+        except (requests.exceptions.RequestException, ConnectionError) as e:
             print(f"Error fetching data: {e}")
             self.data_ready.emit({}, 0)
         except (KeyError, IndexError, json.JSONDecodeError) as e:
             print(f"Error processing API response: {e}")
             self.data_ready.emit({}, 0)
+        except ReplayFinished as e:
+            self.replay_finished.emit(str(e))
+        except Exception as e:  # Toujours un signal : sinon le serveur reste occupé et le polling s'arrête
+            print(f"Unexpected error while fetching data: {e}")
+            self.data_ready.emit({}, 0)
 
 
 class DataProcessor:
-    def process_data(self, data, data_name, percentage_threshold, cost_threshold, depth, mini_profit):
-        if not data_name or not data_name.get('items') or not data_name.get('traits'):
-            return [] # Return empty list if data_name is invalid
+    def __init__(self, top_k=None):
+        # None : tous les résultats ; sinon les top_k meilleurs, gardés dans un tas pendant la génération
+        self.top_k = top_k
+
+    def process_data(self, data, item_index, percentage_threshold, cost_threshold, depth, mini_profit):
+        if not item_index:
+            return [] # Return empty list if the metadata index is empty
 
-        brute_results = []
+        filtered_results = []
+        top = TopResults(self.top_k) if self.top_k is not None else None
         grouped_data = []
         for item_id, item_data in data.items():
             sales = item_data.get("sales", [])
@@ -91,40 +118,45 @@ class DataProcessor:
                 continue
             rows.sort(key=lambda x: x['p'])
             prices = [(row['p'], row['c']) for row in rows]
+            temp_name = item_index.name(name)
+            temp_trait = item_index.trait_name(trait)
+            total_cost = 0
             for depth_incr in range(1, depth + 1): #Start from 1 to avoid unnecessary calculation when depth_incr is 0
                 if len(prices) < depth_incr + 1:
-                    continue
-                total_cost = sum(p * c for p, c in prices[:depth_incr])
+                    break
+                p, c = prices[depth_incr - 1]
+                total_cost += p * c  # Coût cumulé : une addition par profondeur au lieu de resommer le préfixe
+                if total_cost > cost_threshold:
+                    break  # Le coût croît avec la profondeur : les profondeurs suivantes ne passent pas non plus
                 sale_revenue = prices[depth_incr][0] * 0.77 * depth_incr
                 instant_profit = sale_revenue - total_cost
                 profitability = (instant_profit / total_cost) * 100 if total_cost > 0 else 0 #Handle division by zero
 
-                temp_name = name
-                for info in data_name['items']:
-                    if info['num'] == int(name):
-                        temp_name = info['name']
-
-                temp_trait = trait
-                if trait != "NULL":
-                    temp_trait = data_name['traits'][trait]['name']
-
                 sale_price = prices[depth_incr][0] if depth_incr < len(prices) else -1
 
-                brute_results.append({
+                # Seuils appliqués pendant la génération : pas de dict pour une ligne écartée
+                instant_profit, profitability = round(instant_profit, 2), int(round(profitability, 2))
+                if not passes_thresholds(profitability, total_cost, instant_profit, percentage_threshold,
+                                         cost_threshold, mini_profit):
+                    continue
+                result = lambda: {
                     'Name': temp_name,
                     'Trait': temp_trait,
                     'Depth': depth_incr,
                     'Cost': total_cost,
-                    'Instant Profit': round(instant_profit, 2),
-                    'Profitability (%)': int(round(profitability, 2)),
+                    'Instant Profit': instant_profit,
+                    'Profitability (%)': profitability,
                     'Item Price': prices[depth_incr -1][0], #Adjusted index to access correct price
                     'Occurrences': len(rows),
                     'Sale Price': sale_price
-                })
+                }
+                if top is not None:
+                    top.push(instant_profit, result)
+                else:
+                    filtered_results.append(result())
 
-        filtered_results = [result for result in brute_results if
-                            result['Profitability (%)'] >= percentage_threshold and result['Cost'] <= cost_threshold and
-                            result['Instant Profit'] >= mini_profit]
+        if top is not None:
+            return top.results()
         filtered_results.sort(key=lambda x: x['Instant Profit'], reverse=True)
         return filtered_results
 
@@ -135,7 +167,7 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Log des Achats et Analyse des Items")
         self.filename = "achat_data.pickle"
         self.items = []
-        self.data_processor = DataProcessor()
+        self.data_processor = DataProcessor(top_k=TOP_K)
         self.percentage_threshold = 20
         self.cost_threshold = 3000
         self.depth = 1
@@ -143,9 +175,21 @@ class MainWindow(QMainWindow):
         self.last_top_id = None
         self.server = "30001"
         self.data_name = {}
+        self.item_index = ItemIndex({})
         self.previous_result = []
         self.data_loaded = False
 
+        # Un seul timer de rafraîchissement, au plus un fetch en cours, intervalle adapté aux changements
+        if REPLAY_LOG:
+            self.prices_client = ReplayClient(SnapshotLog(REPLAY_LOG, readonly=True), speed=REPLAY_SPEED)
+        elif SNAPSHOT_DAEMON:
+            self.prices_client = SnapshotClient(servers=[self.server])
+        else:
+            self.prices_client = PricesClient(url=prices_url(BASE_URL))
+        self.poll_scheduler = AdaptivePollScheduler(min_interval=0.5, max_interval=30.0)
+        self.refresh_timer = None
+        self.fetcher = None
+
         self.initUI()
         self.load_data()
         self.load_auction_house_data("auction_house_data.json")  # Load auction house data
@@ -158,6 +202,7 @@ class MainWindow(QMainWindow):
         try:
             with open(filename, 'r', encoding='utf-8') as f:
                 self.data_name = json.load(f)
+                self.item_index = ItemIndex(self.data_name)
                 self.data_loaded = True
         except (FileNotFoundError, json.JSONDecodeError) as e:
             QMessageBox.critical(self, "Erreur", f"Erreur lors du chargement de '{filename}': {e}")
@@ -324,15 +369,42 @@ class MainWindow(QMainWindow):
 
     def start_refresh(self):
         if self.data_loaded:
-            self.fetcher = DataFetcher(self.server)
-            self.fetcher.data_ready.connect(self.update_api_gui)
-            self.fetcher.start()
-            self.timer = QTimer()
-            self.timer.timeout.connect(self.start_refresh)
-            self.timer.start(500)  # Refresh every 60 seconds (adjust as needed)
+            if self.refresh_timer is None:
+                self.refresh_timer = QTimer(self)
+                self.refresh_timer.timeout.connect(self.poll_tick)
+                self.refresh_timer.start(self.poll_scheduler.interval_ms)
+            self.poll_tick()
         else:
             QTimer.singleShot(100, self.start_refresh)
 
+    def poll_tick(self):
+        # Tick pendant un fetch encore en cours : sauté plutôt que de lancer un fetch concurrent
+        if not self.poll_scheduler.try_start(self.server):
+            return
+        self.fetcher = DataFetcher(self.server, self.prices_client)
+        self.fetcher.data_ready.connect(self.update_api_gui)
+        self.fetcher.data_unchanged.connect(self.on_data_unchanged)
+        self.fetcher.replay_finished.connect(self.on_replay_finished)
+        self.fetcher.start()
+
+    def on_fetch_finished(self, changed):
+        self.poll_scheduler.finish(self.server, changed)
+        if self.refresh_timer is not None:
+            self.refresh_timer.setInterval(self.poll_scheduler.interval_ms)
+
+    def on_replay_finished(self, message):
+        # Fin du journal : on arrête le timer au lieu de compter des ticks "inchangés" indéfiniment
+        self.poll_scheduler.finish(self.server, changed=False)
+        if self.refresh_timer is not None:
+            self.refresh_timer.stop()
+        print(f"Relecture terminée : {message}")
+        self.latency_label.setText(f"Relecture terminée | {self.poll_scheduler.summary()}")
+
+    def on_data_unchanged(self, latency):
+        self.on_fetch_finished(changed=False)
+        self.latency_label.setText(f"Latence: {latency:.4f} secondes | Données inchangées | "
+                                   f"{self.poll_scheduler.summary()}")
+
     def process_api_data(self, data, latency):
         if not data:  #More robust handling of empty/None data.
             self.latency_label.setText(f"Latence: Erreur lors de la récupération des données")
@@ -340,8 +412,8 @@ class MainWindow(QMainWindow):
 
         self.latency_label.setText(f"Latence: {latency:.4f} secondes")
 
-        if self.data_name and self.data_name.get('items') and self.data_name.get('traits'):
-            results = self.data_processor.process_data(data, self.data_name, self.percentage_threshold,
+        if self.item_index:
+            results = self.data_processor.process_data(data, self.item_index, self.percentage_threshold,
                                                        self.cost_threshold, self.depth, self.mini_profit)
             self.update_api_tree(results)
         else:
@@ -372,14 +444,16 @@ class MainWindow(QMainWindow):
 
 
     def update_api_gui(self, data, latency):  # Runs in the main thread
+        self.on_fetch_finished(changed=bool(data))
         if not data:
-            self.latency_label.setText(f"Latence: Erreur lors de la récupération des données")
+            self.latency_label.setText(f"Latence: Erreur lors de la récupération des données | "
+                                       f"{self.poll_scheduler.summary()}")
             return
 
-        self.latency_label.setText(f"Latence: {latency:.4f} secondes")
+        self.latency_label.setText(f"Latence: {latency:.4f} secondes | {self.poll_scheduler.summary()}")
 
-        if self.data_name and self.data_name.get('items') and self.data_name.get('traits'):
-            results = self.data_processor.process_data(data, self.data_name, self.percentage_threshold,
+        if self.item_index:
+            results = self.data_processor.process_data(data, self.item_index, self.percentage_threshold,
                                                        self.cost_threshold, self.depth, self.mini_profit)
             self.update_api_tree(results)
         else:
@@ -387,8 +461,8 @@ class MainWindow(QMainWindow):
 
 
         def process_and_update_tree():
-            if self.data_name and self.data_name.get('items') and self.data_name.get('traits'):
-                results = self.data_processor.process_data(data, self.data_name, self.percentage_threshold,
+            if self.item_index:
+                results = self.data_processor.process_data(data, self.item_index, self.percentage_threshold,
                                                            self.cost_threshold, self.depth, self.mini_profit)
                 if results:
                     self.api_tree.clear()
@@ -1,32 +1,18 @@
 import aiohttp
 import asyncio
 import json
+import os
+import sys
 from aiofiles import open as aio_open
 
-# Fonction pour décompresser les données (si nécessaire)
-def decompress_data(compressed_data):
-    try:
-        # Implémentation de la décompression selon le besoin
-        # Exemple de décompression, ajuster selon la logique de compression de vos données
-        # Dans ce cas, on assume que c'est déjà au format JSON, et on ne décompresse pas
-        return json.loads(compressed_data.decode('utf-8'))
-    except Exception as e:
-        print(f"Erreur lors de la décompression: {e}")
-        return None
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Snipper"))
+from async_poller import AsyncPoller, TLDB_URL, decode_data_document
+from snapshot_daemon import DEFAULT_ADDRESS, SnapshotClient
+from tldb_urls import data_url
 
-# Fonction pour "unflatten" les données, similaire à devalue.unflatten()
-def unflatten_data(data):
-    unflattened_data = {}
-    for key, value in data.items():
-        keys = key.split('.')
-        d = unflattened_data
-        for part in keys[:-1]:
-            d = d.setdefault(part, {})
-        d[keys[-1]] = value
-    return unflattened_data
 
 # Fonction asynchrone pour récupérer les données de l'API
-async def fetch_auction_house_data():
+async def fetch_auction_house_data(base_url=TLDB_URL):
     try:
         # Définir les en-têtes pour simuler une requête depuis un navigateur
         headers = {
@@ -35,22 +21,12 @@ async def fetch_auction_house_data():
 
         # Faire une requête GET asynchrone pour récupérer les données de l'API avec l'en-tête 'User-Agent'
         async with aiohttp.ClientSession() as session:
-            async with session.get('https://tldb.info/auction-house/__data.json', headers=headers) as response:
+            async with session.get(data_url(base_url), headers=headers) as response:
                 response.raise_for_status()  # Si la requête échoue, elle lèvera une exception
                 api_resp = await response.json()  # Analyser la réponse JSON
 
-        # Extraire les données utiles avec unflatten (similaire à devalue.unflatten)
-        api_data = next(item['data'] for item in api_resp['nodes'] if item.get('type') == 'data')
-
-        # Décompresser les éléments de l'enchère
-        items = decompress_data(api_data['items']) if 'items' in api_data else []
-        traits = api_data.get('traits', {})
-
-        # Créer un objet avec les données à sauvegarder
-        data_to_save = {
-            'items': items,
-            'traits': traits
-        }
+        # Nœud "data" au format devalue, items compressés avec compress_json
+        data_to_save = decode_data_document(api_resp)
 
         # Sauvegarder les données dans un fichier JSON de manière asynchrone
         async with aio_open('auction_house_data.json', 'w', encoding='utf-8') as f:
@@ -61,6 +37,48 @@ async def fetch_auction_house_data():
     except Exception as e:
         print(f'Erreur lors de la récupération des données de l\'API : {e}')
 
+
+# Poller sans interface : affiche chaque snapshot publié pour les serveurs demandés
+async def poll(servers, base_url=TLDB_URL, prices_interval=5.0, data_interval=300.0, duration=None):
+    poller = AsyncPoller(servers, base_url=base_url, prices_interval=prices_interval, data_interval=data_interval)
+    snapshots = poller.subscribe()
+    poller_task = asyncio.create_task(poller.run(duration))
+    try:
+        while (snapshot := await snapshots.get()) is not None:
+            if snapshot.kind == "data":
+                print(f"__data.json : {len(snapshot.data['items'])} items ({snapshot.latency:.3f} s)")
+            else:
+                print(f"Serveur {snapshot.server} : {len(snapshot.data)} items ({snapshot.latency:.3f} s)")
+    finally:
+        poller.stop()
+        await poller_task
+        print(f"Requêtes: {poller.stats.requests}, 304: {poller.stats.not_modified}, "
+              f"erreurs: {poller.stats.errors}, snapshots: {poller.stats.published}")
+
+
+# Abonné au démon local (Snipper/snapshot_daemon.py) : mêmes snapshots, sans fetch ni décodage ici
+def listen(servers, address=DEFAULT_ADDRESS):
+    with SnapshotClient(address, servers=servers or None) as client:
+        for snapshot in client:
+            if snapshot.kind == "data":
+                print(f"__data.json : {len(snapshot.data['items'])} items")
+            else:
+                print(f"Serveur {snapshot.server} : {len(snapshot.data)} items ({client.stats.summary()})")
+
+
 # Exécuter la fonction principale dans un boucle asyncio
+# python ah.py poll 30001 30002 : interroge les serveurs en continu (Ctrl+C pour arrêter)
+# python ah.py listen 30001 : lit les snapshots publiés par le démon local
 if __name__ == '__main__':
-    asyncio.run(fetch_auction_house_data())
+    if sys.argv[1:2] == ['listen']:
+        try:
+            listen(sys.argv[2:], address=os.environ.get("SNAPSHOT_ADDRESS", DEFAULT_ADDRESS))
+        except KeyboardInterrupt:
+            pass
+    elif sys.argv[1:2] == ['poll']:
+        try:
+            asyncio.run(poll(sys.argv[2:] or ["30001"], base_url=TLDB_URL))
+        except KeyboardInterrupt:
+            pass
+    else:
+        asyncio.run(fetch_auction_house_data())
@@ -1,9 +1,21 @@
 import requests
 import json
+import os
+import sys
 import zlib
 import gzip
 from io import BytesIO
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Snipper"))
+from snapshot_log import SnapshotLog
+from tldb_urls import TLDB_URL, data_url, prices_url
+
+# Base de tldb.info (variable d'environnement TLDB_URL) : http://127.0.0.1:8000 pour Benchmarks/stub_server.py
+BASE_URL = TLDB_URL
+# Historique des corps bruts de /api/ah/prices (item_prices_data.json ne garde que le dernier)
+# Un journal par script : SnapshotLog n'accepte qu'un écrivain à la fois
+PRICES_LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prices_log", "fetch_data")
+
 # Fonction pour décompresser les données (gzip ou zlib)
 def decompress_data(compressed_data):
     try:
@@ -33,9 +45,12 @@ def process_data(raw_data):
 def fetch_item_prices():
     try:
         # Récupérer les prix des objets depuis l'API
-        response = requests.get('https://tldb.info/api/ah/prices', headers={'User-Agent': 'Mozilla/5.0'})
+        response = requests.get(prices_url(BASE_URL), headers={'User-Agent': 'Mozilla/5.0'})
         response.raise_for_status()  # Si la requête échoue, elle lèvera une exception
         api_data = response.content  # Récupérer les données sous forme brute (bytes)
+        with SnapshotLog(PRICES_LOG_DIR) as prices_log:
+            if not prices_log.append(api_data):
+                print("Prix identiques au dernier relevé enregistré.")
 
         # Vérifier si les données sont compressées (gzip ou zlib)
         if api_data.startswith(b'\x1f\x8b'):  # Gzip compression check
@@ -68,7 +83,7 @@ def fetch_item_prices():
 def fetch_auctionhouse():
     try:
         # Récupérer les prix des objets depuis l'API
-        response = requests.get('https://tldb.info/auction-house/__data.json', headers={'User-Agent': 'Mozilla/5.0'})
+        response = requests.get(data_url(BASE_URL), headers={'User-Agent': 'Mozilla/5.0'})
         response.raise_for_status()  # Si la requête échoue, elle lèvera une exception
         api_data = response.content  # Récupérer les données sous forme brute (bytes)
 
@@ -1,10 +1,15 @@
 import json
 import requests
-from compress_json import decompress
 import time
+import os
+import sys
 
-# URL de l'API
-url = "https://tldb.info/api/ah/prices"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Snipper"))
+from compressed_json import decompress
+from tldb_urls import TLDB_URL, prices_url
+
+# URL de l'API (variable d'environnement TLDB_URL pour un autre serveur, ex. Benchmarks/stub_server.py)
+url = prices_url(TLDB_URL)
 
 # Configuration des en-têtes HTTP
 headers = {
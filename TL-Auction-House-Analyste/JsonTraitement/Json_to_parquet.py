@@ -1,8 +1,22 @@
-import time
+import os
+import sys
 import numpy as np
 import pandas as pd
 import json
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Snipper"))
+from compressed_json import columns_from_data, decompress_columns
+from price_spread import SpreadMatrix
+from snapshot_delta import DeltaStats, SnapshotDiffer
+
+
+def server_columns(items):
+    """Colonnes des ventes d'un serveur : chaîne compressée (réponse brute de l'API) ou dicts décompressés"""
+    if isinstance(items, str):
+        return decompress_columns(json.loads(items))
+    return columns_from_data(items)
+
+
 # Fonction pour charger et traiter le fichier JSON
 def process_json_to_parquet(input_data_file, input_price_file, output_file):
     # Charger le fichier JSON
@@ -13,45 +27,73 @@ def process_json_to_parquet(input_data_file, input_price_file, output_file):
     # Accéder aux données de la liste
     list_price = price['list']
     list_data = data['items']
-    # Créer une liste pour stocker les lignes de données
-    records = []
+    # Une DataFrame par serveur, construite directement depuis les colonnes (pas de dict par vente)
+    frames = []
     item_data = {item['num']: item['name'] for item in list_data if item['num'] and item['name']}
 
     print(item_data)
     # Extraire les données
 
     for server_id, items in list_price.items():
-        #print(server_id)
-        for item_id, item_price in items.items():
-            quantity = item_price['quantity']
-            #print(quantity)
-            sales = item_price['sales']
-            for sale in sales:
-                item_trait = sale.get('t', np.nan)
-
-                item_num = int(item_id)
-                item_name = item_data.get(item_num, "Unknown")
-                records.append({
-                    's_id': server_id,
-                    #'item_id': item_id,
-                    'i_name': item_name,
-                    #'quantity_on_market': quantity,
-                    's_q': sale['c'],
-                    's_p': sale['p'],
-                    'i_t': item_trait
-                })
-
-    # Convertir en DataFrame Pandas
-    df = pd.DataFrame(records)
+        columns = server_columns(items)
+        frames.append(pd.DataFrame({
+            's_id': [server_id] * len(columns),
+            'i_name': [item_data.get(item_num, "Unknown") for item_num in columns.item],
+            's_q': columns.count,
+            's_p': columns.price,
+            'i_t': [np.nan if trait is None else trait for trait in columns.trait]
+        }))
+
+    # Assembler les serveurs en une seule DataFrame Pandas
+    if frames:
+        df = pd.concat(frames, ignore_index=True)
+    else:
+        df = pd.DataFrame(columns=['s_id', 'i_name', 's_q', 's_p', 'i_t'])
 
     # Enregistrer le DataFrame en format Parquet
     df.to_parquet(output_file, engine='pyarrow', compression='snappy')
 
     print(f"Le fichier Parquet a été créé avec succès : {output_file}")
 
-# Exemple d'appel de la fonction avec un fichier JSON en entrée et un fichier Parquet en sortie
-input_price_file = 'data/item_prices/item_prices_data_2024-11-24T17_52_03.878Z.json'  # Chemin vers votre fichier JSON d'entrée
-input_data_file = 'data/auction_house/auction_house_data_2024-11-24T17_54_01.994Z.json'
-output_file = 'sales_price.parquet'  # Nom du fichier Parquet de sortie
+# Historique en deltas : seules les annonces ajoutées, parties ou re-prix entre deux relevés sont enregistrées
+def process_deltas_to_parquet(previous_price_file, input_price_file, output_file):
+    differ = SnapshotDiffer()
+    with open(previous_price_file, 'r') as f:
+        for server_id, items in json.load(f)['list'].items():
+            differ.diff(server_id, server_columns(items))  # Relevé de référence : événements ignorés
+    differ.stats = DeltaStats()
+
+    with open(input_price_file, 'r') as f:
+        events = [event for server_id, items in json.load(f)['list'].items()
+                  for event in differ.diff(server_id, server_columns(items))]
+
+    df = pd.DataFrame({
+        's_id': [event.server for event in events],
+        'i_id': [event.item for event in events],
+        'i_t': [event.trait for event in events],
+        'kind': [event.kind for event in events],
+        's_p': [event.price for event in events],
+        's_q': [event.count for event in events],
+        'prev_p': [np.nan if event.previous_price is None else event.previous_price for event in events],
+        'n': [event.listings for event in events],
+    })
+    df.to_parquet(output_file, engine='pyarrow', compression='snappy')
+
+    print(f"Le fichier Parquet des deltas a été créé avec succès : {output_file} ({differ.stats.summary()})")
+
+# Plus grands écarts de prix entre serveurs pour un même (item, trait) d'un fichier de process_json_to_parquet
+def print_price_spreads(parquet_file, top=20, by="gap"):
+    matrix = SpreadMatrix.from_parquet(parquet_file)
+    for spread in matrix.top(top, by=by):
+        print(f"{spread['Name']} ({spread['Trait']}) : {spread['Low Server']} {spread['Low Price']} -> "
+              f"{spread['High Server']} {spread['High Price']} (+{spread['Gap']}, {spread['Gap (%)']} %, "
+              f"{spread['Servers']} serveurs)")
+    return matrix
+
+if __name__ == "__main__":
+    # Exemple d'appel de la fonction avec un fichier JSON en entrée et un fichier Parquet en sortie
+    input_price_file = 'data/item_prices/item_prices_data_2024-11-24T17_52_03.878Z.json'  # Chemin vers votre fichier JSON d'entrée
+    input_data_file = 'data/auction_house/auction_house_data_2024-11-24T17_54_01.994Z.json'
+    output_file = 'sales_price.parquet'  # Nom du fichier Parquet de sortie
 
-process_json_to_parquet(input_data_file, input_price_file, output_file)
+    process_json_to_parquet(input_data_file, input_price_file, output_file)
@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import aiohttp
+
+from compressed_json import decompress, decompress_columns
+from devalue import unflatten
+from prices_client import HEADERS
+from prices_parser import extract_server_payloads
+from snapshot_delta import SnapshotDiffer
+from tldb_urls import DATA_PATH, PRICES_PATH, TLDB_URL
+
+
+@dataclass
+class Snapshot:
+    kind: str  # "prices" (un serveur), "delta" (DeltaEvent depuis le snapshot précédent) ou "data" (__data.json)
+    server: Optional[str]
+    data: Any
+    fetched_at: float  # time.time() de la réponse
+    latency: float  # Requête + décodage, en secondes
+
+
+@dataclass
+class PollerStats:
+    requests: int = 0
+    not_modified: int = 0
+    unchanged: int = 0  # Corps ou chaîne serveur identique : pas de décodage
+    errors: int = 0
+    published: int = 0
+    publish_wait: float = 0.0  # Temps passé bloqué sur des files d'abonnés pleines (backpressure)
+    last_error: Optional[str] = None
+    latencies: deque = field(default_factory=lambda: deque(maxlen=1000))  # Derniers snapshots publiés
+
+
+def decode_data_document(document):
+    """Catalogue {"items", "traits"} d'un document __data.json (nœud "data" au format devalue)."""
+    data_node = next((node for node in document.get("nodes", []) if node and node.get("type") == "data"), None)
+    if data_node is None:
+        raise ValueError("Aucun nœud avec 'type: data' trouvé.")
+    unflattened_data = unflatten(data_node["data"])
+    return {"items": decompress(unflattened_data["items"]), "traits": unflattened_data["traits"]}
+
+
+class AsyncPoller:
+    """Interroge /api/ah/prices et __data.json avec une seule ClientSession, chacun à son propre rythme.
+
+    Chaque serveur dont la chaîne a changé est décodé (hors de la boucle asyncio) et publié comme un
+    Snapshot dans la file de chaque abonné. Les files sont bornées : un abonné lent fait attendre le
+    poller plutôt que de laisser les snapshots s'accumuler en mémoire.
+    Avec deltas=True, chaque snapshot "prices" est suivi d'un snapshot "delta" (voir snapshot_delta.py).
+    Avec un recorder (snapshot_log.SnapshotLog), chaque nouveau corps de /api/ah/prices est archivé.
+    """
+
+    def __init__(self, servers, base_url=TLDB_URL, prices_interval=5.0, data_interval=300.0, timeout=10,
+                 columnar=False, queue_size=8, deltas=False,
+                 recorder=None):
+        self.servers = list(servers)
+        self.base_url = base_url.rstrip("/")
+        self.prices_interval = prices_interval
+        self.data_interval = data_interval
+        self.timeout = timeout
+        self.columnar = columnar
+        self.queue_size = queue_size
+        self.differ = SnapshotDiffer() if deltas else None
+        self.recorder = recorder
+
+        self.subscribers = []
+        self.stats = PollerStats()
+        self.etags = {}
+        self.body_hashes = {}
+        self.server_payloads = {}
+        self.session = None
+        self.stopped = None
+
+    def subscribe(self, maxsize=None):
+        """Nouvelle file d'abonné ; reçoit des Snapshot, puis None à l'arrêt du poller."""
+        queue = asyncio.Queue(maxsize=self.queue_size if maxsize is None else maxsize)
+        self.subscribers.append(queue)
+        return queue
+
+    def add_servers(self, servers):
+        """Suit de nouveaux serveurs ; le prochain fetch de /api/ah/prices est relu même s'il n'a pas changé."""
+        new_servers = [server for server in servers if server not in self.servers]
+        if new_servers:
+            self.servers.extend(new_servers)
+            self.etags.pop(PRICES_PATH, None)
+            self.body_hashes.pop(PRICES_PATH, None)
+        return new_servers
+
+    async def publish(self, snapshot):
+        start_time = time.perf_counter()
+        for queue in self.subscribers:
+            await queue.put(snapshot)
+        self.stats.publish_wait += time.perf_counter() - start_time
+        if snapshot is not None:
+            self.stats.published += 1
+
+    async def fetch(self, path):
+        """Corps de la réponse, ou None si inchangé (304 ou corps identique au précédent)."""
+        headers = {"If-None-Match": self.etags[path]} if path in self.etags else {}
+        async with self.session.get(self.base_url + path, headers=headers) as response:
+            self.stats.requests += 1
+            if response.status == 304:
+                self.stats.not_modified += 1
+                return None
+            response.raise_for_status()
+            body = await response.read()
+            if "ETag" in response.headers:
+                self.etags[path] = response.headers["ETag"]
+
+        body_hash = hashlib.blake2b(body, digest_size=16).digest()
+        if self.body_hashes.get(path) == body_hash:
+            self.stats.unchanged += 1
+            return None
+        self.body_hashes[path] = body_hash
+        return body
+
+    def decode_prices(self, body):
+        """Décode les serveurs suivis dont la chaîne a changé (exécuté dans un thread)."""
+        decode = decompress_columns if self.columnar else decompress
+        decoded = {}
+        for server, payload in extract_server_payloads(body, self.servers).items():
+            if self.server_payloads.get(server) == payload:
+                self.stats.unchanged += 1
+                continue
+            self.server_payloads[server] = payload
+            decoded[server] = decode(json.loads(payload))
+        return decoded
+
+    def diff_prices(self, decoded):
+        """Événements de chaque serveur décodé depuis son snapshot précédent (exécuté dans un thread)."""
+        return {server: self.differ.diff(server, data) for server, data in decoded.items()}
+
+    def decode_data(self, body):
+        return decode_data_document(json.loads(body))
+
+    async def poll_prices_once(self):
+        start_time = time.perf_counter()
+        body = await self.fetch(PRICES_PATH)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        if self.recorder is not None:
+            await loop.run_in_executor(None, self.recorder.append, body)
+        decoded = await loop.run_in_executor(None, self.decode_prices, body)
+        deltas = await loop.run_in_executor(None, self.diff_prices, decoded) if self.differ is not None else {}
+        latency = time.perf_counter() - start_time
+        for server in self.servers:
+            if server in decoded:
+                self.stats.latencies.append(latency)
+                await self.publish(Snapshot("prices", server, decoded[server], time.time(), latency))
+            if server in deltas:
+                await self.publish(Snapshot("delta", server, deltas[server], time.time(), latency))
+
+    async def poll_data_once(self):
+        start_time = time.perf_counter()
+        body = await self.fetch(DATA_PATH)
+        if body is None:
+            return
+        data = await asyncio.get_running_loop().run_in_executor(None, self.decode_data, body)
+        await self.publish(Snapshot("data", None, data, time.time(), time.perf_counter() - start_time))
+
+    async def schedule(self, poll_once, interval):
+        """Relance poll_once toutes les `interval` secondes (durée de la requête comprise) jusqu'à l'arrêt."""
+        while not self.stopped.is_set():
+            start_time = time.perf_counter()
+            try:
+                await poll_once()
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                self.stats.errors += 1
+                self.stats.last_error = f"{type(e).__name__}: {e}"
+            delay = max(0.0, interval - (time.perf_counter() - start_time))
+            try:
+                await asyncio.wait_for(self.stopped.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        if self.stopped is not None:
+            self.stopped.set()
+
+    async def run(self, duration=None):
+        """Interroge jusqu'à stop() (ou pendant `duration` secondes), puis envoie None aux abonnés."""
+        self.stopped = asyncio.Event()
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout) as session:
+            self.session = session
+            tasks = [asyncio.create_task(self.schedule(self.poll_prices_once, self.prices_interval))]
+            if self.data_interval is not None:
+                tasks.append(asyncio.create_task(self.schedule(self.poll_data_once, self.data_interval)))
+            try:
+                if duration is None:
+                    await self.stopped.wait()
+                else:
+                    try:
+                        await asyncio.wait_for(self.stopped.wait(), timeout=duration)
+                    except asyncio.TimeoutError:
+                        self.stop()
+                # Une requête en cours peut se terminer ; une publication bloquée par un abonné arrêté est annulée
+                await asyncio.wait(tasks, timeout=self.timeout)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                self.session = None
+        self.close_subscribers()
+
+    def close_subscribers(self):
+        """Envoie None à chaque abonné sans bloquer : une file pleine perd son plus ancien snapshot."""
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
@@ -0,0 +1,112 @@
+"""Plan d'achat par groupe (item, trait) : prix de N unités, nombre d'unités achetables pour un budget.
+
+Les annonces d'un groupe sont triées et cumulées (coût, quantité) une seule fois ; chaque question est
+ensuite une dichotomie dans ces tableaux, O(log n), quel que soit le nombre de budgets essayés. Une
+annonce peut être achetée en partie, comme avec la profondeur en unités de data_processor.
+"""
+import bisect
+from operator import itemgetter
+
+from data_processor import DEPTH_UNITS, TAX_RATE, DataProcessor, cumulative_sums
+
+
+class OrderBook:
+    """Annonces d'un groupe triées par prix, avec leurs coût et quantité cumulés."""
+
+    def __init__(self, rows):
+        self.prices = sorted(rows, key=itemgetter(0))  # (p, c), tri stable comme evaluate_group
+        self.cumulative_cost, self.cumulative_quantity = cumulative_sums(self.prices)
+
+    @property
+    def total_units(self):
+        return self.cumulative_quantity[-1]
+
+    def listing_of(self, unit):
+        """Position de l'annonce qui contient la unit-ième unité la moins chère (unit >= 1)."""
+        return bisect.bisect_left(self.cumulative_quantity, unit) - 1
+
+    def depth_units(self, depth, depth_unit="listings"):
+        """Unités achetées à la profondeur depth, comptée comme DataProcessor(depth_unit=...), ou None.
+
+        En annonces, ce sont les unités des depth annonces les moins chères (None s'il y en a moins).
+        """
+        if depth_unit not in DEPTH_UNITS:
+            raise ValueError(f"Unité de profondeur inconnue : {depth_unit} (attendu : {', '.join(DEPTH_UNITS)})")
+        if depth_unit == "units":
+            return depth
+        if depth > len(self.prices):
+            return None
+        return self.cumulative_quantity[depth]
+
+    def cost_of(self, units):
+        """Coût minimal de units unités, ou None s'il n'y en a pas autant en vente."""
+        if units <= 0:
+            return 0
+        if units > self.total_units:
+            return None
+        listing = self.listing_of(units)
+        return self.cumulative_cost[listing] + (units - self.cumulative_quantity[listing]) * self.prices[listing][0]
+
+    def units_for(self, budget):
+        """Nombre maximal d'unités achetables avec budget, et leur coût."""
+        if budget < 0:
+            return 0, 0
+        # Annonces achetables entières : cumulative_cost[full] <= budget
+        full = bisect.bisect_right(self.cumulative_cost, budget) - 1
+        if full == len(self.prices):
+            return self.total_units, self.cumulative_cost[-1]
+        price = self.prices[full][0]  # > 0 : une annonce gratuite serait comptée dans les annonces entières
+        partial = int((budget - self.cumulative_cost[full]) // price)
+        units = self.cumulative_quantity[full] + partial
+        return units, self.cumulative_cost[full] + partial * price
+
+    def next_price(self, units):
+        """Prix de l'unité suivante après en avoir acheté units, ou None si le groupe est épuisé."""
+        if units >= self.total_units:
+            return None
+        return self.prices[self.listing_of(units + 1)][0]
+
+    def profit(self, units):
+        """Profit d'un achat de units unités revendues au prix de l'unité suivante (après taxe), ou None."""
+        cost, resale_price = self.cost_of(units), self.next_price(units)
+        if cost is None or resale_price is None:
+            return None
+        return resale_price * TAX_RATE * units - cost
+
+
+class BuyoutPlanner:
+    """Carnets d'ordres d'un snapshot, construits à la demande et gardés jusqu'au snapshot suivant.
+
+    Les groupes sont ceux de DataProcessor.group_sales ; on les retrouve par identifiants (item_id, trait)
+    ou par les noms affichés dans l'arbre de Snipper (Name, Trait).
+    """
+
+    def __init__(self, data, item_index):
+        self.data = data
+        self.item_index = item_index
+        self.rows = None  # (item_id, trait) -> [(p, c), ...]
+        self.names = None  # (Name, Trait) affichés -> (item_id, trait)
+        self.books = {}
+
+    def load_groups(self):
+        self.rows, self.names = {}, {}
+        for item_id, trait, rows in DataProcessor().group_sales(self.data):
+            self.rows[item_id, trait] = rows
+            names = (self.item_index.name(item_id), self.item_index.trait_name(trait))
+            self.names.setdefault(names, (item_id, trait))  # Noms en double : le premier groupe
+
+    def book(self, item_id, trait):
+        """Carnet du groupe, ou None s'il n'a aucune vente dans ce snapshot."""
+        if self.rows is None:
+            self.load_groups()
+        key = (item_id, trait)
+        book = self.books.get(key)
+        if book is None and key in self.rows:
+            book = self.books[key] = OrderBook(self.rows[key])
+        return book
+
+    def book_by_name(self, name, trait):
+        if self.names is None:
+            self.load_groups()
+        key = self.names.get((name, trait))
+        return None if key is None else self.book(*key)
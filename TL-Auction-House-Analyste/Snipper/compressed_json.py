@@ -0,0 +1,230 @@
+"""Décodeur du format compress_json utilisé par tldb.info pour /api/ah/prices et les items de __data.json.
+
+Même résultat que compress_json.decompress, mais chaque entrée de la table des valeurs n'est décodée
+qu'une seule fois : les sous-objets partagés (schémas de clés, ventes identiques, nombres) sont
+réutilisés au lieu d'être redécodés à chaque référence. Les objets identiques du payload sont donc
+le même objet Python : ne pas les modifier en place.
+"""
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+DIGIT_VALUES = {digit: value for value, digit in enumerate(DIGITS)}
+
+_MISSING = object()
+
+
+def s_to_int(s):
+    """Entier encodé en base 62 (clés de la table des valeurs et nombres entiers)."""
+    acc = 0
+    for digit in s:
+        acc = acc * BASE + DIGIT_VALUES[digit]
+    return acc
+
+
+def s_to_int_str(s):
+    if s[0] == ':':
+        s = s[1:]  # Entier au-delà de 2**53
+    return str(s_to_int(s))
+
+
+def s_to_num(s):
+    if s[0] == '-':
+        return -s_to_num(s[1:])
+
+    parts = s.split('.')
+    if len(parts) == 1:
+        return s_to_int(s)
+
+    # Partie entière, partie décimale écrite à l'envers, exposant éventuel
+    string = s_to_int_str(parts[0]) + '.' + s_to_int_str(parts[1])[::-1]
+    if len(parts) == 3:
+        exponent = parts[2]
+        if exponent[0] == '-':
+            string += 'e-' + s_to_int_str(exponent[1:])
+        else:
+            string += 'e' + s_to_int_str(exponent)
+    return float(string)
+
+
+class Decoder:
+    """Décode une table de valeurs compress_json, avec mémoïsation par entrée et par clé."""
+
+    def __init__(self, values):
+        self.values = values
+        self.decoded = [_MISSING] * len(values)
+        self.key_ids = {}
+
+    def key_id(self, key):
+        key_id = self.key_ids.get(key)
+        if key_id is None:
+            if type(key) is int:
+                key_id = key
+            elif type(key) is float:
+                key_id = int(key)
+            else:
+                key_id = s_to_int(key)
+            self.key_ids[key] = key_id
+        return key_id
+
+    def decode(self, key):
+        if key == '' or key == '_':
+            return None
+
+        key_id = self.key_id(key)
+        value = self.decoded[key_id]
+        if value is _MISSING:
+            value = self.decoded[key_id] = self.decode_value(self.values[key_id])
+        return value
+
+    def decode_value(self, v):
+        if v is None:
+            return None
+
+        data_class = type(v)
+        if data_class is int or data_class is float:
+            return v
+
+        if data_class is str:
+            prefix = v[0:2]
+            if prefix == 'o|':
+                return self.decode_object(v)
+            if prefix == 'a|':
+                return self.decode_array(v)
+            if prefix == 'n|':
+                return s_to_num(v[2:])
+            if prefix == 'b|':
+                if v == 'b|T':
+                    return True
+                return v != 'b|F'
+            if prefix == 's|':
+                return v[2:]
+            # Comme compress_json, 'N|+' / 'N|-' / 'N|0' restent des chaînes
+            return v
+
+        raise Exception(f"unknown data type: {data_class}, v: {v}")
+
+    def decode_object(self, s):
+        if s == 'o|':
+            return {}
+        vs = s.split('|')
+        keys = self.decode(vs[1])
+        if len(vs) == 3 and type(keys) is not list:
+            keys = [keys]  # Objet à une seule clé réutilisant une valeur existante comme clé
+        decode = self.decode
+        return {keys[i]: decode(v) for i, v in enumerate(vs[2:])}
+
+    def decode_array(self, s):
+        if s == 'a|':
+            return []
+        decode = self.decode
+        return [decode(v) for v in s.split('|')[1:]]
+
+
+def decompress(c):
+    """Équivalent de compress_json.decompress."""
+    values, root = c
+    return Decoder(values).decode(root)
+
+
+class SalesColumns:
+    """Ventes d'un serveur rangées par colonnes, une ligne par vente, dans l'ordre du payload.
+
+    item : identifiant numérique de l'item, trait : valeur de 't' (None si la vente n'en a pas),
+    price / count : 'p' et 'c' de la vente, quantity : 'quantity' de l'item, répétée sur chaque vente.
+    Les ventes d'un même item sont contiguës.
+    """
+
+    def __init__(self):
+        self.item = []
+        self.trait = []
+        self.price = []
+        self.count = []
+        self.quantity = []
+
+    def __len__(self):
+        return len(self.item)
+
+    def extend_item(self, item_id, quantity, sales):
+        """Ajoute les ventes d'un item, données comme des tuples (p, c, t)."""
+        self.item.extend([item_id] * len(sales))
+        self.quantity.extend([quantity] * len(sales))
+        for price, count, trait in sales:
+            self.price.append(price)
+            self.count.append(count)
+            self.trait.append(trait)
+
+
+def columns_from_data(data):
+    """Colonnes d'un payload serveur déjà décompressé ({item_id: {"quantity", "sales"}})."""
+    columns = SalesColumns()
+    for item_id, item_data in data.items():
+        columns.extend_item(int(item_id), item_data.get("quantity"),
+                            [(sale['p'], sale['c'], sale.get('t')) for sale in item_data.get("sales", [])])
+    return columns
+
+
+class ColumnsDecoder(Decoder):
+    """Décode un payload de prix directement en SalesColumns, sans créer de dict par vente ni par item."""
+
+    def __init__(self, values):
+        super().__init__(values)
+        self.sales = {}  # Identifiant de valeur -> (p, c, t), chaque vente distincte n'est lue qu'une fois
+        self.sale_schemas = {}  # Identifiant du tableau de clés -> positions de 'p', 'c' et 't'
+
+    def object_fields(self, s):
+        """(clés, identifiants des valeurs) d'un objet encodé, sans décoder les valeurs."""
+        vs = s.split('|')
+        keys = self.decode(vs[1])
+        if len(vs) == 3 and type(keys) is not list:
+            keys = [keys]
+        return keys, vs[2:]
+
+    def sale(self, key):
+        sale = self.sales.get(key)
+        if sale is None:
+            vs = self.values[self.key_id(key)].split('|')
+            schema = self.sale_schemas.get(vs[1])
+            if schema is None:
+                keys = self.decode(vs[1])
+                if len(vs) == 3 and type(keys) is not list:
+                    keys = [keys]
+                # ValueError si 'p' ou 'c' manque
+                schema = self.sale_schemas[vs[1]] = (keys.index('p') + 2, keys.index('c') + 2,
+                                                     keys.index('t') + 2 if 't' in keys else None)
+            price, count, trait = schema
+            sale = self.sales[key] = (self.decode(vs[price]), self.decode(vs[count]),
+                                      None if trait is None else self.decode(vs[trait]))
+        return sale
+
+    def columns(self, root):
+        root_value = self.values[self.key_id(root)]
+        if type(root_value) is not str or not root_value.startswith('o|'):
+            raise ValueError("Le payload n'est pas un objet {item_id: ...}")
+
+        columns = SalesColumns()
+        if root_value == 'o|':
+            return columns
+        item_ids, items = self.object_fields(root_value)
+        for item_id, item in zip(item_ids, items):
+            item_value = self.values[self.key_id(item)]
+            if item_value == 'o|':
+                continue
+            fields = dict(zip(*self.object_fields(item_value)))
+            sales_value = self.values[self.key_id(fields["sales"])] if "sales" in fields else 'a|'
+            if sales_value == 'a|':
+                sales = []
+            else:
+                sale = self.sale
+                sales = [sale(key) for key in sales_value.split('|')[1:]]
+            quantity = self.decode(fields["quantity"]) if "quantity" in fields else None
+            columns.extend_item(int(item_id), quantity, sales)
+        return columns
+
+
+def decompress_columns(c):
+    """Décode un payload /api/ah/prices d'un serveur directement en colonnes (voir SalesColumns).
+
+    Même contenu que columns_from_data(decompress(c)), sans l'arbre de dicts intermédiaire.
+    """
+    values, root = c
+    return ColumnsDecoder(values).columns(root)
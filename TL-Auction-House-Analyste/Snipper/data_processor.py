@@ -0,0 +1,284 @@
+import hashlib
+from operator import itemgetter
+
+from compressed_json import SalesColumns
+from results_cache import ResultsCache, TopResults, passes_thresholds, result_row
+
+ENGINES = ("python", "numpy")
+DEPTH_UNITS = ("listings", "units")
+TAX_RATE = 0.77
+
+
+def cumulative_sums(prices, listings=None, units=None):
+    """Coût et quantité cumulés des annonces triées : cost[i], quantity[i] pour les i premières (cost[0] = 0).
+
+    Seul le préfixe utile est cumulé : au plus `listings` annonces, ou jusqu'à dépasser `units` unités.
+    """
+    cumulative_cost, cumulative_quantity = [0], [0]
+    for p, c in prices[:listings]:
+        if units is not None and cumulative_quantity[-1] > units:
+            break
+        cumulative_cost.append(cumulative_cost[-1] + p * c)
+        cumulative_quantity.append(cumulative_quantity[-1] + c)
+    return cumulative_cost, cumulative_quantity
+
+
+def new_columns():
+    return [], [], [], [], [], []  # Profondeur, coût, profit, rentabilité, prix de l'item, prix de vente
+
+
+def append_row(columns, depth, total_cost, item_price, sale_price):
+    """Ajoute la ligne d'une profondeur : achat pour total_cost, revente de depth unités à item_price taxé."""
+    if depth == 0:
+        instant_profit = profitability = 0
+    else:
+        instant_profit = item_price * TAX_RATE * depth - total_cost  # Rentabilité après taxe
+        profitability = (instant_profit / total_cost) * 100  # Rentabilité en pourcentage
+    depths, costs, instant_profits, profitabilities, item_prices, sale_prices = columns
+    depths.append(depth)
+    costs.append(total_cost)
+    instant_profits.append(round(instant_profit, 2))
+    profitabilities.append(int(round(profitability, 2)))
+    item_prices.append(item_price)
+    sale_prices.append(sale_price)
+
+
+def evaluate_listings(prices, depth, max_cost=None):
+    """Profondeur en annonces : acheter les depth premières, revendre au prix de la suivante. Linéaire."""
+    max_depth = min(depth, len(prices) - 1)
+    cumulative_cost, _ = cumulative_sums(prices, listings=max_depth)
+    columns = new_columns()
+    for depth_incr in range(max_depth + 1):
+        total_cost = cumulative_cost[depth_incr]
+        if max_cost is not None and total_cost > max_cost:
+            break  # Le coût ne fait que croître avec la profondeur : aucune ligne suivante ne passe
+        # Prix de l'item étudié (revente) et prix de vente théorique (celui de l'item suivant)
+        sale_price = prices[depth_incr + 1][0] if depth_incr + 1 < len(prices) else -1
+        append_row(columns, depth_incr, total_cost, prices[depth_incr][0], sale_price)
+    return columns
+
+
+def evaluate_units(prices, depth, max_cost=None):
+    """Profondeur en unités ('c') : acheter les depth unités les moins chères, la dernière annonce en partie.
+
+    La revente se fait au prix de la prochaine unité disponible, comme en mode annonces. Une seule passe :
+    l'annonce qui contient la prochaine unité avance avec la profondeur.
+    """
+    cumulative_cost, cumulative_quantity = cumulative_sums(prices, units=depth)  # Jusqu'à l'unité depth + 1
+    columns = new_columns()
+    listing = 0
+    for units in range(min(depth, cumulative_quantity[-1] - 1) + 1):
+        while cumulative_quantity[listing + 1] <= units:
+            listing += 1
+        # Les `listing` premières annonces entières, puis une partie de l'annonce `listing`
+        price = prices[listing][0]
+        total_cost = cumulative_cost[listing] + (units - cumulative_quantity[listing]) * price
+        if max_cost is not None and total_cost > max_cost:
+            break
+        if units + 1 < cumulative_quantity[listing + 1]:
+            sale_price = price  # L'unité d'après est dans la même annonce
+        else:
+            sale_price = prices[listing + 1][0] if listing + 1 < len(prices) else -1
+        append_row(columns, units, total_cost, price, sale_price)
+    return columns
+
+
+class DataProcessor:
+    def __init__(self, engine="python", incremental=False, top_k=None, depth_unit="listings"):
+        if engine not in ENGINES:
+            raise ValueError(f"Moteur inconnu : {engine} (attendu : {', '.join(ENGINES)})")
+        if incremental and engine != "python":
+            raise ValueError("Le mode incrémental n'est disponible qu'avec le moteur python")
+        if depth_unit not in DEPTH_UNITS:
+            raise ValueError(f"Unité de profondeur inconnue : {depth_unit} (attendu : {', '.join(DEPTH_UNITS)})")
+        if depth_unit != "listings" and engine != "python":
+            raise ValueError("La profondeur en unités n'est disponible qu'avec le moteur python")
+        self.engine = engine
+        self.incremental = incremental
+        # None : tous les résultats ; sinon seuls les top_k meilleurs, sélectionnés pendant la génération
+        self.top_k = top_k
+        # Profondeur comptée en annonces achetées, ou en unités ('c') achetées
+        self.depth_unit = depth_unit
+
+        # Cache du mode incrémental : (item_id, trait) -> (empreinte des ventes, profondeur, résultats bruts)
+        self.group_cache = {}
+        self.cache_index = None
+        self.groups_reused = 0
+        self.groups_recomputed = 0
+
+        # Résultats bruts du dernier snapshot, pour refiltrer quand les seuils changent
+        self.results_cache = None
+
+    def process_data(self, data, item_index, percentage_threshold, cost_threshold, depth, mini_profit):
+        if self.top_k is not None:
+            self.results_cache = None  # Rien à refiltrer : un changement de seuil relance l'analyse
+            return self.select_top(data, item_index, percentage_threshold, cost_threshold, depth, mini_profit)
+        self.results_cache = self.analyse(data, item_index, depth)
+        return self.results_cache.filter(percentage_threshold, cost_threshold, mini_profit)
+
+    def select_top(self, data, item_index, percentage_threshold, cost_threshold, depth, mini_profit):
+        """Les top_k meilleurs résultats (ordre de process_data), sans garder ni trier toutes les lignes brutes."""
+        if self.engine == "numpy":
+            from numpy_engine import analyse_numpy
+            return analyse_numpy(data, item_index, depth).filter(percentage_threshold, cost_threshold, mini_profit,
+                                                                 limit=self.top_k)
+        if hasattr(data, "to_columns"):
+            data = data.to_columns()
+
+        top = TopResults(self.top_k)
+        if self.incremental:
+            groups = self.iter_incremental(data, item_index, depth)
+        else:
+            groups = (self.evaluate_group(name, trait, rows, item_index, depth, max_cost=cost_threshold)
+                      for name, trait, rows in self.group_sales(data) if len(rows) >= 5)
+        for group_key, columns in groups:
+            for row in zip(*columns):
+                _, cost, instant_profit, profitability = row[:4]
+                if passes_thresholds(profitability, cost, instant_profit, percentage_threshold, cost_threshold,
+                                     mini_profit):
+                    # Le dict n'est construit que pour une ligne qui entre dans le tas
+                    top.push(instant_profit, lambda: result_row(group_key, *row))
+        return top.results()
+
+    def refilter(self, percentage_threshold, cost_threshold, depth, mini_profit):
+        """Refiltre le dernier snapshot avec de nouveaux seuils, ou None si la profondeur n'a pas été calculée."""
+        results_cache = self.results_cache
+        if results_cache is None or not results_cache.covers(depth):
+            return None
+        return results_cache.filter(percentage_threshold, cost_threshold, mini_profit, depth)
+
+    def analyse(self, data, item_index, depth):
+        """Calcule les résultats bruts (non filtrés) d'un snapshot pour les profondeurs 0..depth."""
+        if self.engine == "numpy":
+            from numpy_engine import analyse_numpy  # numpy n'est requis que pour ce moteur
+            return analyse_numpy(data, item_index, depth)
+        if hasattr(data, "to_columns"):
+            data = data.to_columns()  # Vue en mémoire partagée (shared_snapshot.SnapshotView) : copiée en listes
+
+        if self.incremental:
+            return self.evaluate_incremental(data, item_index, depth)
+
+        results_cache = ResultsCache(depth)
+        for name, trait, rows in self.group_sales(data):
+            if len(rows) < 5:
+                continue
+            results_cache.add_group(*self.evaluate_group(name, trait, rows, item_index, depth))
+        return results_cache
+
+    def group_sales(self, data):
+        """Ventes regroupées par (item, trait) : liste de (item_id, trait, [(p, c), ...]) dans l'ordre du payload.
+
+        data est soit le payload décompressé en dicts, soit ses colonnes (compressed_json.SalesColumns).
+        """
+        if isinstance(data, SalesColumns):
+            return self.group_columns(data)
+
+        grouped_data = []
+        # Parcours des items
+        for item_id, item_data in data.items():
+            sales = item_data.get("sales", [])
+
+            # Si le premier élément contient un trait
+            if 't' in sales[0]:
+                # Création d'un dictionnaire des ventes par trait pour éviter des boucles imbriquées
+                trait_sales = {}
+                for sale in sales:
+                    trait = sale.get('t')
+                    if trait:
+                        if trait not in trait_sales:
+                            trait_sales[trait] = []
+                        trait_sales[trait].append((sale['p'], sale['c']))
+
+                # Ajout des données traitées pour chaque trait
+                for trait, rows in trait_sales.items():
+                    grouped_data.append((item_id, str(trait), rows))
+
+            else:
+                # Si aucun trait, on ajoute la donnée sans transformation
+                grouped_data.append((item_id, "NULL", [(sale['p'], sale['c']) for sale in sales]))
+        return grouped_data
+
+    def group_columns(self, columns):
+        """Même regroupement que group_sales, directement depuis les colonnes (ventes d'un item contiguës)."""
+        grouped_data = []
+        current_item = None
+        for item_id, trait, price, count in zip(columns.item, columns.trait, columns.price, columns.count):
+            if item_id != current_item:
+                # Nouvel item : c'est sa première vente qui décide s'il est regroupé par trait
+                current_item = item_id
+                trait_mode = trait is not None
+                trait_sales = {}
+                if not trait_mode:
+                    rows = []
+                    grouped_data.append((str(item_id), "NULL", rows))
+
+            if trait_mode:
+                if not trait:
+                    continue
+                rows = trait_sales.get(trait)
+                if rows is None:
+                    rows = trait_sales[trait] = []
+                    grouped_data.append((str(item_id), str(trait), rows))
+            rows.append((price, count))
+        return grouped_data
+
+    def evaluate_group(self, name, trait, rows, item_index, depth, max_cost=None):
+        """Résultats bruts (non filtrés) d'un groupe (item, trait) pour les profondeurs 0..depth.
+
+        Renvoie ((Name, Trait, Occurrences), colonnes) où les colonnes sont indexées par profondeur.
+        Avec max_cost, la génération s'arrête à la première profondeur dont le coût le dépasse.
+        """
+        # Trier les prix par ordre croissant
+        prices = sorted(rows, key=itemgetter(0))  # Tri par prix croissant, (p, c)
+
+        # Résolution des noms une seule fois par groupe grâce à l'index
+        group_key = (item_index.name(name), item_index.trait_name(trait), len(rows))
+        if self.depth_unit == "units":
+            return group_key, evaluate_units(prices, depth, max_cost)
+        return group_key, evaluate_listings(prices, depth, max_cost)
+
+    def evaluate_incremental(self, data, item_index, depth):
+        """Ne recalcule que les groupes dont les ventes ont changé depuis le snapshot précédent."""
+        results_cache = ResultsCache(depth)
+        for group_key, columns in self.iter_incremental(data, item_index, depth):
+            results_cache.add_group(group_key, columns)
+        return results_cache
+
+    def iter_incremental(self, data, item_index, depth):
+        """(group_key, colonnes) de chaque groupe, depuis le cache quand ses ventes n'ont pas changé."""
+        if item_index is not self.cache_index:
+            self.group_cache = {}
+            self.cache_index = item_index
+
+        new_cache = {}
+        reused = recomputed = 0
+        for name, trait, rows in self.group_sales(data):
+            if len(rows) < 5:
+                continue
+            # Empreinte : les (p, c) dans l'ordre du payload (l'ordre départage les prix égaux au tri)
+            fingerprint = tuple(rows)
+            cached = self.group_cache.get((name, trait))
+
+            if cached is not None and cached[0] == fingerprint and cached[1] >= depth:
+                # On garde en cache la profondeur la plus grande déjà calculée
+                new_cache[(name, trait)] = cached
+                group_key, columns = cached[2]
+                if cached[1] > depth:
+                    # Les colonnes sont indexées par profondeur (0, 1, 2...) : on tronque
+                    columns = [column[:depth + 1] for column in columns]
+                reused += 1
+            else:
+                group_key, columns = self.evaluate_group(name, trait, rows, item_index, depth)
+                new_cache[(name, trait)] = (fingerprint, depth, (group_key, columns))
+                recomputed += 1
+
+            yield group_key, columns
+
+        # Les groupes disparus du snapshot sont oubliés
+        self.group_cache = new_cache
+        self.groups_reused = reused
+        self.groups_recomputed = recomputed
+
+    def generate_item_id(self, item):
+        hash_string = f"{item['Name']}{item['Trait']}"
+        return hashlib.md5(hash_string.encode()).hexdigest()
@@ -0,0 +1,156 @@
+"""Lecture du format devalue (SvelteKit) des nœuds de https://tldb.info/auction-house/__data.json.
+
+Le payload est une liste plate de valeurs où chaque conteneur référence ses enfants par leur indice.
+unflatten reconstruit l'objet sans récursion : chaque indice est hydraté une seule fois (mémoïsation
+par sentinelle, les valeurs None et les conteneurs partagés compris), en temps linéaire.
+"""
+import array
+import base64
+import sys
+
+# Indices spéciaux de devalue
+UNDEFINED = -1
+HOLE = -2
+NAN = -3
+POSITIVE_INFINITY = -4
+NEGATIVE_INFINITY = -5
+NEGATIVE_ZERO = -6
+
+SPECIAL_VALUES = {
+    UNDEFINED: None,
+    HOLE: None,
+    NAN: float('nan'),
+    POSITIVE_INFINITY: float('inf'),
+    NEGATIVE_INFINITY: float('-inf'),
+    NEGATIVE_ZERO: -0.0,
+}
+
+# Typed arrays JavaScript -> typecode de array.array (même taille d'élément)
+TYPED_ARRAYS = {
+    "Int8Array": 'b',
+    "Uint8Array": 'B',
+    "Uint8ClampedArray": 'B',
+    "Int16Array": 'h',
+    "Uint16Array": 'H',
+    "Int32Array": 'i',
+    "Uint32Array": 'I',
+    "Float32Array": 'f',
+    "Float64Array": 'd',
+    "BigInt64Array": 'q',
+    "BigUint64Array": 'Q',
+}
+
+_MISSING = object()
+
+
+class Unflattener:
+    def __init__(self, values, revivers=None):
+        self.values = values
+        self.revivers = revivers
+        self.hydrated = [_MISSING] * len(values)
+        self.pending = []  # Conteneurs créés mais pas encore remplis : (indice, conteneur)
+
+    def hydrate(self, index, standalone=False):
+        """Valeur complètement hydratée de l'indice."""
+        if standalone and index >= 0:
+            raise ValueError("Invalid input")
+        value = self.get(index)
+        while self.pending:
+            self.fill(*self.pending.pop())
+        return value
+
+    def get(self, index):
+        """Valeur de l'indice ; un conteneur est créé vide et rempli plus tard par hydrate()."""
+        if index < 0:
+            try:
+                return SPECIAL_VALUES[index]
+            except KeyError:
+                raise ValueError(f"Invalid index {index}") from None
+
+        value = self.hydrated[index]
+        if value is not _MISSING:
+            return value
+
+        raw = self.values[index]
+        if isinstance(raw, list):
+            if raw and isinstance(raw[0], str):
+                value = self.typed_value(index, raw)
+            else:
+                value = [None] * len(raw)
+                self.pending.append((index, value))
+        elif isinstance(raw, dict):
+            value = {}
+            self.pending.append((index, value))
+        else:
+            value = raw
+
+        # Mémorisé avant le remplissage : les références circulaires pointent vers le même conteneur
+        self.hydrated[index] = value
+        return value
+
+    def fill(self, index, container):
+        raw = self.values[index]
+        get = self.get
+        if isinstance(raw, dict):
+            for key, child in raw.items():
+                container[key] = get(child)
+        elif not raw or not isinstance(raw[0], str):
+            for position, child in enumerate(raw):
+                if child != HOLE:
+                    container[position] = get(child)
+        elif raw[0] == "Set":
+            for child in raw[1:]:
+                container.add(get(child))
+        elif raw[0] == "Map":
+            for i in range(1, len(raw), 2):
+                container[get(raw[i])] = get(raw[i + 1])
+        else:  # "null" : objet sans prototype, clés littérales
+            for i in range(1, len(raw), 2):
+                container[raw[i]] = get(raw[i + 1])
+
+    def typed_value(self, index, raw):
+        type_ = raw[0]
+        if self.revivers and type_ in self.revivers:
+            return self.revivers[type_](self.hydrate(raw[1]))
+
+        if type_ == "Date":
+            return raw[1]  # Chaîne ISO
+        if type_ == "Set":
+            value = set()
+        elif type_ in ("Map", "null"):
+            value = {}
+        else:
+            return self.leaf_value(raw)
+        self.pending.append((index, value))
+        return value
+
+    def leaf_value(self, raw):
+        type_ = raw[0]
+        if type_ == "RegExp":
+            return f"RegExp({raw[1]}, {raw[2] if len(raw) > 2 else ''})"
+        if type_ == "Object":
+            return raw[1]  # Primitive encapsulée (new Number(...), new String(...))
+        if type_ == "BigInt":
+            return int(raw[1])
+        if type_ == "ArrayBuffer":
+            return memoryview(base64.b64decode(raw[1]))
+        if type_ in TYPED_ARRAYS:
+            # Ancien format : base64 directement ; nouveau : indice d'un ArrayBuffer, décalage et longueur
+            buffer = base64.b64decode(raw[1]) if isinstance(raw[1], str) else self.get(raw[1])
+            typed_array = array.array(TYPED_ARRAYS[type_])
+            if len(raw) > 3:
+                buffer = buffer[raw[2]:raw[2] + raw[3] * typed_array.itemsize]
+            typed_array.frombytes(buffer)
+            if sys.byteorder == 'big':
+                typed_array.byteswap()  # Les buffers JavaScript sont little-endian
+            return typed_array
+        raise ValueError(f"Unknown type {type_}")
+
+
+def unflatten(parsed, revivers=None):
+    """Reconstitue un objet sérialisé par devalue."""
+    if isinstance(parsed, int) and not isinstance(parsed, bool):
+        return Unflattener([], revivers).hydrate(parsed, standalone=True)
+    if not isinstance(parsed, list) or len(parsed) == 0:
+        raise ValueError("Invalid input")
+    return Unflattener(parsed, revivers).hydrate(0)
@@ -0,0 +1,104 @@
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import requests
+
+
+def percentile(values, pct):
+    """Percentile au rang le plus proche (values non vide)."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(values):
+    """Chaîne p50 / p95 / p99 en millisecondes."""
+    if not values:
+        return "p50: - | p95: - | p99: -"
+    return " | ".join(f"p{pct}: {percentile(values, pct) * 1000:.0f} ms" for pct in (50, 95, 99))
+
+
+class HedgingPolicy:
+    """Requêtes couvertes (hedged requests) pour réduire la latence de queue de /api/ah/prices.
+
+    Si la première requête n'a pas répondu après le `percentile`-ième percentile des latences récentes,
+    une seconde requête identique part et la première réponse arrivée gagne. Les deux requêtes sont
+    bornées par `budget` secondes au total, et les secondes requêtes par `max_hedge_ratio` des requêtes.
+    La requête perdante est annulée si elle n'a pas démarré ; sinon aucune nouvelle seconde requête ne part
+    tant qu'elle n'est pas terminée, pour ne pas empiler des requêtes bloquées sur un serveur qui ne répond plus.
+    """
+
+    def __init__(self, percentile=95, budget=5.0, min_delay=0.02, initial_delay=1.0, max_hedge_ratio=0.1,
+                 window=200, min_samples=20):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+
+        self.latencies = deque(maxlen=window)  # Latences des requêtes individuelles terminées
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.losers = []  # Requêtes perdantes encore en cours
+
+    def hedge_delay(self):
+        with self.lock:
+            latencies = list(self.latencies)
+        if len(latencies) < self.min_samples:
+            return self.initial_delay
+        return max(self.min_delay, percentile(latencies, self.percentile))
+
+    def allow_hedge(self):
+        self.losers = [future for future in self.losers if not future.done()]
+        return not self.losers and self.hedges + 1 <= self.max_hedge_ratio * self.requests
+
+    def abandon(self, futures):
+        for future in futures:
+            if not future.cancel():
+                self.losers.append(future)
+
+    def timed_send(self, send, deadline):
+        start_time = time.perf_counter()
+        response = send(timeout=max(0.001, deadline - start_time))
+        with self.lock:
+            self.latencies.append(time.perf_counter() - start_time)
+        return response
+
+    def call(self, send, executor):
+        """Exécute send(timeout=...) avec couverture ; executor doit accepter au moins deux tâches en parallèle."""
+        deadline = time.perf_counter() + self.budget
+        self.requests += 1
+        first = executor.submit(self.timed_send, send, deadline)
+        futures = [first]
+
+        wait(futures, timeout=min(self.hedge_delay(), self.budget))
+        if not first.done() and self.allow_hedge():
+            self.hedges += 1
+            futures.append(executor.submit(self.timed_send, send, deadline))
+
+        error = None
+        while futures:
+            done, _ = wait(futures, timeout=max(0.0, deadline - time.perf_counter()), return_when=FIRST_COMPLETED)
+            if not done:
+                self.abandon(futures)
+                raise requests.exceptions.Timeout(f"Budget de {self.budget} s dépassé")
+            for future in done:
+                futures.remove(future)
+                if future.exception() is None:
+                    if future is not first:
+                        self.hedge_wins += 1
+                    self.abandon(futures)  # La requête perdante se termine en arrière-plan, ignorée
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def summary(self):
+        with self.lock:
+            latencies = list(self.latencies)
+        return f"{latency_summary(latencies)} | Requêtes couvertes: {self.hedges} (gagnées: {self.hedge_wins})"
@@ -0,0 +1,47 @@
+import json
+
+
+class ItemIndex:
+    """Index des métadonnées de auction_house_data.json, construit une seule fois au chargement.
+
+    Remplace le parcours de data_name['items'] pour chaque résultat par des lookups O(1).
+    """
+
+    def __init__(self, data_name):
+        data_name = data_name or {}
+        self.data_name = data_name
+
+        # num -> fiche complète de l'item (id, name, rarity, icon, ...)
+        self.items = {}
+        for info in data_name.get('items', []):
+            self.items[info['num']] = info  # Le dernier doublon gagne, comme l'ancienne boucle
+
+        self.names = {num: info['name'] for num, info in self.items.items()}
+        self.traits = {str(trait_id): trait['name'] for trait_id, trait in data_name.get('traits', {}).items()}
+
+    @classmethod
+    def from_file(cls, filename):
+        with open(filename, 'r', encoding='utf-8') as infile:
+            return cls(json.load(infile))
+
+    def __bool__(self):
+        return bool(self.items) and bool(self.traits)
+
+    def name(self, item_id):
+        """Nom de l'item, ou l'identifiant tel quel s'il est inconnu."""
+        return self.names.get(int(item_id), item_id)
+
+    def trait_name(self, trait):
+        if trait == "NULL":
+            return trait
+        return self.traits.get(str(trait), str(trait))
+
+    def rarity(self, item_id):
+        return self.items.get(int(item_id), {}).get('rarity')
+
+    def icon(self, item_id):
+        return self.items.get(int(item_id), {}).get('icon')
+
+    def item_key(self, item_id):
+        """Identifiant textuel de l'item (ex: 'bow_aa_t5_boss_001')."""
+        return self.items.get(int(item_id), {}).get('id')
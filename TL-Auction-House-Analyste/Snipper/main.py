@@ -1,167 +1,137 @@
 import json
 import threading
-
-import requests
 import time
+from collections import deque
+
 import pyperclip
-from compress_json import decompress
-import hashlib
 import sys
 from PyQt5.QtWidgets import (QApplication, QWidget, QLabel, QLineEdit, QVBoxLayout, QHBoxLayout,
                              QGridLayout, QTreeWidget, QTreeWidgetItem, QHeaderView)
 from PyQt5.QtCore import QThread, pyqtSignal, Qt
 from PyQt5.QtGui import QColor
 
-
-class DataFetcher(QThread):
-    data_ready = pyqtSignal(dict, float)
-
-    def __init__(self, server):
+from buyout_planner import BuyoutPlanner
+from data_processor import DataProcessor
+from hedging import HedgingPolicy, latency_summary
+from item_index import ItemIndex
+from multi_server_scan import MultiServerScanner, ScanSettings
+from pipeline import FetchProcessPipeline
+from poll_scheduler import AdaptivePollScheduler
+from prices_client import PricesClient
+from replay import ReplayClient, ReplayFinished
+from snapshot_daemon import SnapshotClient
+from snapshot_log import SnapshotLog
+from tldb_urls import TLDB_URL, prices_url
+
+# Moteur d'analyse : "python" (boucles sur les dicts) ou "numpy" (vectorisé, même résultat)
+ENGINE = "python"
+# Profondeur comptée en annonces achetées ("listings") ou en unités achetées ("units", moteur python)
+DEPTH_UNIT = "listings"
+# Mode incrémental (moteur python) : seuls les groupes (item, trait) modifiés depuis le dernier poll sont recalculés
+INCREMENTAL = True
+# Nombre de résultats gardés : les TOP_K meilleurs sont sélectionnés dans un tas pendant l'analyse (None : tous).
+# Les résultats bruts ne sont alors plus gardés : un changement de seuil relance l'analyse au lieu d'un refiltrage
+TOP_K = None
+# Décompression directe en colonnes (item, trait, prix, quantité) : pas de dict par vente
+COLUMNAR = True
+# Base de tldb.info (variable d'environnement TLDB_URL) : http://127.0.0.1:8000 pour Benchmarks/stub_server.py
+BASE_URL = TLDB_URL
+# Requêtes couvertes : une réponse plus lente que le p95 récent déclenche une seconde requête.
+# Désactivé par défaut : chaque requête doublée est une charge de plus pour tldb.info
+HEDGING = False
+# Snapshots lus depuis le démon local (python snapshot_daemon.py 30001) au lieu d'interroger tldb.info
+SNAPSHOT_DAEMON = False
+# Snapshots lus sans copie en mémoire partagée, écrits par le démon (python snapshot_daemon.py --shared 30001)
+SHARED_SNAPSHOT = False
+# Relecture hors ligne d'un journal de snapshot_log (répertoire) au lieu d'interroger tldb.info
+REPLAY_LOG = None
+# Vitesse de relecture : 1.0 temps réel, 10.0 dix fois plus vite, None sans attente
+REPLAY_SPEED = 10.0
+# Analyse de tous les serveurs de la réponse à chaque relevé, dans SCAN_WORKERS processus (None : un par cœur).
+# Lit le corps complet : PricesClient ou REPLAY_LOG, pas le démon
+MULTI_SERVER_SCAN = False
+SCAN_WORKERS = None
+# Intervalle de polling du balayage multi-serveurs : le balayage de la région doit tenir dedans
+SCAN_INTERVAL = 5.0
+# Polling direct de tldb.info : intervalle adaptatif, resserré quand les prix changent, allongé sinon
+POLL_MIN_INTERVAL = 1.0
+POLL_MAX_INTERVAL = 30.0
+# Balayage : prix le plus bas de chaque groupe sur chaque serveur et plus grands écarts entre serveurs (numpy requis)
+SCAN_SPREADS = True
+
+
+class ThresholdFilter(QThread):
+    """Refiltre les résultats bruts du dernier snapshot quand un seuil change, hors du thread GUI."""
+    results_ready = pyqtSignal(list, int)
+
+    def __init__(self, window, generation):
         super().__init__()
-        self.server = server
+        self.window = window
+        self.generation = generation
 
     def run(self):
-        start_time = time.time()
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
-        url = "https://tldb.info/api/ah/prices"
-        try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
-            data = response.json()
-            list_data = data["list"]
-            fetched_data = decompress(json.loads(list_data[self.server]))
-            end_time = time.time()
-            latency = end_time - start_time
-            self.data_ready.emit(fetched_data, latency)
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching data: {e}")
-            self.data_ready.emit(None, 0)  # Emit None to signal error
-
-
-class DataProcessor:
-    def process_data(self, data, data_name, percentage_threshold, cost_threshold, depth, mini_profit):
-
-        brute_results = []
-
-        grouped_data = []
-        # Parcours des items
-        for item_id, item_data in data.items():
-            sales = item_data.get("sales", [])
-
-            # Si le premier élément contient un trait
-            if 't' in sales[0]:
-                # Création d'un dictionnaire des ventes par trait pour éviter des boucles imbriquées
-                trait_sales = {}
-                for sale in sales:
-                    trait = sale.get('t')
-                    if trait:
-                        if trait not in trait_sales:
-                            trait_sales[trait] = []
-                        sale_copy = sale.copy()  # On copie l'élément avant de supprimer le trait
-                        sale_copy.pop('t', None)  # Retirer 't' de la copie
-                        trait_sales[trait].append(sale_copy)
-
-                # Ajout des données traitées pour chaque trait
-                for trait, data in trait_sales.items():
-                    grouped_data.append((item_id, str(trait), data))
-
-            else:
-                # Si aucun trait, on ajoute la donnée sans transformation
-                grouped_data.append((item_id, "NULL", sales))
-
-        for name, trait, rows in grouped_data:
-            if len(rows) < 5:
-                continue
-                # Trier les prix par ordre croissant
-            rows.sort(key=lambda x: x['p'])  # Tri par prix croissant
-
-            # Liste des prix
-            prices = [(row['p'], row['c']) for row in rows]
-
-            # Calculer les résultats pour chaque profondeur de 1 à 10
-            for depth_incr in range(0, depth + 1):
-                if len(prices) < depth_incr + 1:
-                    continue  # Si on n'a pas assez de prix pour cette profondeur
-
-                # Calcul du coût total pour cette profondeur (coût des `depth_incr` premiers items)
-                total_cost = 0
-
-                if depth_incr != 0:
-                    for p, c in prices[:depth_incr]:
-                        total_cost += p * c
-
-                # Calcul du profit pour cette profondeur : vente des `depth_incr` items suivants
-                if depth_incr < len(prices):
-                    if depth_incr == 0:
-                        sale_revenue = 0
-                        instant_profit = 0
-                        profitability = 0
-                    else:
-                        sale_revenue = prices[depth_incr][
-                                           0] * 0.77 * depth_incr  # Vendre au prix de l'élément suivant après achat
-                        instant_profit = sale_revenue - total_cost  # Rentabilité après taxe
-
-                        # Rentabilité en pourcentage
-                        profitability = (instant_profit / total_cost) * 100  # Rentabilité en pourcentage
-
-                    temp_name = name
-
-                    for info in data_name['items']:
-                        if info['num'] == int(name):
-                            temp_name = info['name']
-
-                    temp_trait = trait
-
-                    if trait != "NULL":
-                        temp_trait = data_name['traits'][trait]['name']
-
-                    sale_price = -1
-                    try:
-                        sale_price = prices[depth_incr + 1][0]
-                    except IndexError:
-                        pass
-
-                    brute_results.append({
-                        'Name': temp_name,
-                        'Trait': temp_trait,
-                        'Depth': depth_incr,
-                        'Cost': total_cost,
-                        'Instant Profit': round(instant_profit, 2),
-                        'Profitability (%)': int(round(profitability, 2)),
-                        'Item Price': prices[depth_incr][0],
-                        # Prix de l'item étudié (celui sur lequel on base la rentabilité)
-                        'Occurrences': len(rows),
-                        'Sale Price': sale_price  # Prix de vente théorique (prix de l'item suivant)
-                    })
-
-        # Optimisation: Filtrage avec une liste de compréhension et conditions combinées
-        filtered_results = [result for result in brute_results if
-                            result['Profitability (%)'] >= percentage_threshold and result['Cost'] <= cost_threshold and
-                            result['Instant Profit'] >= mini_profit]
-        filtered_results.sort(key=lambda x: x['Instant Profit'], reverse=True)
-        return filtered_results
-
-    def generate_item_id(self, item):
-        hash_string = f"{item['Name']}{item['Trait']}"
-        return hashlib.md5(hash_string.encode()).hexdigest()
+        window = self.window
+        with window.processing_lock:
+            results = window.data_processor.refilter(window.percentage_threshold, window.cost_threshold,
+                                                     window.depth, window.mini_profit)
+            if results is None and window.last_data is not None:
+                # Profondeur plus grande que celle en cache (ou TOP_K, balayage) : on relance l'analyse
+                results = window.analyse(window.last_data)
+        if results is not None:
+            self.results_ready.emit(results, self.generation)
 
 
 class MainWindow(QWidget):
+    results_ready = pyqtSignal(list, int)
+    status_ready = pyqtSignal(str)  # Émis depuis les threads du pipeline, affiché dans le thread GUI
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Affichage des Résultats")
-        self.data_processor = DataProcessor()
+        self.data_processor = DataProcessor(engine=ENGINE, incremental=INCREMENTAL, top_k=TOP_K,
+                                            depth_unit=DEPTH_UNIT)
+        self.processing_lock = threading.Lock()  # Le cycle de fetch et le refiltrage partagent le processeur
+        self.last_data = None
+        self.snapshot_reader = None
+        self.render_times = deque(maxlen=1000)  # Durées de show_results (mesurées pendant une relecture)
+        self.results_generation = 0
+        self.threshold_filters = []
         self.percentage_threshold = 20
         self.cost_threshold = 3000
         self.depth = 1
         self.mini_profit = 10
         self.last_top_id = None
         self.server = "30001"
+        if SHARED_SNAPSHOT:
+            self.prices_client = None  # Le démon fetch ; le lecteur est ouvert au premier fetch_snapshot
+        elif REPLAY_LOG:
+            self.prices_client = ReplayClient(SnapshotLog(REPLAY_LOG, readonly=True), speed=REPLAY_SPEED,
+                                              columnar=COLUMNAR)
+        elif SNAPSHOT_DAEMON:
+            self.prices_client = SnapshotClient(servers=[self.server])  # Même fetch_server que PricesClient
+        else:
+            self.prices_client = PricesClient(url=prices_url(BASE_URL), columnar=COLUMNAR,
+                                              hedging=HedgingPolicy() if HEDGING else None)
+        # Le démon et la mémoire partagée attendent eux-mêmes un nouveau snapshot, la relecture a son propre rythme
+        self.poll_scheduler = None
+        if isinstance(self.prices_client, PricesClient):
+            self.poll_scheduler = AdaptivePollScheduler(min_interval=POLL_MIN_INTERVAL, max_interval=POLL_MAX_INTERVAL)
+        # Fetch et traitement se recouvrent : le fetch suivant part dès que le snapshot est passé au traitement
+        self.pipeline = FetchProcessPipeline(self.fetch_snapshot, self.process_snapshot, self.on_pipeline_result,
+                                             on_error=self.on_pipeline_error, on_unchanged=self.on_data_unchanged,
+                                             min_interval=SCAN_INTERVAL if MULTI_SERVER_SCAN else 0.0,
+                                             scheduler=self.poll_scheduler)
         self.initUI()
         self.data_name = self.load_data_name("auction_house_data.json")
+        self.item_index = ItemIndex(self.data_name)  # Construit une seule fois, lookups O(1) ensuite
+        self.scanner = MultiServerScanner(self.item_index, workers=SCAN_WORKERS) if MULTI_SERVER_SCAN else None
+        self.scan_report = None
+        self.spread_matrix = None  # Écarts entre serveurs du dernier balayage (SCAN_SPREADS)
         self.previous_result = []
+        self.planner = None  # Carnets d'ordres du dernier snapshot, pour le plan d'achat du groupe sélectionné
+        self.selected_group = None
+        self.results_ready.connect(self.show_results)
+        self.status_ready.connect(self.show_status)
         self.start_refresh()
 
     def load_data_name(self, filename):
@@ -194,14 +164,20 @@ class MainWindow(QWidget):
         self.latency_label = QLabel("Latence: ")
         grid.addWidget(self.latency_label, 3, 0, 1, 2)
 
+        self.fetch_stats_label = QLabel("")
+        grid.addWidget(self.fetch_stats_label, 4, 0, 1, 2)
+
+        self.plan_label = QLabel("")  # Plan d'achat de la ligne cliquée, recalculé quand un seuil change
+        grid.addWidget(self.plan_label, 5, 0, 1, 2)
+
         # Tree Widget
         self.tree = QTreeWidget()
         self.tree.setHeaderLabels(
             ["Name", "Trait", "Depth", "Cost", "Instant Profit", "Profitability (%)", "Item Price", "Occurrences",
-             "Sale Price"])
+             "Sale Price"] + (["Server"] if MULTI_SERVER_SCAN else []))
         self.tree.header().setSectionResizeMode(QHeaderView.ResizeToContents)
         self.tree.itemClicked.connect(self.on_item_clicked)
-        grid.addWidget(self.tree, 4, 0, 1, 2)
+        grid.addWidget(self.tree, 6, 0, 1, 2)
 
         self.setLayout(grid)
 
@@ -211,50 +187,136 @@ class MainWindow(QWidget):
             self.cost_threshold = int(self.cost_edit.text())
             self.depth = int(self.depth_edit.text())
         except ValueError:
-            pass  # Ignore invalid input
+            return  # Ignore invalid input
+        self.show_plan()
 
-    def start_refresh(self):
-        self.fetcher = DataFetcher(self.server)
-        self.fetcher.data_ready.connect(self.update_gui)
-        self.fetcher.start()
+        # Refiltrage immédiat du dernier snapshot, sans attendre le prochain fetch
+        self.results_generation += 1
+        threshold_filter = ThresholdFilter(self, self.results_generation)
+        threshold_filter.results_ready.connect(self.show_results)
+        threshold_filter.finished.connect(lambda: self.threshold_filters.remove(threshold_filter))
+        self.threshold_filters.append(threshold_filter)  # Garder une référence tant que le thread tourne
+        threshold_filter.start()
 
-    def update_gui(self, data, latency):
-        if data is None:
-            self.latency_label.setText(f"Latence: Erreur lors de la récupération des données")
+    def start_refresh(self):
+        self.pipeline.start()
+
+    def closeEvent(self, event):
+        self.pipeline.stop(timeout=1)
+        if self.prices_client is not None:
+            self.prices_client.close()
+        if self.scanner is not None:
+            self.scanner.close()
+        super().closeEvent(event)
+
+    def fetch_snapshot(self):  # Thread de fetch du pipeline
+        if SHARED_SNAPSHOT:
+            if self.snapshot_reader is None:
+                # numpy requis ; bloc absent tant que rien n'est publié
+                from shared_snapshot import SharedSnapshotReader
+                self.snapshot_reader = SharedSnapshotReader(self.server)
+            return self.snapshot_reader.wait_for_new(timeout=1.0)
+        if MULTI_SERVER_SCAN:
+            return self.prices_client.fetch_body()  # Corps complet : tous les serveurs
+        return self.prices_client.fetch_server(self.server)
+
+    def analyse(self, data):  # Appelé avec processing_lock
+        if self.scanner is not None:
+            settings = ScanSettings(self.percentage_threshold, self.cost_threshold, self.depth, self.mini_profit,
+                                    engine=ENGINE, top_k=TOP_K, depth_unit=DEPTH_UNIT, spreads=SCAN_SPREADS)
+            self.scan_report = self.scanner.scan(data, settings)
+            self.spread_matrix = self.scan_report.spread_matrix()
+            return self.scan_report.results
+        return self.data_processor.process_data(data, self.item_index, self.percentage_threshold,
+                                                self.cost_threshold, self.depth, self.mini_profit)
+
+    def process_snapshot(self, data):  # Thread de traitement du pipeline
+        with self.processing_lock:
+            generation = self.results_generation
+            results = self.analyse(data)
+            # Une vue partagée sera réécrite par le démon : le refiltrage garde sa propre copie
+            self.last_data = data.to_columns() if hasattr(data, "to_columns") else data
+            if self.scanner is None:
+                self.planner = BuyoutPlanner(self.last_data, self.item_index)  # Carnets construits à la demande
+        return results, generation
+
+    def on_pipeline_result(self, result, timings):
+        results, generation = result
+        status = timings.summary()
+        if self.scan_report is not None:
+            status += f" | {self.scan_report.summary(SCAN_INTERVAL)}"
+            widest = self.spread_matrix.top(1, item_index=self.item_index) if self.spread_matrix else []
+            for spread in widest:
+                status += (f" | Plus gros écart: {spread['Name']} ({spread['Trait']}) {spread['Low Server']} "
+                           f"{spread['Low Price']} -> {spread['High Server']} {spread['High Price']}")
+        elif self.data_processor.incremental:
+            status += (f" | Groupes recalculés: {self.data_processor.groups_recomputed}, "
+                       f"réutilisés: {self.data_processor.groups_reused}")
+        self.results_ready.emit(results, generation)  # L'arbre est mis à jour dans le thread GUI
+        self.status_ready.emit(status)
+
+    def on_data_unchanged(self, timings):
+        status = f"{timings.summary()} | Données inchangées"
+        if self.poll_scheduler is not None:
+            status += f" | {self.poll_scheduler.summary()}"
+        self.status_ready.emit(status)
+
+    def on_pipeline_error(self, stage, error):
+        if isinstance(error, ReplayFinished):
+            self.pipeline.stop()  # Appelé depuis le thread de fetch : il s'arrête au retour
+            self.status_ready.emit(f"Relecture terminée | {self.pipeline.timings.summary()}")
             return
-
-        self.latency_label.setText(f"Latence: {latency:.4f} secondes")
-
-        def process_and_update_tree():
-            results = self.data_processor.process_data(data, self.data_name, self.percentage_threshold,
-                                                       self.cost_threshold, self.depth, self.mini_profit)
-
-            if results and self.previous_result != results:
-                pyperclip.copy(results[0]['Name'])
-                
-                self.tree.clear()  # Effacer l'arbre avant d'ajouter de nouveaux éléments
-
-                for result in results:
-                    item = QTreeWidgetItem(self.tree)
-                    item.setText(0, result['Name'])
-                    item.setText(1, result['Trait'])
-                    item.setText(2, str(result['Depth']))
-                    item.setText(3, str(result['Cost']))
-                    item.setText(4, str(result['Instant Profit']))
-                    item.setText(5, str(result['Profitability (%)']))
-                    item.setText(6, str(result['Item Price']))
-                    item.setText(7, str(result['Occurrences']))
-                    item.setText(8, str(result['Sale Price']))
-                    min_profit = min(result['Instant Profit'], 1000)
-                    color = self.get_color(min_profit)
-
-                    for i in range(self.tree.columnCount()):
-                        item.setBackground(i, color)  # Appliquer la couleur directement
-
-            self.previous_result = results
-            self.start_refresh()
-
-        threading.Thread(target=process_and_update_tree).start()
+        print(f"Error during {stage}: {error}")
+        self.status_ready.emit(f"Latence: Erreur lors de la récupération des données ({stage})")
+
+    def show_status(self, status):
+        self.latency_label.setText(status)
+        if SHARED_SNAPSHOT:
+            self.fetch_stats_label.setText(self.snapshot_reader.stats.summary() if self.snapshot_reader is not None
+                                           else "Mémoire partagée: en attente du démon")
+            return
+        fetch_stats = self.prices_client.stats.summary()
+        if getattr(self.prices_client, "hedging", None) is not None:
+            fetch_stats += f" | {self.prices_client.hedging.summary()}"
+        if REPLAY_LOG:
+            fetch_stats += f" | Rendu {latency_summary(self.render_times)}"
+        self.fetch_stats_label.setText(fetch_stats)
+
+    def show_results(self, results, generation):
+        if generation != self.results_generation:
+            return  # Résultats calculés avec des seuils qui ont changé depuis
+        start_time = time.perf_counter()
+
+        if results and self.previous_result != results:
+            pyperclip.copy(results[0]['Name'])
+
+            self.tree.setUpdatesEnabled(False)  # Un seul repaint une fois l'arbre rempli
+            self.tree.clear()  # Effacer l'arbre avant d'ajouter de nouveaux éléments
+
+            for result in results:
+                item = QTreeWidgetItem(self.tree)
+                item.setText(0, result['Name'])
+                item.setText(1, result['Trait'])
+                item.setText(2, str(result['Depth']))
+                item.setText(3, str(result['Cost']))
+                item.setText(4, str(result['Instant Profit']))
+                item.setText(5, str(result['Profitability (%)']))
+                item.setText(6, str(result['Item Price']))
+                item.setText(7, str(result['Occurrences']))
+                item.setText(8, str(result['Sale Price']))
+                if 'Server' in result:
+                    item.setText(9, result['Server'])
+                min_profit = min(result['Instant Profit'], 1000)
+                color = self.get_color(min_profit)
+
+                for i in range(self.tree.columnCount()):
+                    item.setBackground(i, color)  # Appliquer la couleur directement
+
+            self.tree.setUpdatesEnabled(True)
+
+        self.previous_result = results
+        self.show_plan()  # Nouveau snapshot : le plan du groupe sélectionné change aussi
+        self.render_times.append(time.perf_counter() - start_time)
 
     def get_color(self, min_profit):
         min_profit = min(min_profit, 1000)  # Cap at 1000
@@ -275,10 +337,50 @@ class MainWindow(QWidget):
         return QColor(r, g, b)
 
     def on_item_clicked(self, item, column):
+        self.selected_group = (item.text(0), item.text(1))
+        self.show_plan()
         if column == 0:
             name = item.text(0)
             QApplication.clipboard().setText(name)
 
+    def show_plan(self):
+        """Unités achetables sous le Seuil de Coût et coût de la Profondeur, pour le groupe sélectionné.
+
+        En balayage multi-serveurs avec SCAN_SPREADS, affiche plutôt ses prix sur chaque serveur.
+        """
+        if self.spread_matrix is not None:
+            self.show_server_asks()
+            return
+        planner = self.planner
+        if self.selected_group is None or planner is None:
+            return
+        book = planner.book_by_name(*self.selected_group)
+        if book is None:
+            self.plan_label.setText(f"{self.selected_group[0]} : plus en vente")
+            return
+        units, cost = book.units_for(self.cost_threshold)
+        text = f"{self.selected_group[0]} : {units}/{book.total_units} unités pour {cost} sous le Seuil de Coût"
+        profit = book.profit(units)
+        if units and profit is not None:
+            text += f" (profit {profit:.0f})"
+        depth_units = book.depth_units(self.depth, DEPTH_UNIT)  # Même profondeur que les résultats analysés
+        depth_cost = None if depth_units is None else book.cost_of(depth_units)
+        if depth_cost is not None:
+            text += f" | Profondeur {self.depth} ({depth_units} unités) : {depth_cost}"
+        self.plan_label.setText(text)
+
+    def show_server_asks(self):
+        """Balayage multi-serveurs : prix le plus bas du groupe sélectionné sur chaque serveur."""
+        if self.selected_group is None:
+            return
+        matrix = self.spread_matrix
+        column = matrix.find(*self.selected_group, item_index=self.item_index)
+        if column is None:
+            self.plan_label.setText(f"{self.selected_group[0]} : plus en vente")
+            return
+        asks = " | ".join(f"{server}: {price}" for server, price in matrix.server_asks(column).items())
+        self.plan_label.setText(f"{self.selected_group[0]} : {asks}")
+
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
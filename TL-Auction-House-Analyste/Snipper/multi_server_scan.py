@@ -0,0 +1,186 @@
+"""Analyse de tous les serveurs d'une réponse /api/ah/prices à la fois, dans un pool de processus.
+
+Chaque processus reçoit la chaîne compressée d'un serveur (moins à sérialiser que les données décodées),
+la décode et l'analyse avec DataProcessor ; seuls les résultats filtrés reviennent. Les résultats sont
+fusionnés par 'Instant Profit' décroissant avec une colonne 'Server', et les durées de chaque serveur
+sont gardées pour vérifier que le balayage de la région tient dans un intervalle de polling. Avec
+spreads=True, chaque processus renvoie aussi le prix le plus bas de chaque (item, trait) de son serveur
+pour la matrice des écarts entre serveurs (price_spread, numpy requis).
+"""
+import heapq
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from itertools import islice
+
+from data_processor import DataProcessor
+from item_index import ItemIndex
+from parallel_decode import decode_server_payload
+from prices_parser import extract_server_payloads
+
+_worker_index = None  # ItemIndex construit une fois par processus du pool
+# Chaîne serveur mal formée (JSON, table compress_json, ventes) : le serveur est écarté, pas le balayage
+SERVER_ERRORS = (ValueError, TypeError, KeyError, IndexError)
+
+
+def init_worker(catalog):
+    global _worker_index
+    _worker_index = ItemIndex(catalog)
+
+
+@dataclass(frozen=True)
+class ScanSettings:
+    percentage_threshold: float
+    cost_threshold: float
+    depth: int
+    mini_profit: float
+    engine: str = "python"
+    top_k: int = None  # Par serveur, puis sur la fusion
+    depth_unit: str = "listings"
+    spreads: bool = False
+
+
+def scan_server(server, payload, settings, item_index=None):
+    """(résultats, durée de décodage, durée d'analyse, prix les plus bas ou None) d'un serveur.
+
+    Exécuté dans un processus du pool (ou en série avec item_index).
+    """
+    start_time = time.perf_counter()
+    data = decode_server_payload(payload, columnar=True)
+    decoded_time = time.perf_counter()
+    processor = DataProcessor(engine=settings.engine, top_k=settings.top_k, depth_unit=settings.depth_unit)
+    results = processor.process_data(data, item_index or _worker_index, settings.percentage_threshold,
+                                     settings.cost_threshold, settings.depth, settings.mini_profit)
+    for result in results:
+        result['Server'] = server
+    asks = None
+    if settings.spreads:
+        from price_spread import lowest_asks
+
+        asks = lowest_asks(data)
+    return results, decoded_time - start_time, time.perf_counter() - decoded_time, asks
+
+
+@dataclass
+class ServerTiming:
+    decode: float
+    analyse: float
+    results: int
+
+    @property
+    def total(self):
+        return self.decode + self.analyse
+
+
+@dataclass
+class ScanReport:
+    results: list
+    timings: dict = field(default_factory=dict)  # Serveur -> ServerTiming
+    errors: dict = field(default_factory=dict)  # Serveur -> exception
+    elapsed: float = 0.0  # Extraction des chaînes + tous les serveurs + fusion
+    asks: dict = field(default_factory=dict)  # Serveur -> prix les plus bas (si settings.spreads)
+
+    def spread_matrix(self):
+        """Matrice des écarts entre serveurs, ou None si le balayage n'a pas gardé les prix les plus bas."""
+        if not self.asks:
+            return None
+        from price_spread import SpreadMatrix
+
+        return SpreadMatrix.from_asks(self.asks)
+
+    def fits(self, interval):
+        return self.elapsed <= interval
+
+    def summary(self, interval=None):
+        text = f"Région: {len(self.timings)} serveurs en {self.elapsed * 1000:.0f} ms"
+        if self.timings:
+            slowest = max(self.timings, key=lambda server: self.timings[server].total)
+            text += (f" (décodage {sum(t.decode for t in self.timings.values()) * 1000:.0f} ms, "
+                     f"analyse {sum(t.analyse for t in self.timings.values()) * 1000:.0f} ms au total ; "
+                     f"plus lent {slowest} : {self.timings[slowest].total * 1000:.0f} ms)")
+        if interval is not None:
+            text += f" | Intervalle {interval:g} s : {'OK' if self.fits(interval) else 'dépassé'}"
+        if self.errors:
+            text += f" | Erreurs: {', '.join(self.errors)}"
+        return text
+
+    def breakdown(self):
+        """Une ligne par serveur, du plus lent au plus rapide."""
+        ordered = sorted(self.timings.items(), key=lambda item: item[1].total, reverse=True)
+        return [f"{server}: décodage {timing.decode * 1000:.0f} ms, analyse {timing.analyse * 1000:.0f} ms, "
+                f"{timing.results} résultats" for server, timing in ordered]
+
+
+class MultiServerScanner:
+    """Pool de processus gardé d'un balayage à l'autre (workers=1 : en série dans le processus courant)."""
+
+    def __init__(self, item_index, workers=None):
+        self.item_index = item_index
+        self.workers = workers
+        self.executor = None
+        if workers != 1:
+            self.start_pool()
+
+    def start_pool(self):
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                            initargs=(self.item_index.data_name,))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def scan_in_pool(self, payloads, settings, errors):
+        """Résultats par serveur ; un processus mort (BrokenProcessPool) est une erreur de ses serveurs."""
+        try:
+            futures = {server: self.executor.submit(scan_server, server, payload, settings)
+                       for server, payload in payloads.items()}
+        except BrokenProcessPool as e:
+            futures, broken = {}, e
+            errors.update((server, e) for server in payloads)
+        else:
+            broken = None
+        outcomes = {}
+        for server, future in futures.items():
+            try:
+                outcomes[server] = future.result()
+            except BrokenProcessPool as e:
+                errors[server] = broken = e
+            except SERVER_ERRORS as e:
+                errors[server] = e
+        if broken is not None:  # Le pool ne reprend plus de tâches : un nouveau pour le balayage suivant
+            self.executor.shutdown(wait=False)
+            self.start_pool()
+        return outcomes
+
+    def scan(self, body, settings, servers=None):
+        """Analyse les serveurs d'un corps /api/ah/prices (tous si servers est None) et fusionne les résultats."""
+        start_time = time.perf_counter()
+        payloads = extract_server_payloads(body, servers)
+        report = ScanReport(results=[])
+
+        if self.executor is None:
+            outcomes = {}
+            for server, payload in payloads.items():
+                try:
+                    outcomes[server] = scan_server(server, payload, settings, self.item_index)
+                except SERVER_ERRORS as e:
+                    report.errors[server] = e
+        else:
+            outcomes = self.scan_in_pool(payloads, settings, report.errors)
+
+        # Chaque liste est déjà triée : fusion stable, à profit égal l'ordre des serveurs dans "list"
+        ranked = [outcome[0] for outcome in outcomes.values()]
+        merged = heapq.merge(*ranked, key=lambda result: result['Instant Profit'], reverse=True)
+        report.results = list(islice(merged, settings.top_k))
+        report.timings = {server: ServerTiming(decode, analyse, len(results))
+                          for server, (results, decode, analyse, _) in outcomes.items()}
+        report.asks = {server: outcome[3] for server, outcome in outcomes.items() if outcome[3] is not None}
+        report.elapsed = time.perf_counter() - start_time
+        return report
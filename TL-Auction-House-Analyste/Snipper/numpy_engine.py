@@ -0,0 +1,260 @@
+import numpy as np
+
+from compressed_json import SalesColumns
+
+NULL_TRAIT = 0
+TAX_RATE = 0.77
+MIN_OCCURRENCES = 5
+
+
+def sales_dtype(price_dtype=np.int64):
+    # item_ord / trait_ord : ordre d'apparition dans le payload, pour reproduire l'ordre du moteur Python
+    return np.dtype([('item', np.int64), ('trait', np.int64), ('price', price_dtype), ('count', np.int64),
+                     ('item_ord', np.int32), ('trait_ord', np.int32)])
+
+
+def flatten_sales(data):
+    """Aplatit un payload serveur décompressé en un tableau structuré (une ligne par vente).
+
+    Applique les mêmes règles de regroupement que DataProcessor : si la première vente d'un item
+    porte un 't', seules les ventes avec un trait sont gardées, sinon tout va dans le groupe NULL.
+    """
+    items, traits, prices, counts, item_ords, trait_ords = [], [], [], [], [], []
+    for item_ord, (item_id, item_data) in enumerate(data.items()):
+        sales = item_data.get("sales", [])
+        if 't' in sales[0]:
+            sales = [sale for sale in sales if sale.get('t')]
+            trait_order = {}
+            item_traits = [sale['t'] for sale in sales]
+            traits.extend(item_traits)
+            trait_ords.extend([trait_order.setdefault(trait, len(trait_order)) for trait in item_traits])
+        else:
+            traits.extend([NULL_TRAIT] * len(sales))
+            trait_ords.extend([0] * len(sales))
+        items.extend([int(item_id)] * len(sales))
+        item_ords.extend([item_ord] * len(sales))
+        prices.extend([sale['p'] for sale in sales])
+        counts.extend([sale['c'] for sale in sales])
+
+    return build_table(items, traits, prices, counts, item_ords, trait_ords)
+
+
+def flatten_columns(columns):
+    """Équivalent de flatten_sales depuis les colonnes de compressed_json.decompress_columns (aucun dict par vente)."""
+    items = np.array(columns.item, dtype=np.int64)
+    has_trait = np.array([trait is not None for trait in columns.trait], dtype=bool)
+    traits = np.array([NULL_TRAIT if trait is None else trait for trait in columns.trait], dtype=np.int64)
+    prices = np.array(columns.price) if len(columns) else np.zeros(0, dtype=np.int64)
+    counts = np.array(columns.count, dtype=np.int64)
+    return flatten_arrays(items, traits, has_trait, prices, counts)
+
+
+def flatten_view(view):
+    """Équivalent de flatten_columns depuis une vue en mémoire partagée (shared_snapshot.SnapshotView)."""
+    from shared_snapshot import NO_TRAIT
+
+    has_trait = view.trait != NO_TRAIT
+    table = flatten_arrays(view.item, np.where(has_trait, view.trait, NULL_TRAIT), has_trait, view.price, view.count)
+    view.check()  # La table est une copie : la vue ne sert plus après ce contrôle
+    return table
+
+
+def flatten_arrays(items, traits, has_trait, prices, counts):
+    """Table des ventes à partir de colonnes NumPy (traits à NULL_TRAIT là où has_trait est faux)."""
+    # Les ventes d'un item sont contiguës : une nouvelle valeur d'item ouvre un nouvel item
+    new_item = np.ones(len(items), dtype=bool)
+    new_item[1:] = items[1:] != items[:-1]
+    item_ords = np.cumsum(new_item) - 1
+    trait_mode = has_trait[np.flatnonzero(new_item)][item_ords]
+
+    # Item regroupé par trait : seules les ventes avec un trait sont gardées ; sinon tout va dans NULL
+    keep = ~trait_mode | (traits != NULL_TRAIT)
+    traits = np.where(trait_mode, traits, NULL_TRAIT)[keep]
+    items, item_ords = items[keep], item_ords[keep]
+
+    # Ordre d'apparition des traits : position de la première vente de chaque (item, trait)
+    if len(items):
+        pair = item_ords * (int(traits.max()) + 1) + traits
+        _, first_row, inverse = np.unique(pair, return_index=True, return_inverse=True)
+        trait_ords = first_row[inverse.ravel()]
+    else:
+        trait_ords = item_ords
+
+    return build_table(items, traits, prices[keep], counts[keep], item_ords, trait_ords)
+
+
+def build_table(items, traits, prices, counts, item_ords, trait_ords):
+    price_column = np.array(prices) if len(prices) else np.zeros(0, dtype=np.int64)
+    if price_column.dtype.kind not in 'if':
+        price_column = price_column.astype(np.float64)
+    table = np.empty(len(items), dtype=sales_dtype(price_column.dtype))
+    table['item'] = items
+    table['trait'] = traits
+    table['price'] = price_column
+    table['count'] = counts
+    table['item_ord'] = item_ords
+    table['trait_ord'] = trait_ords
+    return table
+
+
+def group_sales(table):
+    """Trie les ventes par (item, trait, prix) avec un seul lexsort et renvoie les bornes des groupes."""
+    # lexsort est stable : à prix égal on garde l'ordre du payload, comme rows.sort()
+    order = np.lexsort((table['price'], table['trait_ord'], table['item_ord']))
+    table = table[order]
+    if len(table) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return table, empty, empty
+
+    group_key = table['item_ord'].astype(np.int64) * (int(table['trait_ord'].max()) + 1) + table['trait_ord']
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(group_key)) + 1))
+    sizes = np.diff(np.concatenate((starts, [len(table)])))
+    return table, starts, sizes
+
+
+def evaluate_depths(table, starts, sizes, depth):
+    """Évalue toutes les profondeurs 0..depth de tous les groupes d'un coup grâce aux sommes préfixes.
+
+    Renvoie un dictionnaire de colonnes, une ligne par (groupe, profondeur), dans l'ordre du moteur Python.
+    """
+    keep = sizes >= MIN_OCCURRENCES
+    starts, sizes = starts[keep], sizes[keep]
+    nb_depths = np.minimum(depth, sizes - 1) + 1
+    nb_depths = np.maximum(nb_depths, 0)
+
+    row_group = np.repeat(np.arange(len(starts)), nb_depths)
+    first_row = np.concatenate(([0], np.cumsum(nb_depths)[:-1])) if len(nb_depths) else nb_depths
+    depths = np.arange(len(row_group)) - np.repeat(first_row, nb_depths)
+
+    price = table['price']
+    cumulative_cost = np.concatenate(([0], np.cumsum(price * table['count'])))
+    group_start = starts[row_group]
+    position = group_start + depths
+
+    total_cost = cumulative_cost[position] - cumulative_cost[group_start]
+    item_price = price[position]
+    sale_revenue = item_price.astype(np.float64) * TAX_RATE * depths
+    instant_profit = sale_revenue - total_cost
+    with np.errstate(divide='ignore', invalid='ignore'):
+        profitability = np.where(depths > 0, instant_profit / total_cost * 100, 0.0)
+    instant_profit = np.where(depths > 0, instant_profit, 0.0)
+
+    has_next = depths + 1 < sizes[row_group]
+    sale_price = np.where(has_next, price[np.minimum(position + 1, len(price) - 1)], -1)
+
+    return {
+        'item': table['item'][group_start],
+        'trait': table['trait'][group_start],
+        'depth': depths,
+        'cost': total_cost,
+        'instant_profit': instant_profit,
+        'profitability': profitability,
+        'item_price': item_price,
+        'occurrences': sizes[row_group],
+        'sale_price': sale_price,
+        'has_next': has_next,
+    }
+
+
+def build_results(columns, rows, item_index):
+    """Matérialise les lignes demandées au format des résultats de DataProcessor."""
+    results = []
+    for row in rows:
+        depth = int(columns['depth'][row])
+        if depth == 0:
+            cost, instant_profit, profitability = 0, 0, 0
+        else:
+            cost = columns['cost'][row].item()
+            instant_profit = round(columns['instant_profit'][row].item(), 2)
+            profitability = int(round(columns['profitability'][row].item(), 2))
+        trait = int(columns['trait'][row])
+        results.append({
+            'Name': item_index.name(str(columns['item'][row])),
+            'Trait': "NULL" if trait == NULL_TRAIT else item_index.trait_name(str(trait)),
+            'Depth': depth,
+            'Cost': cost,
+            'Instant Profit': instant_profit,
+            'Profitability (%)': profitability,
+            'Item Price': columns['item_price'][row].item(),
+            'Occurrences': int(columns['occurrences'][row]),
+            'Sale Price': columns['sale_price'][row].item() if columns['has_next'][row] else -1,
+        })
+    return results
+
+
+def passes(result, percentage_threshold, cost_threshold, mini_profit):
+    return (result['Profitability (%)'] >= percentage_threshold and result['Cost'] <= cost_threshold and
+            result['Instant Profit'] >= mini_profit)
+
+
+def select_top(columns, candidates, item_index, percentage_threshold, cost_threshold, mini_profit, limit):
+    """Les limit meilleurs candidats, en ne construisant les dicts que des premiers par profit décroissant."""
+    profits = columns['instant_profit']
+    order = candidates[np.argsort(-profits[candidates], kind='stable')]
+    selected = []  # (ligne, résultat) : la ligne départage les profits égaux, comme le tri stable de filter_results
+    chunk = max(limit, 64)
+    for start in range(0, len(order), chunk):
+        rows = order[start:start + chunk]
+        selected.extend((row, result) for row, result in zip(rows, build_results(columns, rows, item_index))
+                        if passes(result, percentage_threshold, cost_threshold, mini_profit))
+        if len(selected) >= limit and start + chunk < len(order):
+            kth_profit = sorted(result['Instant Profit'] for _, result in selected)[-limit]
+            # L'arrondi à 2 décimales déplace un profit d'au plus 0.005 : au-delà, plus aucun candidat n'entre
+            if profits[order[start + chunk]] < kth_profit - 0.01:
+                break
+    selected.sort(key=lambda pair: (-pair[1]['Instant Profit'], pair[0]))
+    return [result for _, result in selected[:limit]]
+
+
+def filter_results(columns, item_index, percentage_threshold, cost_threshold, mini_profit, depth=None, limit=None):
+    # Pré-filtre vectorisé avec une marge, puis contrôle exact sur les valeurs arrondies comme en Python
+    mask = ((columns['profitability'] >= percentage_threshold - 1.01) &
+            (columns['cost'] <= cost_threshold) &
+            (columns['instant_profit'] >= mini_profit - 0.01))
+    if depth is not None:
+        mask &= columns['depth'] <= depth
+    candidates = np.flatnonzero(mask)
+    if limit is not None:
+        return select_top(columns, candidates, item_index, percentage_threshold, cost_threshold, mini_profit, limit)
+    results = [result for result in build_results(columns, candidates, item_index) if
+               passes(result, percentage_threshold, cost_threshold, mini_profit)]
+    results.sort(key=lambda x: x['Instant Profit'], reverse=True)
+    return results
+
+
+class NumpyResultsCache:
+    """Équivalent de ResultsCache pour le moteur numpy : les colonnes de evaluate_depths, non filtrées."""
+
+    def __init__(self, columns, item_index, depth):
+        self.columns = columns
+        self.item_index = item_index
+        self.depth = depth
+
+    def __len__(self):
+        return len(self.columns['depth'])
+
+    def covers(self, depth):
+        return depth <= self.depth
+
+    def filter(self, percentage_threshold, cost_threshold, mini_profit, depth=None, limit=None):
+        if depth is not None and not self.covers(depth):
+            raise ValueError(f"Profondeur {depth} non calculée (cache jusqu'à {self.depth})")
+        return filter_results(self.columns, self.item_index, percentage_threshold, cost_threshold, mini_profit,
+                              depth, limit)
+
+
+def analyse_numpy(data, item_index, depth):
+    """Analyse vectorisée d'un snapshot (dicts, SalesColumns ou SnapshotView), sans appliquer les seuils."""
+    if isinstance(data, SalesColumns):
+        table = flatten_columns(data)
+    elif hasattr(data, "generation"):
+        table = flatten_view(data)
+    else:
+        table = flatten_sales(data)
+    table, starts, sizes = group_sales(table)
+    return NumpyResultsCache(evaluate_depths(table, starts, sizes, depth), item_index, depth)
+
+
+def process_data_numpy(data, item_index, percentage_threshold, cost_threshold, depth, mini_profit):
+    """Équivalent vectorisé de DataProcessor.process_data (même table de résultats)."""
+    return analyse_numpy(data, item_index, depth).filter(percentage_threshold, cost_threshold, mini_profit)
@@ -0,0 +1,53 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from compressed_json import decompress, decompress_columns
+
+# Chaîne serveur mal formée : JSON invalide, table compress_json incohérente, objet inattendu
+PAYLOAD_ERRORS = (ValueError, TypeError, KeyError, IndexError)
+
+
+def decode_server_payload(payload, columnar=False):
+    """Décompresse la chaîne d'un serveur de /api/ah/prices (exécuté dans un processus du pool)."""
+    decode = decompress_columns if columnar else decompress
+    return decode(json.loads(payload))
+
+
+def decompress_servers(list_data, workers=None, columnar=False, executor=None):
+    """Décompresse les chaînes de tous les serveurs de "list".
+
+    workers : nombre de processus (None ou 1 : en série dans le processus courant). Un executor déjà
+    ouvert peut être passé pour éviter de recréer le pool à chaque appel.
+    Renvoie (données par serveur dans l'ordre de "list", erreurs par serveur). Un processus mort
+    (BrokenProcessPool) est compté comme une erreur des serveurs qu'il devait décoder.
+    """
+    servers = list(list_data)
+    decompressed, errors = {}, {}
+
+    if executor is None and (workers is None or workers <= 1):
+        for server in servers:
+            try:
+                decompressed[server] = decode_server_payload(list_data[server], columnar)
+            except PAYLOAD_ERRORS as e:
+                errors[server] = e
+        return decompressed, errors
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=min(workers, max(len(servers), 1)))
+    try:
+        try:
+            futures = [executor.submit(decode_server_payload, list_data[server], columnar) for server in servers]
+        except BrokenProcessPool as e:  # Executor partagé déjà cassé
+            return decompressed, {server: e for server in servers}
+        # Fusion dans l'ordre des serveurs, quel que soit l'ordre de fin des processus
+        for server, future in zip(servers, futures):
+            try:
+                decompressed[server] = future.result()
+            except (BrokenProcessPool,) + PAYLOAD_ERRORS as e:
+                errors[server] = e
+    finally:
+        if own_executor:
+            executor.shutdown()
+    return decompressed, errors
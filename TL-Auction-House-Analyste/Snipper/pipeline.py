@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+
+class HandoffSlot:
+    """File bornée entre le fetch et le traitement : si elle est pleine, le snapshot le plus ancien est
+    abandonné au profit du nouveau (le traitement ne travaille jamais sur des données périmées)."""
+
+    def __init__(self, capacity=1):
+        if capacity < 1:
+            raise ValueError("La capacité doit être d'au moins 1")
+        self.items = deque()
+        self.capacity = capacity
+        self.dropped = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def put(self, item):
+        with self.condition:
+            if len(self.items) >= self.capacity:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+
+    def take(self, timeout=None):
+        """Prochain snapshot, ou None si le slot est fermé (ou après timeout)."""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.items or self.closed, timeout):
+                return None
+            return self.items.popleft() if self.items else None
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+@dataclass
+class StageTimings:
+    """Durées des étapes (moyennes mobiles exponentielles, en secondes) et compteurs du pipeline."""
+    fetch: float = 0.0
+    process: float = 0.0
+    cycle: float = 0.0  # Écart entre deux résultats : max(fetch, traitement) quand les étapes se recouvrent
+    fetched: int = 0
+    unchanged: int = 0
+    processed: int = 0
+    dropped: int = 0
+    errors: int = 0
+    smoothing: float = 0.3
+
+    def update(self, name, value):
+        current = getattr(self, name)
+        setattr(self, name, value if current == 0.0 else current + self.smoothing * (value - current))
+
+    def summary(self):
+        return (f"Fetch: {self.fetch * 1000:.0f} ms | Traitement: {self.process * 1000:.0f} ms | "
+                f"Cycle: {self.cycle * 1000:.0f} ms | Abandonnés: {self.dropped} | Inchangés: {self.unchanged}")
+
+
+class FetchProcessPipeline:
+    """Pipeline à deux étages : le fetch suivant part dès que le snapshot précédent est passé au traitement.
+
+    fetch() renvoie un snapshot, ou None si les données n'ont pas changé. process(snapshot) renvoie le
+    résultat transmis à on_result(résultat, timings) ; on_unchanged(timings) est appelé pour un fetch sans
+    changement. Les exceptions sont passées à on_error(étape, erreur), le fetch attend alors error_delay
+    secondes avant de recommencer. Deux fetchs sont espacés d'au moins min_interval secondes, ou de
+    l'intervalle d'un scheduler (poll_scheduler.AdaptivePollScheduler) qui suit les changements observés.
+    """
+
+    def __init__(self, fetch, process, on_result, on_error=None, on_unchanged=None, slot_capacity=1,
+                 min_interval=0.0, error_delay=1.0, scheduler=None):
+        self.fetch = fetch
+        self.process = process
+        self.on_result = on_result
+        self.on_error = on_error
+        self.on_unchanged = on_unchanged
+        self.min_interval = min_interval
+        self.error_delay = error_delay
+        self.scheduler = scheduler
+
+        self.slot = HandoffSlot(slot_capacity)
+        self.timings = StageTimings()
+        self.stopping = threading.Event()
+        self.threads = []
+        self.last_result_time = None
+
+    def start(self):
+        self.threads = [threading.Thread(target=self.fetch_loop, daemon=True),
+                        threading.Thread(target=self.process_loop, daemon=True)]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Arrête le fetch, puis laisse le traitement finir les snapshots déjà passés au slot."""
+        self.stopping.set()
+        fetch_thread, process_thread = self.threads or (None, None)
+        if fetch_thread is not None and fetch_thread is not threading.current_thread():
+            fetch_thread.join(timeout)  # Un fetch en cours dépose encore son snapshot avant la fermeture
+        self.slot.close()
+        if process_thread is not None and process_thread is not threading.current_thread():
+            process_thread.join(timeout)
+
+    def report_error(self, stage, error):
+        self.timings.errors += 1
+        if self.on_error is not None:
+            self.on_error(stage, error)
+
+    def fetch_loop(self):
+        while not self.stopping.is_set():
+            start_time = time.perf_counter()
+            try:
+                snapshot = self.fetch()
+            except Exception as e:
+                self.report_error("fetch", e)
+                delay = self.error_delay
+                if self.scheduler is not None:
+                    delay = max(delay, self.scheduler.finish(None, changed=False))
+                self.stopping.wait(delay)
+                continue
+            elapsed = time.perf_counter() - start_time
+            self.timings.update("fetch", elapsed)
+
+            if snapshot is None:
+                self.timings.unchanged += 1
+                if self.on_unchanged is not None:
+                    self.on_unchanged(self.timings)
+            else:
+                self.timings.fetched += 1
+                self.slot.put(snapshot)  # Remplace un snapshot pas encore traité
+                self.timings.dropped = self.slot.dropped
+            interval = self.min_interval
+            if self.scheduler is not None:
+                interval = max(interval, self.scheduler.finish(None, changed=snapshot is not None))
+            self.stopping.wait(max(0.0, interval - elapsed))
+
+    def process_loop(self):
+        while True:
+            snapshot = self.slot.take()
+            if snapshot is None:  # Slot fermé et vidé : rien n'est perdu à l'arrêt
+                return
+            start_time = time.perf_counter()
+            try:
+                result = self.process(snapshot)
+            except Exception as e:
+                self.report_error("process", e)
+                continue
+            end_time = time.perf_counter()
+            self.timings.update("process", end_time - start_time)
+            if self.last_result_time is not None:
+                self.timings.update("cycle", end_time - self.last_result_time)
+            self.last_result_time = end_time
+            self.timings.processed += 1
+            self.on_result(result, self.timings)
@@ -0,0 +1,54 @@
+class AdaptivePollScheduler:
+    """Rythme des fetchs de /api/ah/prices, indépendant de Qt (piloté par un seul QTimer).
+
+    Au plus un fetch en cours par serveur : un tick qui tombe pendant un fetch est sauté et compté.
+    L'intervalle s'adapte à la fréquence de changement observée : il s'allonge tant que les données
+    ne bougent pas (ou en cas d'erreur) et se resserre dès qu'elles changent.
+    """
+
+    def __init__(self, min_interval=0.5, max_interval=30.0, initial_interval=None, backoff=1.5, tighten=0.5,
+                 smoothing=0.2):
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("Intervalles invalides : 0 < min_interval <= max_interval attendu")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.tighten = tighten
+        self.smoothing = smoothing
+
+        self.interval = min_interval if initial_interval is None else self.clamp(initial_interval)
+        self.in_flight = set()
+        self.ticks = 0
+        self.skipped_ticks = 0
+        self.fetches = 0
+        self.changes = 0
+        self.change_rate = 0.0  # Moyenne mobile exponentielle de la proportion de fetchs avec changement
+
+    def clamp(self, interval):
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    @property
+    def interval_ms(self):
+        return int(self.interval * 1000)
+
+    def try_start(self, server):
+        """Appelé à chaque tick : vrai si un fetch peut partir pour ce serveur (et le marque en cours)."""
+        self.ticks += 1
+        if server in self.in_flight:
+            self.skipped_ticks += 1
+            return False
+        self.in_flight.add(server)
+        return True
+
+    def finish(self, server, changed):
+        """Fin du fetch d'un serveur ; changed est faux si les données sont inchangées ou en erreur."""
+        self.in_flight.discard(server)
+        self.fetches += 1
+        self.changes += bool(changed)
+        self.change_rate += self.smoothing * (bool(changed) - self.change_rate)
+        self.interval = self.clamp(self.interval * (self.tighten if changed else self.backoff))
+        return self.interval
+
+    def summary(self):
+        return (f"Intervalle: {self.interval:.2f} s | Ticks sautés: {self.skipped_ticks} | "
+                f"Changements: {self.change_rate:.0%}")
@@ -0,0 +1,165 @@
+"""Écarts de prix entre serveurs pour un même (item, trait).
+
+/api/ah/prices renvoie les annonces de tous les serveurs de la région : le prix unitaire le plus bas de
+chaque (item, trait) sur chaque serveur est rangé dans une matrice serveurs × (item, trait), NaN là où le
+serveur n'en vend pas. Les écarts min/max de toutes les colonnes sont ensuite calculés d'un coup, sans
+boucle Python par groupe. La matrice se construit depuis les colonnes décodées de Snipper, un corps
+/api/ah/prices ou un fichier Parquet de Json_to_parquet.py (items par nom).
+"""
+import numpy as np
+
+from numpy_engine import NULL_TRAIT
+from parallel_decode import decode_server_payload
+from prices_parser import extract_server_payloads
+
+MIN_SERVERS = 2  # Un écart n'a de sens qu'avec au moins deux serveurs en vente
+RANKINGS = ("gap", "percent")
+TRAIT_BITS = 32
+
+
+def pair_keys(items, traits):
+    """Une clé int64 par (item, trait) : l'item sur les 32 bits hauts, le trait sur les 32 bits bas."""
+    if len(items) and (items.min() < 0 or items.max() >> (63 - TRAIT_BITS) or traits.min() < 0
+                       or traits.max() >> TRAIT_BITS):
+        raise ValueError("Identifiant d'item ou de trait hors de 32 bits")
+    return (items << TRAIT_BITS) | traits
+
+
+def split_keys(keys):
+    return keys >> TRAIT_BITS, keys & ((1 << TRAIT_BITS) - 1)
+
+
+def lowest_by_key(keys, prices):
+    """Prix le plus bas de chaque clé : (clés triées, prix), un seul tri sur une colonne int64."""
+    if len(keys) == 0:
+        return keys, prices
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return keys[starts], np.minimum.reduceat(prices[order], starts)
+
+
+def lowest_asks(columns):
+    """(clés, prix) : prix le plus bas de chaque (item, trait) d'un serveur, depuis ses SalesColumns.
+
+    Les ventes sans trait sont comptées sous NULL_TRAIT. Une réponse par serveur de quelques milliers
+    d'entrées : c'est ce qui revient des processus du balayage multi-serveurs.
+    """
+    items = np.array(columns.item, dtype=np.int64)
+    traits = np.array([NULL_TRAIT if trait is None else trait for trait in columns.trait], dtype=np.int64)
+    return lowest_by_key(pair_keys(items, traits), np.array(columns.price, dtype=np.float64))
+
+
+def as_number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+class SpreadMatrix:
+    """Prix le plus bas par serveur (lignes) et par (item, trait) (colonnes)."""
+
+    def __init__(self, servers, items, traits, asks):
+        self.servers = list(servers)
+        self.items = items  # Identifiants numériques (Snipper) ou noms (Parquet)
+        self.traits = traits
+        self.asks = asks  # float64, NaN : pas en vente sur ce serveur
+        self.columns_by_name = None  # (Name, Trait) affichés -> colonne, construit à la demande
+
+    @classmethod
+    def from_asks(cls, asks_by_server):
+        """Depuis {serveur: (clés, prix)} déjà réduits à un prix par (item, trait), comme lowest_asks."""
+        servers = list(asks_by_server)
+        parts = [asks_by_server[server] for server in servers]
+        keys = np.concatenate([part[0] for part in parts]) if parts else np.zeros(0, dtype=np.int64)
+        prices = np.concatenate([part[1] for part in parts]) if parts else np.zeros(0)
+        rows = np.repeat(np.arange(len(servers)), [len(part[0]) for part in parts])
+
+        pairs, columns = np.unique(keys, return_inverse=True)
+        asks = np.full((len(servers), len(pairs)), np.nan)
+        asks[rows, columns.ravel()] = prices  # Une seule entrée par (serveur, clé)
+        return cls(servers, *split_keys(pairs), asks)
+
+    @classmethod
+    def from_columns(cls, columns_by_server):
+        """Depuis {serveur: SalesColumns}, par exemple les données décodées de chaque serveur."""
+        return cls.from_asks({server: lowest_asks(columns) for server, columns in columns_by_server.items()})
+
+    @classmethod
+    def from_body(cls, body, servers=None):
+        """Depuis un corps /api/ah/prices (tous les serveurs si servers est None)."""
+        payloads = extract_server_payloads(body, servers)
+        return cls.from_columns({server: decode_server_payload(payload, columnar=True)
+                                 for server, payload in payloads.items()})
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Depuis une DataFrame de Json_to_parquet.py (colonnes s_id, i_name, i_t, s_p ; pandas requis)."""
+        frame = frame.assign(i_t=frame['i_t'].fillna(NULL_TRAIT).astype(np.int64))
+        asks = frame.groupby(['i_name', 'i_t', 's_id'])['s_p'].min().unstack('s_id')
+        return cls(asks.columns, asks.index.get_level_values('i_name').to_numpy(),
+                   asks.index.get_level_values('i_t').to_numpy(), asks.to_numpy(dtype=np.float64).T)
+
+    @classmethod
+    def from_parquet(cls, filename):
+        import pandas as pd  # Uniquement pour l'historique Parquet
+
+        return cls.from_frame(pd.read_parquet(filename, columns=['s_id', 'i_name', 'i_t', 's_p']))
+
+    def spreads(self):
+        """Écart de chaque colonne en une passe : dictionnaire de colonnes NumPy, une entrée par (item, trait)."""
+        listed = ~np.isnan(self.asks)
+        low_row = np.where(listed, self.asks, np.inf).argmin(axis=0)
+        high_row = np.where(listed, self.asks, -np.inf).argmax(axis=0)
+        columns = np.arange(self.asks.shape[1])
+        low, high = self.asks[low_row, columns], self.asks[high_row, columns]
+        gap = high - low
+        percent = np.divide(gap, low, out=np.zeros_like(gap), where=low > 0) * 100
+        return {'servers': listed.sum(axis=0), 'low_row': low_row, 'low': low, 'high_row': high_row, 'high': high,
+                'gap': gap, 'percent': percent}
+
+    def top(self, k=20, by="gap", min_servers=MIN_SERVERS, item_index=None):
+        """Les k plus grands écarts, du plus grand au plus petit, au format des résultats de Snipper."""
+        if by not in RANKINGS:
+            raise ValueError(f"Classement inconnu : {by!r} (attendu : {', '.join(RANKINGS)})")
+        spreads = self.spreads()
+        eligible = np.flatnonzero(spreads['servers'] >= min_servers)
+        key = spreads[by][eligible]
+        if k < len(eligible):  # Sélection partielle, seules les k colonnes gardées sont triées
+            kept = np.argpartition(-key, k - 1)[:k]
+            eligible, key = eligible[kept], key[kept]
+        ranked = eligible[np.argsort(-key, kind='stable')]
+        return [self.row(column, spreads, item_index) for column in ranked]
+
+    def row(self, column, spreads, item_index=None):
+        name, trait = self.group_names(column, item_index)
+        return {
+            'Name': name,
+            'Trait': trait,
+            'Low Server': self.servers[spreads['low_row'][column]],
+            'Low Price': as_number(spreads['low'][column]),
+            'High Server': self.servers[spreads['high_row'][column]],
+            'High Price': as_number(spreads['high'][column]),
+            'Gap': as_number(spreads['gap'][column]),
+            'Gap (%)': round(float(spreads['percent'][column]), 2),
+            'Servers': int(spreads['servers'][column]),
+        }
+
+    def group_names(self, column, item_index=None):
+        item, trait = self.items[column], int(self.traits[column])
+        trait_name = "NULL" if trait == NULL_TRAIT else str(trait)
+        if item_index is None or isinstance(item, str):
+            return str(item), trait_name
+        return item_index.name(int(item)), item_index.trait_name(trait_name)
+
+    def server_asks(self, column):
+        """{serveur: prix le plus bas} d'une colonne, pour les serveurs qui la vendent."""
+        return {server: as_number(price) for server, price in zip(self.servers, self.asks[:, column])
+                if not np.isnan(price)}
+
+    def find(self, name, trait, item_index=None):
+        """Colonne d'un groupe par les noms affichés (Name, Trait), ou None."""
+        if self.columns_by_name is None:
+            self.columns_by_name = {}
+            for column in range(len(self.items)):
+                self.columns_by_name.setdefault(self.group_names(column, item_index), column)
+        return self.columns_by_name.get((name, trait))
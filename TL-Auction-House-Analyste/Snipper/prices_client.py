@@ -0,0 +1,177 @@
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from compressed_json import decompress, decompress_columns
+from prices_parser import extract_server_payload
+from tldb_urls import prices_url
+
+PRICES_URL = prices_url()
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
+}
+
+
+@dataclass
+class FetchStats:
+    requests: int = 0
+    not_modified: int = 0  # Réponses 304 (ETag / If-Modified-Since)
+    unchanged_body: int = 0  # Corps identique au précédent : ni parsing JSON ni décompression
+    unchanged_server: int = 0  # Autres serveurs modifiés mais pas le nôtre : pas de décompression
+    decoded: int = 0
+    hedges: int = 0  # Secondes requêtes envoyées par la HedgingPolicy
+    connections_opened: int = 0
+
+    @property
+    def skipped(self):
+        return self.not_modified + self.unchanged_body + self.unchanged_server
+
+    @property
+    def connections_reused(self):
+        return self.requests + self.hedges - self.connections_opened
+
+    def summary(self):
+        return (f"Requêtes: {self.requests} (connexions réutilisées: {self.connections_reused}) | "
+                f"Cycles sautés: {self.skipped} (304: {self.not_modified}, identiques: "
+                f"{self.unchanged_body + self.unchanged_server})")
+
+
+class PricesClient:
+    """Client HTTP partagé entre les cycles de fetch de /api/ah/prices.
+
+    Garde une session keep-alive (pas de TCP+TLS à chaque cycle), envoie If-None-Match /
+    If-Modified-Since et ne parse / décompresse que si les données ont réellement changé.
+    Avec columnar=True, fetch_server renvoie des colonnes (compressed_json.SalesColumns) au lieu de dicts.
+    Avec une HedgingPolicy, une requête lente est doublée (voir hedging.py) et timeout est remplacé par
+    le budget de la politique ; chaque thread de l'executor a alors sa propre session, une requête perdante
+    n'occupe donc jamais la connexion du fetch suivant.
+    Avec un recorder (snapshot_log.SnapshotLog), chaque nouveau corps est archivé.
+    """
+
+    def __init__(self, url=PRICES_URL, timeout=10, pool_size=4, columnar=False, hedging=None, recorder=None):
+        self.url = url
+        self.columnar = columnar
+        self.hedging = hedging
+        self.recorder = recorder
+        self.executor = ThreadPoolExecutor(max_workers=pool_size) if hedging is not None else None
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.session, self.adapter = self.new_session()
+        self.thread_sessions = threading.local()
+        self.hedge_sessions = []  # (session, adapter) des threads de l'executor
+        self.sessions_lock = threading.Lock()
+
+        self.etag = None
+        self.last_modified = None
+        self.body_hash = None
+        self.server_payloads = {}
+        self.stats = FetchStats()
+
+    def new_session(self):
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session, adapter
+
+    def thread_session(self):
+        """Session du thread courant de l'executor (requests.Session n'est pas partagée entre threads)."""
+        session = getattr(self.thread_sessions, "session", None)
+        if session is None:
+            session, adapter = self.new_session()
+            self.thread_sessions.session = session
+            with self.sessions_lock:
+                self.hedge_sessions.append((session, adapter))
+        return session
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.session.close()
+        with self.sessions_lock:
+            for session, _ in self.hedge_sessions:
+                session.close()
+
+    def fetch_response(self):
+        """(réponse, empreinte du corps), ou (None, None) si le corps est identique au dernier corps retenu."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        if self.hedging is None:
+            response = self.session.get(self.url, headers=headers, timeout=self.timeout)
+        else:
+            response = self.hedging.call(
+                lambda timeout: self.thread_session().get(self.url, headers=headers, timeout=timeout), self.executor)
+            self.stats.hedges = self.hedging.hedges
+        self.stats.requests += 1
+        self.stats.connections_opened = self.count_opened_connections()
+
+        if response.status_code == 304:
+            self.stats.not_modified += 1
+            return None, None
+        response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
+
+        body_hash = hashlib.blake2b(response.content, digest_size=16).digest()
+        if body_hash == self.body_hash:
+            self.stats.unchanged_body += 1
+            return None, None
+        return response, body_hash
+
+    def accept(self, response, body_hash):
+        """Retient les validateurs (ETag, Last-Modified) et l'empreinte d'un corps traité sans erreur.
+
+        Appelé seulement après le traitement : un corps qui n'a pas pu être décodé est redemandé et relu.
+        """
+        self.etag = response.headers.get("ETag", self.etag)
+        self.last_modified = response.headers.get("Last-Modified", self.last_modified)
+        self.body_hash = body_hash
+        if self.recorder is not None:
+            self.recorder.append(response.content)
+
+    def fetch_body(self):
+        """Renvoie le corps brut de la réponse, ou None s'il est identique au précédent."""
+        response, body_hash = self.fetch_response()
+        if response is None:
+            return None
+        self.accept(response, body_hash)
+        return response.content
+
+    def fetch_server(self, server):
+        """Données décompressées d'un serveur, ou None si elles n'ont pas changé depuis le dernier appel.
+
+        Dicts décompressés, ou colonnes si le client est columnar. Prévu pour interroger toujours le même
+        serveur : un corps inchangé renvoie None sans le relire. Si le serveur manque ou que sa chaîne ne se
+        décode pas, l'exception remonte et le même corps sera relu au prochain appel.
+        """
+        response, body_hash = self.fetch_response()
+        if response is None:
+            return None
+
+        payload = extract_server_payload(response.content, server)  # Seule la chaîne de ce serveur est décodée
+        if self.server_payloads.get(server) == payload:
+            self.stats.unchanged_server += 1
+            self.accept(response, body_hash)
+            return None
+
+        decode = decompress_columns if self.columnar else decompress
+        server_data = decode(json.loads(payload))
+        self.server_payloads[server] = payload
+        self.accept(response, body_hash)
+        self.stats.decoded += 1
+        return server_data
+
+    def count_opened_connections(self):
+        # urllib3 compte les connexions créées par pool : tout le reste est une connexion réutilisée
+        with self.sessions_lock:
+            adapters = [self.adapter] + [adapter for _, adapter in self.hedge_sessions]
+        return sum(pools[key].num_connections for pools in (adapter.poolmanager.pools for adapter in adapters)
+                   for key in pools.keys())
@@ -0,0 +1,108 @@
+import json
+import re
+
+# Clé "list" de la réponse /api/ah/prices :
+# {"list": {"30001": "<json compressé>", ...}, "total": ..., "regions": ...}
+LIST_KEY = re.compile(rb'"list"\s*:\s*\{')
+WHITESPACE = b" \t\r\n"
+
+
+def skip_whitespace_back(body, pos):
+    while pos >= 0 and body[pos] in WHITESPACE:
+        pos -= 1
+    return pos
+
+
+def skip_whitespace(body, pos):
+    while pos < len(body) and body[pos] in WHITESPACE:
+        pos += 1
+    return pos
+
+
+def is_escaped(body, pos):
+    """Vrai si le caractère à pos est précédé d'un nombre impair de backslashs."""
+    backslashes = 0
+    while pos - backslashes - 1 >= 0 and body[pos - backslashes - 1] == 0x5C:
+        backslashes += 1
+    return backslashes % 2 == 1
+
+
+def iter_list_entries(body):
+    """Parcourt les entrées de "list" : (serveur, début, fin) de chaque valeur, sans la décoder.
+
+    On saute de ':' en ':' (recherche d'un seul octet, très rapide). Un ':' structurel suit forcément
+    un '"' non échappé, ce qui est impossible à l'intérieur d'une chaîne JSON : chaque clé est donc
+    trouvée sans lire le contenu des chaînes compressées des autres serveurs.
+    """
+    match = LIST_KEY.search(body)
+    if match is None:
+        raise ValueError("Clé 'list' introuvable")
+
+    pos = match.end()
+    if body[skip_whitespace(body, pos):skip_whitespace(body, pos) + 1] == b'}':
+        return  # "list" vide
+
+    previous = None  # (serveur, début de la valeur)
+    while True:
+        colon = body.find(b':', pos)
+        if colon == -1:
+            break
+        pos = colon + 1
+        key_end = skip_whitespace_back(body, colon - 1)
+        if body[key_end] != 0x22 or is_escaped(body, key_end):
+            continue  # ':' à l'intérieur d'une chaîne
+
+        key_start = body.rfind(b'"', 0, key_end)  # Les clés ne contiennent pas d'échappement
+        separator = skip_whitespace_back(body, key_start - 1)
+        if previous is not None:
+            value_end = skip_whitespace_back(body, separator - 1)
+            if body[value_end] == 0x7D:  # '},' : fin de "list", clé suivante de premier niveau
+                value_end = skip_whitespace_back(body, value_end - 1)
+                yield previous[0], previous[1], value_end + 1
+                return
+            yield previous[0], previous[1], value_end + 1
+
+        value_start = skip_whitespace(body, colon + 1)
+        if body[value_start:value_start + 1] != b'"':
+            raise ValueError(f"Chaîne attendue à la position {value_start}")
+        previous = (body[key_start + 1:key_end].decode(), value_start)
+
+    if previous is not None:
+        # "list" est la dernière clé : la valeur se termine avant '}}'
+        value_end = skip_whitespace_back(body, len(body) - 1)
+        for _ in range(2):
+            if body[value_end] != 0x7D:
+                raise ValueError("Fin de réponse inattendue")
+            value_end = skip_whitespace_back(body, value_end - 1)
+        yield previous[0], previous[1], value_end + 1
+
+
+def extract_server_payloads(body, servers=None):
+    """Extrait les chaînes compressées des serveurs demandés (tous si servers est None).
+
+    Seules les chaînes de ces serveurs sont décodées ; si la réponse n'a pas la forme attendue,
+    on retombe sur un json.loads complet.
+    """
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    wanted = None if servers is None else set(servers)
+
+    try:
+        payloads = {}
+        for server, start, end in iter_list_entries(body):
+            if wanted is None or server in wanted:
+                payload = json.loads(body[start:end])  # Valide aussi les bornes trouvées
+                if not isinstance(payload, str):
+                    raise ValueError(f"Valeur inattendue pour le serveur {server}")
+                payloads[server] = payload
+                if wanted is not None and len(payloads) == len(wanted):
+                    break
+        return payloads
+    except (ValueError, IndexError):
+        list_data = json.loads(body)["list"]
+        return {server: payload for server, payload in list_data.items() if wanted is None or server in wanted}
+
+
+def extract_server_payload(body, server):
+    """Chaîne compressée d'un seul serveur (KeyError s'il est absent de la réponse)."""
+    return extract_server_payloads(body, [server])[server]
@@ -0,0 +1,127 @@
+"""Relecture des corps enregistrés par snapshot_log, à la place d'un fetch sur tldb.info.
+
+ReplayClient a le même fetch_server que PricesClient : Snipper, impossible.py ou un benchmark le
+branchent à la place du client HTTP. Les relevés sont rejoués à leur rythme d'origine (speed=1), N fois
+plus vite (speed=N) ou sans attente (speed=None), ce qui permet de mesurer l'analyse et l'affichage
+hors ligne et de reproduire un pic enregistré.
+"""
+import json
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from compressed_json import decompress, decompress_columns
+from hedging import latency_summary
+from prices_parser import extract_server_payload
+
+
+class ReplayFinished(Exception):
+    """Tous les relevés de l'intervalle ont été rejoués."""
+
+
+def stage_window():
+    return deque(maxlen=1000)
+
+
+@dataclass
+class ReplayStats:
+    snapshots: int = 0  # Relevés rejoués
+    decoded: int = 0
+    unchanged: int = 0  # Relevés où la chaîne du serveur n'a pas changé
+    started_at: float = None
+    finished_at: float = None
+    read: deque = field(default_factory=stage_window)  # Lecture du segment + décompression zlib/lzma
+    decode: deque = field(default_factory=stage_window)  # Extraction de la chaîne du serveur + compress_json
+    lag: deque = field(default_factory=stage_window)  # Retard sur l'horaire de relecture
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def snapshots_per_second(self):
+        return self.snapshots / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"Relecture: {self.snapshots} relevés ({self.snapshots_per_second:.1f}/s, "
+                f"inchangés: {self.unchanged}) | Lecture {latency_summary(self.read)} | "
+                f"Décodage {latency_summary(self.decode)}")
+
+
+class ReplayClient:
+    """Rejoue un SnapshotLog (ouvert en lecture seule) entre start et end.
+
+    Un seul curseur : chaque appel de fetch_server consomme un relevé, comme un fetch consomme une
+    réponse. À la fin, ReplayFinished est levée, ou la relecture recommence si loop est vrai.
+    """
+
+    def __init__(self, log, speed=1.0, start=None, end=None, columnar=False, loop=False):
+        if speed is not None and speed <= 0:
+            raise ValueError("speed doit être positif (None : sans attente)")
+        self.log = log
+        self.speed = speed
+        self.columnar = columnar
+        self.loop = loop
+        self.entries = log.entries_between(start, end)
+        if not self.entries:
+            raise ValueError("Aucun relevé enregistré dans cet intervalle")
+        self.position = 0
+        self.clock_origin = None  # (horloge réelle, horodatage enregistré) du premier relevé rejoué
+        self.server_payloads = {}
+        self.stats = ReplayStats()
+
+    def close(self):
+        self.stats.finished_at = self.stats.finished_at or time.perf_counter()
+        self.log.close()
+
+    def wait_until_due(self, entry):
+        now = time.perf_counter()
+        if self.clock_origin is None:
+            self.clock_origin = (now, entry.timestamp)
+            self.stats.started_at = now
+        if self.speed is None:
+            return
+        due = self.clock_origin[0] + (entry.timestamp - self.clock_origin[1]) / self.speed
+        if due > now:
+            time.sleep(due - now)
+        else:
+            self.stats.lag.append(now - due)
+
+    def next_body(self):
+        if self.position == len(self.entries):
+            if not self.loop:
+                self.stats.finished_at = self.stats.finished_at or time.perf_counter()
+                raise ReplayFinished(self.stats.summary())
+            self.position = 0
+            self.clock_origin = None
+            self.server_payloads.clear()
+        entry = self.entries[self.position]
+        self.position += 1
+        self.wait_until_due(entry)
+
+        start_time = time.perf_counter()
+        body = self.log.read(entry)
+        self.stats.read.append(time.perf_counter() - start_time)
+        self.stats.snapshots += 1
+        return body
+
+    def fetch_body(self):
+        """Corps brut du relevé suivant, tous serveurs (comme PricesClient.fetch_body)."""
+        return self.next_body()
+
+    def fetch_server(self, server):
+        """Données du relevé suivant pour ce serveur, ou None si sa chaîne n'a pas changé."""
+        body = self.next_body()
+        start_time = time.perf_counter()
+        payload = extract_server_payload(body, server)
+        if self.server_payloads.get(server) == payload:
+            self.stats.unchanged += 1
+            return None
+        self.server_payloads[server] = payload
+        decode = decompress_columns if self.columnar else decompress
+        data = decode(json.loads(payload))
+        self.stats.decode.append(time.perf_counter() - start_time)
+        self.stats.decoded += 1
+        return data
@@ -0,0 +1,115 @@
+import heapq
+
+
+def result_row(group_key, depth, cost, instant_profit, profitability, item_price, sale_price):
+    """Un résultat au format affiché par Snipper (une ligne de l'arbre)."""
+    name, trait, occurrences = group_key
+    return {
+        'Name': name,
+        'Trait': trait,
+        'Depth': depth,
+        'Cost': cost,
+        'Instant Profit': instant_profit,
+        'Profitability (%)': profitability,
+        'Item Price': item_price,
+        'Occurrences': occurrences,
+        'Sale Price': sale_price
+    }
+
+
+class ResultsCache:
+    """Résultats bruts (non filtrés) du dernier snapshot, rangés par colonnes.
+
+    Permet de refiltrer / retrier instantanément quand les seuils changent, sans relancer l'analyse,
+    tant que la profondeur demandée ne dépasse pas celle qui a été calculée.
+    """
+
+    def __init__(self, depth):
+        self.depth = depth
+
+        # Name / Trait / Occurrences sont communs à toutes les profondeurs d'un groupe
+        self.groups = []
+        self.group = []
+        # Les valeurs restent des objets Python : int ou float selon les prix, comme dans les résultats d'origine
+        self.depths = []
+        self.cost = []
+        self.instant_profit = []
+        self.profitability = []
+        self.item_price = []
+        self.sale_price = []
+
+    def __len__(self):
+        return len(self.depths)
+
+    def add_group(self, group_key, columns):
+        """Ajoute un groupe (Name, Trait, Occurrences) et ses colonnes, une valeur par profondeur."""
+        depths, costs, instant_profits, profitabilities, item_prices, sale_prices = columns
+        self.group.extend([len(self.groups)] * len(depths))
+        self.groups.append(group_key)
+        self.depths.extend(depths)
+        self.cost.extend(costs)
+        self.instant_profit.extend(instant_profits)
+        self.profitability.extend(profitabilities)
+        self.item_price.extend(item_prices)
+        self.sale_price.extend(sale_prices)
+
+    def covers(self, depth):
+        return depth <= self.depth
+
+    def row(self, i):
+        return result_row(self.groups[self.group[i]], self.depths[i], self.cost[i], self.instant_profit[i],
+                          self.profitability[i], self.item_price[i], self.sale_price[i])
+
+    def filter(self, percentage_threshold, cost_threshold, mini_profit, depth=None):
+        """Applique les seuils et trie par 'Instant Profit' décroissant (tri stable, comme process_data)."""
+        if depth is None:
+            depth = self.depth
+        elif not self.covers(depth):
+            raise ValueError(f"Profondeur {depth} non calculée (cache jusqu'à {self.depth})")
+
+        rows = [i for i, (profitability, cost, instant_profit, row_depth) in
+                enumerate(zip(self.profitability, self.cost, self.instant_profit, self.depths)) if
+                profitability >= percentage_threshold and cost <= cost_threshold and
+                instant_profit >= mini_profit and row_depth <= depth]
+        rows.sort(key=self.instant_profit.__getitem__, reverse=True)
+        return [self.row(i) for i in rows]
+
+
+def passes_thresholds(profitability, cost, instant_profit, percentage_threshold, cost_threshold, mini_profit):
+    return profitability >= percentage_threshold and cost <= cost_threshold and instant_profit >= mini_profit
+
+
+class TopResults:
+    """Les k meilleurs résultats par 'Instant Profit', gardés dans un tas de taille k pendant la génération.
+
+    Même ordre que filter()[:k] : à profit égal, le résultat généré en premier passe devant. La mémoire
+    et le tri ne dépendent que de k, pas du nombre de lignes (catalogue × profondeur).
+    """
+
+    def __init__(self, k):
+        if k < 1:
+            raise ValueError("k doit être au moins 1")
+        self.k = k
+        self.heap = []  # Tas min de (profit, -numéro de génération, ligne) : la racine est la première évincée
+        self.pushed = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def floor(self):
+        """Profit minimal pour entrer dans le tas (None tant qu'il n'est pas plein)."""
+        return self.heap[0][0] if len(self.heap) == self.k else None
+
+    def push(self, instant_profit, make_row):
+        """Propose une ligne ; make_row n'est appelé que si elle entre dans le tas."""
+        self.pushed += 1
+        if len(self.heap) == self.k:
+            if instant_profit <= self.heap[0][0]:
+                return False  # À égalité, la ligne déjà gardée a été générée avant
+            heapq.heapreplace(self.heap, (instant_profit, -self.pushed, make_row()))
+        else:
+            heapq.heappush(self.heap, (instant_profit, -self.pushed, make_row()))
+        return True
+
+    def results(self):
+        return [row for _, _, row in sorted(self.heap, key=lambda entry: (-entry[0], -entry[1]))]
@@ -0,0 +1,218 @@
+"""Snapshots d'un serveur en mémoire partagée, lus sans copie sous forme de vues NumPy.
+
+Un bloc multiprocessing.shared_memory par serveur : un en-tête puis deux emplacements de colonnes de
+largeur fixe (item, trait, prix, quantité de la vente, quantité de l'item ; int64). L'écrivain remplit
+l'emplacement inactif puis incrémente le compteur de génération : un lecteur détecte un nouveau snapshot
+en lisant un seul entier, et les vues de la génération N restent intactes jusqu'à ce que l'écrivain
+commence la génération N + 2 (is_valid() le vérifie après coup).
+"""
+import sys
+import time
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from compressed_json import SalesColumns, columns_from_data
+
+MAGIC = 0x544C44425348_0001  # "TLDBSH", version 1
+NO_TRAIT = -1  # Vente sans 't'
+NO_QUANTITY = -1  # 'quantity' absent
+DEFAULT_CAPACITY = 1 << 18  # Lignes par emplacement (~27 000 ventes par serveur aujourd'hui)
+
+HEADER_DTYPE = np.dtype([
+    ('magic', np.uint64),
+    ('capacity', np.int64),
+    ('generation', np.int64),  # Dernière génération publiée (0 : aucune)
+    ('writing', np.int64),  # Génération en cours d'écriture (égale à generation hors écriture)
+    ('rows', np.int64, (2,)),
+    ('fetched_at', np.float64, (2,)),
+])
+COLUMNS = ('item', 'trait', 'price', 'count', 'quantity')
+ROW_SIZE = len(COLUMNS) * np.dtype(np.int64).itemsize
+
+_written_blocks = set()  # Blocs créés par un écrivain de ce processus (suivis par son resource_tracker)
+
+
+class StaleSnapshotError(RuntimeError):
+    """L'écrivain a réutilisé l'emplacement d'une vue pendant sa lecture."""
+
+
+def block_name(server):
+    return f"tldb_snapshot_{server}"
+
+
+def block_size(capacity):
+    return HEADER_DTYPE.itemsize + 2 * capacity * ROW_SIZE
+
+
+def map_block(buffer, capacity):
+    """En-tête et colonnes [emplacement][colonne] du bloc, comme vues NumPy sur le buffer partagé."""
+    header = np.ndarray((), dtype=HEADER_DTYPE, buffer=buffer)
+    slots = []
+    for slot in range(2):
+        offset = HEADER_DTYPE.itemsize + slot * capacity * ROW_SIZE
+        slots.append({name: np.ndarray((capacity,), dtype=np.int64, buffer=buffer,
+                                       offset=offset + position * capacity * 8)
+                      for position, name in enumerate(COLUMNS)})
+    return header, slots
+
+
+class SharedSnapshotWriter:
+    """Publie les snapshots d'un serveur ; un seul écrivain par bloc."""
+
+    def __init__(self, server, capacity=DEFAULT_CAPACITY):
+        self.server = server
+        self.capacity = capacity
+        try:
+            self.memory = shared_memory.SharedMemory(block_name(server), create=True, size=block_size(capacity))
+        except FileExistsError:
+            # Bloc laissé par un écrivain arrêté brutalement : on le remplace
+            stale = shared_memory.SharedMemory(block_name(server))
+            stale.close()
+            stale.unlink()
+            self.memory = shared_memory.SharedMemory(block_name(server), create=True, size=block_size(capacity))
+        _written_blocks.add(block_name(server))
+        self.header, self.slots = map_block(self.memory.buf, capacity)
+        self.header['capacity'] = capacity
+        self.header['generation'] = 0
+        self.header['writing'] = 0
+        self.header['magic'] = MAGIC
+
+    def publish(self, data, fetched_at=None):
+        """Écrit un snapshot (dicts décompressés ou SalesColumns) et renvoie sa génération."""
+        columns = data if isinstance(data, SalesColumns) else columns_from_data(data)
+        rows = len(columns)
+        if rows > self.capacity:
+            raise ValueError(f"Snapshot de {rows} ventes pour un bloc de {self.capacity} lignes")
+        prices = np.asarray(columns.price)
+        if rows and prices.dtype.kind != 'i':
+            raise ValueError("Prix non entiers : non représentables dans le bloc partagé")
+
+        generation = int(self.header['generation']) + 1
+        slot = generation % 2
+        self.header['writing'] = generation  # Les vues de generation - 1 (autre emplacement) restent valides
+        target = self.slots[slot]
+        target['item'][:rows] = columns.item
+        target['trait'][:rows] = [NO_TRAIT if trait is None else trait for trait in columns.trait]
+        target['price'][:rows] = prices
+        target['count'][:rows] = columns.count
+        target['quantity'][:rows] = [NO_QUANTITY if quantity is None else quantity for quantity in columns.quantity]
+        self.header['rows'][slot] = rows
+        self.header['fetched_at'][slot] = time.time() if fetched_at is None else fetched_at
+        self.header['generation'] = generation
+        return generation
+
+    def close(self, unlink=True):
+        self.header = self.slots = None  # Les vues doivent disparaître avant de fermer le buffer
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+            _written_blocks.discard(block_name(self.server))
+
+
+class SnapshotView:
+    """Colonnes d'une génération, vues NumPy sans copie sur le bloc partagé."""
+
+    def __init__(self, reader, generation, columns, fetched_at):
+        self.reader = reader
+        self.generation = generation
+        self.fetched_at = fetched_at
+        self.item = columns['item']
+        self.trait = columns['trait']
+        self.price = columns['price']
+        self.count = columns['count']
+        self.quantity = columns['quantity']
+
+    def __len__(self):
+        return len(self.item)
+
+    def is_valid(self):
+        """Vrai tant que l'écrivain n'a pas commencé à réécrire l'emplacement de cette génération."""
+        return int(self.reader.header['writing']) < self.generation + 2
+
+    def check(self):
+        if not self.is_valid():
+            raise StaleSnapshotError(f"Génération {self.generation} réécrite pendant la lecture")
+
+    def to_columns(self):
+        """Copie en SalesColumns (listes Python), pour le moteur python de DataProcessor."""
+        columns = SalesColumns()
+        columns.item = self.item.tolist()
+        columns.trait = [None if trait == NO_TRAIT else trait for trait in self.trait.tolist()]
+        columns.price = self.price.tolist()
+        columns.count = self.count.tolist()
+        columns.quantity = [None if quantity == NO_QUANTITY else quantity for quantity in self.quantity.tolist()]
+        self.check()
+        return columns
+
+
+@dataclass
+class ReaderStats:
+    generation: int = 0  # Dernière génération lue
+    reads: int = 0
+    skipped: int = 0  # Générations publiées mais jamais lues (le lecteur était en retard)
+    timeouts: int = 0  # wait_for_new sans nouvelle génération
+    stale: int = 0  # Lectures abandonnées : emplacement réécrit pendant la lecture
+
+    def summary(self):
+        return (f"Mémoire partagée: génération {self.generation} | Lectures: {self.reads} "
+                f"(sautées: {self.skipped}, attentes vides: {self.timeouts}, réécrites: {self.stale})")
+
+
+class SharedSnapshotReader:
+    """Accès en lecture au bloc d'un serveur ; plusieurs lecteurs, dans n'importe quel processus."""
+
+    def __init__(self, server):
+        self.server = server
+        self.memory = shared_memory.SharedMemory(block_name(server))
+        if sys.version_info < (3, 13) and sys.platform != "win32" and block_name(server) not in _written_blocks:
+            # Sinon le resource_tracker de ce processus supprimerait le bloc de l'écrivain à sa sortie
+            resource_tracker.unregister(self.memory._name, "shared_memory")
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self.memory.buf)
+        magic, capacity = int(header['magic']), int(header['capacity'])
+        del header  # Le buffer ne peut pas être fermé tant qu'une vue existe
+        if magic != MAGIC:
+            self.memory.close()
+            raise ValueError(f"Bloc {block_name(server)} : format inconnu")
+        self.header, self.slots = map_block(self.memory.buf, capacity)
+        self.last_generation = 0
+        self.stats = ReaderStats()
+
+    @property
+    def generation(self):
+        return int(self.header['generation'])
+
+    def read(self):
+        """Vue de la dernière génération publiée, ou None si rien n'a encore été publié."""
+        generation = self.generation
+        if generation == 0:
+            return None
+        slot = generation % 2
+        rows = int(self.header['rows'][slot])
+        columns = {name: column[:rows] for name, column in self.slots[slot].items()}
+        view = SnapshotView(self, generation, columns, float(self.header['fetched_at'][slot]))
+        try:
+            view.check()
+        except StaleSnapshotError:
+            self.stats.stale += 1
+            raise
+        if self.last_generation:
+            self.stats.skipped += max(0, generation - self.last_generation - 1)
+        self.last_generation = self.stats.generation = generation
+        self.stats.reads += 1
+        return view
+
+    def wait_for_new(self, timeout=1.0, poll_interval=0.01):
+        """Vue de la prochaine génération non encore lue, ou None après timeout secondes."""
+        deadline = time.monotonic() + timeout
+        while self.generation == self.last_generation:
+            if time.monotonic() >= deadline:
+                self.stats.timeouts += 1
+                return None
+            time.sleep(poll_interval)
+        return self.read()
+
+    def close(self):
+        self.header = self.slots = None
+        self.memory.close()
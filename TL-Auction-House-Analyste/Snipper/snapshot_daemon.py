@@ -0,0 +1,381 @@
+"""Démon local qui interroge tldb.info une seule fois pour tous les clients de la machine.
+
+Le démon fait tourner un AsyncPoller et republie chaque Snapshot décodé sur un socket Unix (ou TCP
+sur 127.0.0.1 quand AF_UNIX n'existe pas). Snipper, impossible.py ou un script s'abonnent avec
+SnapshotClient au lieu de fetcher et décompresser eux-mêmes : N clients = un fetch et un décodage.
+
+Protocole : trames de 4 octets de longueur (big-endian) suivies du contenu. Le client envoie une trame
+JSON {"servers": [...] ou null}, le démon répond avec le dernier snapshot connu de chaque serveur demandé
+puis avec chaque nouveau snapshot (JSON, voir snapshot_to_json), et termine par null à l'arrêt. Rien n'est
+dépicklé : un processus qui prendrait la place du démon ne peut envoyer que des données. Le socket Unix
+est créé sous un umask 0177 (0600 dès le bind), le démon refuse de démarrer si un autre démon répond déjà
+sur ce socket, et le port TCP n'écoute que sur la boucle locale.
+
+    python snapshot_daemon.py 30001 30002   (TLDB_URL pour un autre serveur, SNAPSHOT_ADDRESS pour un autre socket)
+    python snapshot_daemon.py --shared 30001   (publie aussi en mémoire partagée, voir shared_snapshot.py)
+    python snapshot_daemon.py --deltas 30001   (publie aussi les DeltaEvent de chaque snapshot)
+    SNAPSHOT_LOG=prices_log python snapshot_daemon.py 30001   (archive les corps bruts, voir snapshot_log.py)
+"""
+import asyncio
+import errno
+import json
+import os
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+
+from async_poller import AsyncPoller, Snapshot, TLDB_URL
+from compressed_json import SalesColumns
+from snapshot_delta import DeltaEvent
+from snapshot_log import SnapshotLog
+
+FRAME_HEADER = struct.Struct(">I")
+
+if hasattr(socket, "AF_UNIX"):
+    DEFAULT_ADDRESS = os.path.join(tempfile.gettempdir(), "tldb_snapshots.sock")
+else:
+    DEFAULT_ADDRESS = ("127.0.0.1", 47017)
+
+
+def parse_address(address):
+    """Chemin de socket Unix, ou (hôte, port) pour "hôte:port"."""
+    if isinstance(address, str) and ":" in address and not os.path.isabs(address):
+        host, port = address.rsplit(":", 1)
+        return host, int(port)
+    return address
+
+
+COLUMNS = ("item", "trait", "price", "count", "quantity")
+
+
+def snapshot_to_json(snapshot):
+    """Snapshot en objet JSON : dicts tels quels, colonnes (SalesColumns) et DeltaEvent en listes."""
+    if snapshot is None:
+        return None
+    data = snapshot.data
+    if isinstance(data, SalesColumns):
+        data = {"columns": {name: getattr(data, name) for name in COLUMNS}}
+    elif snapshot.kind == "delta":
+        data = [asdict(event) for event in data]
+    return {"kind": snapshot.kind, "server": snapshot.server, "data": data, "fetched_at": snapshot.fetched_at,
+            "latency": snapshot.latency}
+
+
+def snapshot_from_json(message):
+    if message is None:
+        return None
+    data = message["data"]
+    if message["kind"] == "delta":
+        data = [DeltaEvent(**event) for event in data]
+    elif isinstance(data, dict) and set(data) == {"columns"}:
+        columns = SalesColumns()
+        for name in COLUMNS:
+            setattr(columns, name, data["columns"][name])
+        data = columns
+    return Snapshot(message["kind"], message["server"], data, message["fetched_at"], message["latency"])
+
+
+def encode_frame(snapshot):
+    payload = json.dumps(snapshot_to_json(snapshot), separators=(",", ":")).encode()
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def encode_request(servers):
+    payload = json.dumps({"servers": None if servers is None else list(servers)}).encode()
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+END_FRAME = encode_frame(None)
+
+
+@dataclass
+class DaemonStats:
+    clients: int = 0  # Clients connectés
+    connections: int = 0  # Connexions depuis le démarrage
+    frames_sent: int = 0
+    frames_dropped: int = 0  # Snapshots remplacés dans la file d'un client trop lent
+
+    def summary(self):
+        return (f"Clients: {self.clients} (connexions: {self.connections}) | Trames envoyées: {self.frames_sent} | "
+                f"Abandonnées: {self.frames_dropped}")
+
+
+@dataclass
+class ClientStats:
+    received: int = 0
+    unchanged: int = 0  # fetch_server sans nouveau snapshot
+    latencies: deque = field(default_factory=lambda: deque(maxlen=1000))  # Âge des snapshots reçus (s)
+
+    def summary(self):
+        age = f"{self.latencies[-1] * 1000:.0f} ms" if self.latencies else "-"
+        return f"Snapshots reçus du démon: {self.received} | Sans changement: {self.unchanged} | Âge: {age}"
+
+
+class Subscriber:
+    """Client connecté : file bornée de trames déjà encodées ; un client lent perd ses plus anciennes."""
+
+    def __init__(self, servers, queue_size):
+        self.servers = None if servers is None else set(servers)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def wants(self, kind, server):
+        return kind == "data" or self.servers is None or server in self.servers
+
+    def offer(self, frame, stats):
+        if self.queue.full():
+            self.queue.get_nowait()
+            stats.frames_dropped += 1
+        self.queue.put_nowait(frame)
+
+
+class SnapshotDaemon:
+    """Republie les snapshots d'un AsyncPoller à tous les clients connectés.
+
+    Chaque snapshot est encodé une seule fois puis envoyé tel quel à chaque client intéressé. Un client
+    lent ne ralentit ni le poller ni les autres clients : sa file garde les `queue_size` plus récents.
+    """
+
+    def __init__(self, poller, address=DEFAULT_ADDRESS, queue_size=4, shared_memory=False):
+        self.poller = poller
+        self.shared_memory = shared_memory  # Aussi publier les prix dans shared_snapshot (lecteurs sans copie)
+        self.writers = {}
+        self.address = parse_address(address)
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.latest = {}  # (kind, server) -> dernière trame, envoyée aux nouveaux clients
+        self.stats = DaemonStats()
+        self.server = None
+        self.ready = None
+
+    @property
+    def unix(self):
+        return isinstance(self.address, str)
+
+    def socket_in_use(self):
+        """Vrai si un démon répond déjà sur le socket Unix ; faux s'il n'existe pas ou s'il est abandonné."""
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.address)
+            return True
+        except (ConnectionRefusedError, FileNotFoundError):
+            return False
+        finally:
+            probe.close()
+
+    async def start_server(self):
+        if self.unix:
+            if self.socket_in_use():
+                raise OSError(errno.EADDRINUSE, f"Un démon de snapshots répond déjà sur {self.address}")
+            if os.path.exists(self.address):
+                os.unlink(self.address)  # Socket laissé par un démon arrêté brutalement
+            umask = os.umask(0o177)  # Socket en 0600 dès sa création, sans fenêtre avant un chmod
+            try:
+                self.server = await asyncio.start_unix_server(self.handle_client, path=self.address)
+            finally:
+                os.umask(umask)
+        else:
+            host, port = self.address
+            self.server = await asyncio.start_server(self.handle_client, host, port)
+            if port == 0:
+                self.address = self.server.sockets[0].getsockname()[:2]
+
+    async def serve(self, duration=None):
+        """Sert les clients jusqu'à l'arrêt du poller (poller.stop() ou `duration` secondes)."""
+        self.ready = asyncio.Event()
+        await self.start_server()
+        snapshots = self.poller.subscribe()
+        poller_task = asyncio.create_task(self.poller.run(duration))
+        self.ready.set()
+        loop = asyncio.get_running_loop()
+        try:
+            while (snapshot := await snapshots.get()) is not None:
+                frame = await loop.run_in_executor(None, encode_frame, snapshot)
+                if self.shared_memory and snapshot.kind == "prices":
+                    await loop.run_in_executor(None, self.write_shared, snapshot)
+                if snapshot.kind != "delta":  # Un delta ne vaut que pour qui a reçu le snapshot précédent
+                    self.latest[snapshot.kind, snapshot.server] = frame
+                for subscriber in self.subscribers:
+                    if subscriber.wants(snapshot.kind, snapshot.server):
+                        subscriber.offer(frame, self.stats)
+        finally:
+            self.poller.stop()
+            await poller_task
+            for subscriber in self.subscribers:
+                subscriber.offer(END_FRAME, self.stats)
+            self.server.close()
+            try:
+                await asyncio.wait_for(self.server.wait_closed(), timeout=1.0)  # Clients qui ne lisent plus
+            except asyncio.TimeoutError:
+                pass
+            if self.unix and os.path.exists(self.address):
+                os.unlink(self.address)
+            for writer in self.writers.values():
+                writer.close()
+
+    def write_shared(self, snapshot):
+        from shared_snapshot import SharedSnapshotWriter  # numpy n'est requis qu'avec shared_memory
+
+        if snapshot.server not in self.writers:
+            self.writers[snapshot.server] = SharedSnapshotWriter(snapshot.server)
+        self.writers[snapshot.server].publish(snapshot.data, snapshot.fetched_at)
+
+    async def handle_client(self, reader, writer):
+        try:
+            header = await reader.readexactly(FRAME_HEADER.size)
+            request = json.loads(await reader.readexactly(FRAME_HEADER.unpack(header)[0]))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            writer.close()
+            return
+
+        servers = request.get("servers") if isinstance(request, dict) else None
+        if servers:
+            self.poller.add_servers(servers)
+        subscriber = Subscriber(servers, self.queue_size)
+        for (kind, server), frame in self.latest.items():
+            if subscriber.wants(kind, server):
+                subscriber.offer(frame, self.stats)
+        self.subscribers.add(subscriber)
+        self.stats.clients += 1
+        self.stats.connections += 1
+        try:
+            while True:
+                frame = await subscriber.queue.get()
+                writer.write(frame)
+                await writer.drain()
+                self.stats.frames_sent += 1
+                if frame is END_FRAME:
+                    break
+        except ConnectionError:
+            pass  # Client parti
+        finally:
+            self.subscribers.discard(subscriber)
+            self.stats.clients -= 1
+            writer.close()
+
+
+class SnapshotClient:
+    """Abonnement synchrone au démon, utilisable à la place de PricesClient (même fetch_server).
+
+    Peut être partagé entre threads : les snapshots reçus pour un autre serveur sont gardés jusqu'à
+    ce que ce serveur soit demandé.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, servers=None, connect_timeout=5.0):
+        address = parse_address(address)
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self.socket = socket.socket(family, socket.SOCK_STREAM)
+        self.socket.settimeout(connect_timeout)
+        self.socket.connect(address)
+        self.socket.sendall(encode_request(servers))
+        self.buffer = bytearray()
+        self.lock = threading.Lock()
+        self.pending = {}  # Serveur -> dernier Snapshot pas encore lu par fetch_server
+        self.catalog = None  # Dernier catalogue __data.json reçu
+        self.closed = False
+        self.stats = ClientStats()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.socket.close()
+
+    def fill(self, size, deadline):
+        """Lit le socket jusqu'à avoir au moins `size` octets dans le tampon (socket.timeout sinon)."""
+        while len(self.buffer) < size:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise socket.timeout()
+            self.socket.settimeout(remaining)
+            chunk = self.socket.recv(max(65536, size - len(self.buffer)))
+            if not chunk:
+                raise ConnectionError("Connexion au démon fermée")
+            self.buffer += chunk
+
+    def receive(self, timeout=None):
+        """Prochain Snapshot, ou None après timeout ou à l'arrêt du démon (closed devient vrai).
+
+        Une trame incomplète reste dans le tampon et sera terminée à l'appel suivant.
+        """
+        if self.closed:
+            return None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            self.fill(FRAME_HEADER.size, deadline)
+            end = FRAME_HEADER.size + FRAME_HEADER.unpack_from(self.buffer)[0]
+            self.fill(end, deadline)
+        except socket.timeout:
+            return None
+        snapshot = snapshot_from_json(json.loads(self.buffer[FRAME_HEADER.size:end]))
+        del self.buffer[:end]
+        if snapshot is None:
+            self.closed = True
+        else:
+            self.stats.received += 1
+            self.stats.latencies.append(time.time() - snapshot.fetched_at)
+        return snapshot
+
+    def __iter__(self):
+        while (snapshot := self.receive()) is not None:
+            yield snapshot
+
+    def fetch_server(self, server, timeout=1.0):
+        """Données du prochain snapshot de ce serveur, ou None si rien de nouveau pendant `timeout` secondes."""
+        with self.lock:
+            deadline = time.monotonic() + timeout
+            while server not in self.pending:
+                snapshot = self.receive(max(0.0, deadline - time.monotonic()))
+                if snapshot is None:
+                    if self.closed:
+                        raise ConnectionError("Le démon de snapshots s'est arrêté")
+                    self.stats.unchanged += 1
+                    return None
+                if snapshot.kind == "data":
+                    self.catalog = snapshot.data
+                elif snapshot.kind == "prices":
+                    self.pending[snapshot.server] = snapshot
+            return self.pending.pop(server).data
+
+
+async def run_daemon(servers, base_url=TLDB_URL, address=DEFAULT_ADDRESS, prices_interval=5.0, columnar=False,
+                     shared_memory=False, deltas=False, log_dir=None):
+    recorder = None if log_dir is None else SnapshotLog(log_dir)
+    # Dicts par défaut : lisibles par tous les clients (impossible.py ne lit pas les colonnes)
+    poller = AsyncPoller(servers, base_url=base_url, prices_interval=prices_interval, columnar=columnar,
+                         deltas=deltas, recorder=recorder)
+    daemon = SnapshotDaemon(poller, address, shared_memory=shared_memory)
+    print(f"Démon de snapshots sur {daemon.address} pour les serveurs {', '.join(servers) or '(à la demande)'}")
+    try:
+        await daemon.serve()
+    finally:
+        print(daemon.stats.summary())
+        if recorder is not None:
+            print(recorder.stats.summary())
+            recorder.close()
+
+
+def parse_args(argv, environ=os.environ):
+    """Arguments de run_daemon pour la ligne de commande (serveurs, --shared, --deltas, SNAPSHOT_*)."""
+    return {
+        'servers': [arg for arg in argv if not arg.startswith("--")],
+        'base_url': TLDB_URL,
+        'address': environ.get("SNAPSHOT_ADDRESS", DEFAULT_ADDRESS),
+        'shared_memory': "--shared" in argv,
+        'deltas': "--deltas" in argv,
+        'log_dir': environ.get("SNAPSHOT_LOG"),
+    }
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(run_daemon(**parse_args(sys.argv[1:])))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,170 @@
+"""Différences entre deux snapshots successifs d'un serveur, par groupe (item, trait).
+
+Une annonce est un couple (prix, quantité) ; les annonces d'un groupe forment un multiensemble. Seuls les
+groupes dont les ventes ont changé sont comparés, et chaque différence devient un DeltaEvent :
+"add" (nouvelle annonce), "remove" (annonce partie) ou "reprice" (une annonce partie et une nouvelle de
+même quantité à un autre prix : le vendeur a changé son prix). Rejouer les événements depuis un
+snapshot reconstitue le suivant (apply_events), ce qui permet d'archiver des deltas plutôt que des copies.
+"""
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from compressed_json import SalesColumns
+
+ADD = "add"
+REMOVE = "remove"
+REPRICE = "reprice"
+NULL_TRAIT = "NULL"
+
+
+@dataclass(frozen=True)
+class DeltaEvent:
+    kind: str  # ADD, REMOVE ou REPRICE
+    server: str
+    item: str
+    trait: str  # NULL_TRAIT pour une vente sans 't'
+    price: int  # Prix de l'annonce (nouveau prix pour REPRICE)
+    count: int  # Quantité de l'annonce ('c')
+    listings: int = 1  # Nombre d'annonces identiques concernées
+    previous_price: Optional[int] = None  # REPRICE uniquement
+
+
+@dataclass
+class DeltaStats:
+    snapshots: int = 0
+    groups_changed: int = 0
+    groups_unchanged: int = 0
+    added: int = 0
+    removed: int = 0
+    repriced: int = 0
+
+    def count(self, events):
+        for event in events:
+            if event.kind == ADD:
+                self.added += event.listings
+            elif event.kind == REMOVE:
+                self.removed += event.listings
+            else:
+                self.repriced += event.listings
+
+    def summary(self):
+        return (f"Deltas: +{self.added} -{self.removed} ~{self.repriced} | Groupes modifiés: {self.groups_changed}, "
+                f"inchangés: {self.groups_unchanged}")
+
+
+def listing_groups(data):
+    """Annonces par groupe : {(item_id, trait): ((p, c), ...)} dans l'ordre du payload, sans rien écarter.
+
+    data est soit le payload décompressé en dicts, soit ses colonnes (compressed_json.SalesColumns).
+    """
+    groups = {}
+    if isinstance(data, SalesColumns):
+        for item_id, trait, price, count in zip(data.item, data.trait, data.price, data.count):
+            key = (str(item_id), NULL_TRAIT if trait is None else str(trait))
+            rows = groups.get(key)
+            if rows is None:
+                rows = groups[key] = []
+            rows.append((price, count))
+    else:
+        for item_id, item_data in data.items():
+            for sale in item_data.get("sales", []):
+                trait = sale.get('t')
+                key = (item_id, NULL_TRAIT if trait is None else str(trait))
+                rows = groups.get(key)
+                if rows is None:
+                    rows = groups[key] = []
+                rows.append((sale['p'], sale['c']))
+    return {key: tuple(rows) for key, rows in groups.items()}
+
+
+def diff_listings(server, key, previous_rows, rows):
+    """Événements qui transforment les annonces previous_rows du groupe en rows."""
+    previous, current = Counter(previous_rows), Counter(rows)
+    removed, added = previous - current, current - previous
+
+    # Rapprochement par quantité : la n-ième annonce partie à c unités va avec la n-ième arrivée à c unités
+    removed_by_count, added_by_count = {}, {}
+    for listings, by_count in ((removed, removed_by_count), (added, added_by_count)):
+        for (price, count), number in sorted(listings.items()):
+            by_count.setdefault(count, []).extend([price] * number)
+
+    item, trait = key
+    changes = Counter()
+    for count in sorted(removed_by_count.keys() | added_by_count.keys()):
+        old_prices, new_prices = removed_by_count.get(count, []), added_by_count.get(count, [])
+        paired = min(len(old_prices), len(new_prices))
+        for old_price, new_price in zip(old_prices, new_prices):
+            changes[REPRICE, new_price, count, old_price] += 1
+        for price in old_prices[paired:]:
+            changes[REMOVE, price, count, None] += 1
+        for price in new_prices[paired:]:
+            changes[ADD, price, count, None] += 1
+    return [DeltaEvent(kind, server, item, trait, price, count, listings, previous_price)
+            for (kind, price, count, previous_price), listings in changes.items()]
+
+
+class SnapshotDiffer:
+    """Garde le dernier snapshot de chaque serveur et renvoie les événements du suivant.
+
+    Le premier snapshot d'un serveur donne un ADD par annonce (différence avec un snapshot vide).
+    """
+
+    def __init__(self):
+        self.snapshots = {}  # Serveur -> listing_groups du dernier snapshot
+        self.stats = DeltaStats()
+
+    def diff(self, server, data):
+        groups = listing_groups(data)
+        previous = self.snapshots.get(server, {})
+        self.snapshots[server] = groups
+
+        events = []
+        for key, rows in groups.items():
+            previous_rows = previous.get(key, ())
+            if previous_rows == rows:
+                self.stats.groups_unchanged += 1
+                continue
+            self.stats.groups_changed += 1
+            events.extend(diff_listings(server, key, previous_rows, rows))
+        for key in previous.keys() - groups.keys():
+            self.stats.groups_changed += 1
+            events.extend(diff_listings(server, key, previous[key], ()))
+
+        self.stats.snapshots += 1
+        self.stats.count(events)
+        return events
+
+    def reset(self, server=None):
+        if server is None:
+            self.snapshots.clear()
+        else:
+            self.snapshots.pop(server, None)
+
+
+def counter_groups(data):
+    """Multiensembles d'annonces par groupe : {(item_id, trait): Counter({(p, c): annonces})}."""
+    return {key: Counter(rows) for key, rows in listing_groups(data).items()}
+
+
+def adjust(listings, listing, number):
+    listings[listing] += number
+    if listings[listing] <= 0:
+        del listings[listing]
+
+
+def apply_events(groups, events):
+    """Applique des événements à des counter_groups (modifiés en place, groupes vides supprimés)."""
+    for event in events:
+        key = (event.item, event.trait)
+        listings = groups.setdefault(key, Counter())
+        if event.kind == ADD:
+            adjust(listings, (event.price, event.count), event.listings)
+        elif event.kind == REMOVE:
+            adjust(listings, (event.price, event.count), -event.listings)
+        else:
+            adjust(listings, (event.previous_price, event.count), -event.listings)
+            adjust(listings, (event.price, event.count), event.listings)
+        if not listings:
+            del groups[key]
+    return groups
@@ -0,0 +1,223 @@
+"""Journal des corps bruts de /api/ah/prices : historique compressé, en ajout seul, adressé par contenu.
+
+Le répertoire contient des segments (segment-000001.log, ...) et un index (index.bin) :
+
+- un enregistrement de segment est un en-tête de taille fixe (horodatage, longueur, codec, empreinte
+  blake2b du corps brut) suivi du corps compressé (zlib ou lzma) ;
+- une entrée d'index fait une taille fixe (horodatage, empreinte, segment, position, longueur) : l'index
+  tient en mémoire et la recherche par date est une dichotomie, O(log n).
+
+Un corps identique au précédent n'est pas enregistré. Un corps déjà vu plus tôt (A, B, A) ne reçoit
+qu'une entrée d'index qui pointe vers l'enregistrement existant. À l'ouverture, les enregistrements
+écrits après la dernière entrée d'index (arrêt brutal) sont réindexés et une fin tronquée est coupée.
+"""
+import bisect
+import hashlib
+import lzma
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from typing import NamedTuple
+
+RECORD_HEADER = struct.Struct(">dIB16s")  # Horodatage, longueur compressée, codec, empreinte
+INDEX_ENTRY = struct.Struct(">d16sIQI")  # Horodatage, empreinte, segment, position de l'en-tête, longueur
+INDEX_FILE = "index.bin"
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+
+CODECS = {"zlib": 1, "lzma": 2}
+COMPRESSORS = {1: zlib.compress, 2: lzma.compress}
+DECOMPRESSORS = {1: zlib.decompress, 2: lzma.decompress}
+
+
+class LogEntry(NamedTuple):
+    timestamp: float
+    digest: bytes
+    segment: int
+    offset: int  # Position de l'en-tête de l'enregistrement dans le segment
+    length: int  # Longueur du corps compressé
+
+
+@dataclass
+class LogStats:
+    appended: int = 0  # Entrées ajoutées pendant cette session
+    unchanged: int = 0  # Corps identiques au précédent : rien d'écrit
+    deduplicated: int = 0  # Corps déjà enregistrés plus tôt : entrée d'index seule
+    clamped: int = 0  # Horodatages antérieurs à la dernière entrée (horloge reculée), ramenés à celle-ci
+    raw_bytes: int = 0  # Corps réellement écrits, avant compression
+    stored_bytes: int = 0
+
+    def summary(self):
+        ratio = self.stored_bytes / self.raw_bytes if self.raw_bytes else 0.0
+        return (f"Enregistrés: {self.appended} (inchangés: {self.unchanged}, dédupliqués: {self.deduplicated}) | "
+                f"Stockage: {self.stored_bytes / 1e6:.1f} Mo pour {self.raw_bytes / 1e6:.1f} Mo ({ratio:.1%})")
+
+
+def body_digest(body):
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+
+class SnapshotLog:
+    """Journal d'un répertoire ; un seul écrivain à la fois.
+
+    Avec readonly=True, le journal est seulement lu (relecture, rattrapage) : rien n'est réparé ni ouvert
+    en écriture, il peut donc être ouvert pendant qu'un autre processus enregistre.
+    """
+
+    def __init__(self, directory, codec="zlib", segment_size=DEFAULT_SEGMENT_SIZE, readonly=False):
+        if codec not in CODECS:
+            raise ValueError(f"Codec inconnu : {codec} (attendu : {', '.join(CODECS)})")
+        self.directory = directory
+        self.codec = CODECS[codec]
+        self.segment_size = segment_size
+        self.readonly = readonly
+        self.stats = LogStats()
+        self.index_file = self.segment_file = None
+        if not readonly:
+            os.makedirs(directory, exist_ok=True)
+
+        self.entries = []
+        self.timestamps = []  # Horodatages des entrées, croissants : clés de la dichotomie
+        self.locations = {}  # Empreinte -> entrée de son enregistrement
+        self.load_index()
+        if readonly:
+            return
+        self.index_file = open(os.path.join(directory, INDEX_FILE), "ab")
+        self.recover()
+        self.segment = max([entry.segment for entry in self.entries] or [1])
+        self.segment_file = open(self.segment_path(self.segment), "ab")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def close(self):
+        for outfile in (self.segment_file, self.index_file):
+            if outfile is not None:
+                outfile.close()
+
+    def segment_path(self, segment):
+        return os.path.join(self.directory, f"segment-{segment:06d}.log")
+
+    def add_entry(self, entry):
+        self.entries.append(entry)
+        self.timestamps.append(entry.timestamp)
+        self.locations.setdefault(entry.digest, entry)
+
+    def load_index(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as infile:
+            data = infile.read()
+        complete = len(data) - len(data) % INDEX_ENTRY.size
+        for fields in INDEX_ENTRY.iter_unpack(data[:complete]):
+            self.add_entry(LogEntry(*fields))
+        if complete != len(data) and not self.readonly:
+            with open(path, "r+b") as outfile:
+                outfile.truncate(complete)  # Entrée écrite à moitié
+
+    def recover(self):
+        """Réindexe les enregistrements écrits après la dernière entrée d'index et coupe une fin tronquée."""
+        records = [entry for entry in self.entries if self.locations[entry.digest] is entry]
+        if records:
+            last = max(records, key=lambda entry: (entry.segment, entry.offset))
+            segment, position = last.segment, last.offset + RECORD_HEADER.size + last.length
+        else:
+            segment, position = 1, 0
+        while os.path.exists(self.segment_path(segment)):
+            path = self.segment_path(segment)
+            with open(path, "rb") as infile:
+                infile.seek(position)
+                data = infile.read()
+            offset = 0
+            while offset + RECORD_HEADER.size <= len(data):
+                timestamp, length, codec, digest = RECORD_HEADER.unpack_from(data, offset)
+                if offset + RECORD_HEADER.size + length > len(data) or codec not in DECOMPRESSORS:
+                    break
+                self.write_index(LogEntry(timestamp, digest, segment, position + offset, length))
+                offset += RECORD_HEADER.size + length
+            if offset != len(data):
+                with open(path, "r+b") as outfile:
+                    outfile.truncate(position + offset)
+            segment, position = segment + 1, 0
+
+    def write_index(self, entry):
+        self.index_file.write(INDEX_ENTRY.pack(*entry))
+        self.index_file.flush()
+        self.add_entry(entry)
+
+    def append(self, body, timestamp=None):
+        """Enregistre un corps brut ; renvoie False s'il est identique au précédent.
+
+        Un horodatage antérieur à la dernière entrée (recul de l'horloge, ajustement NTP) est ramené à
+        celle-ci : l'index reste trié et l'enregistrement n'est pas perdu.
+        """
+        if self.readonly:
+            raise ValueError("Journal ouvert en lecture seule")
+        timestamp = time.time() if timestamp is None else timestamp
+        if self.timestamps and timestamp < self.timestamps[-1]:
+            timestamp = self.timestamps[-1]
+            self.stats.clamped += 1
+        digest = body_digest(body)
+        if self.entries and self.entries[-1].digest == digest:
+            self.stats.unchanged += 1
+            return False
+
+        existing = self.locations.get(digest)
+        if existing is not None:
+            self.stats.deduplicated += 1
+            entry = LogEntry(timestamp, digest, existing.segment, existing.offset, existing.length)
+        else:
+            compressed = COMPRESSORS[self.codec](body)
+            if self.segment_file.tell() > 0 and self.segment_file.tell() + len(compressed) > self.segment_size:
+                self.segment_file.close()
+                self.segment += 1
+                self.segment_file = open(self.segment_path(self.segment), "ab")
+            entry = LogEntry(timestamp, digest, self.segment, self.segment_file.tell(), len(compressed))
+            self.segment_file.write(RECORD_HEADER.pack(timestamp, len(compressed), self.codec, digest))
+            self.segment_file.write(compressed)
+            self.segment_file.flush()  # L'enregistrement précède son entrée d'index
+            self.stats.raw_bytes += len(body)
+            self.stats.stored_bytes += RECORD_HEADER.size + len(compressed)
+        self.write_index(entry)
+        self.stats.stored_bytes += INDEX_ENTRY.size
+        self.stats.appended += 1
+        return True
+
+    def read(self, entry):
+        """Corps brut d'une entrée."""
+        with open(self.segment_path(entry.segment), "rb") as infile:
+            infile.seek(entry.offset)
+            header = infile.read(RECORD_HEADER.size)
+            _, length, codec, digest = RECORD_HEADER.unpack(header)
+            compressed = infile.read(length)
+        if digest != entry.digest or len(compressed) != entry.length:
+            raise ValueError(f"Enregistrement corrompu : segment {entry.segment}, position {entry.offset}")
+        return DECOMPRESSORS[codec](compressed)
+
+    def entry_at(self, timestamp):
+        """Entrée en vigueur à cette date (la dernière enregistrée avant ou à timestamp), ou None."""
+        position = bisect.bisect_right(self.timestamps, timestamp)
+        return self.entries[position - 1] if position else None
+
+    def body_at(self, timestamp):
+        entry = self.entry_at(timestamp)
+        return None if entry is None else self.read(entry)
+
+    def entries_between(self, start=None, end=None):
+        """Entrées dont l'horodatage est dans [start, end], dans l'ordre chronologique."""
+        first = 0 if start is None else bisect.bisect_left(self.timestamps, start)
+        last = len(self.entries) if end is None else bisect.bisect_right(self.timestamps, end)
+        return self.entries[first:last]
+
+    def replay(self, start=None, end=None):
+        """(horodatage, corps brut) de chaque entrée de [start, end]."""
+        for entry in self.entries_between(start, end):
+            yield entry.timestamp, self.read(entry)
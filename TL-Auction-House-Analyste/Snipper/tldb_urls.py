@@ -0,0 +1,28 @@
+"""Adresses de tldb.info et de son CDN d'icônes, partagées par tous les scripts de fetch.
+
+Les variables d'environnement TLDB_URL et TLDB_CDN_URL remplacent les bases par défaut, par exemple pour
+viser le faux serveur local de Benchmarks/stub_server.py sans réseau :
+
+    TLDB_URL=http://127.0.0.1:8000 TLDB_CDN_URL=http://127.0.0.1:8000 python decode.py
+"""
+import os
+
+PRICES_PATH = "/api/ah/prices"
+DATA_PATH = "/auction-house/__data.json"
+ICONS_PATH = "/db/images/ags/v8/128/"
+
+TLDB_URL = os.environ.get("TLDB_URL", "https://tldb.info").rstrip("/")
+CDN_URL = os.environ.get("TLDB_CDN_URL", "https://cdn.tldb.info").rstrip("/")
+
+
+def prices_url(base_url=TLDB_URL):
+    return base_url.rstrip("/") + PRICES_PATH
+
+
+def data_url(base_url=TLDB_URL):
+    return base_url.rstrip("/") + DATA_PATH
+
+
+def icon_url(icon_path, cdn_url=CDN_URL):
+    """URL du PNG 128 px d'une icône ('icon' d'un item de __data.json, déjà en minuscules)."""
+    return cdn_url.rstrip("/") + ICONS_PATH + icon_path + ".png"
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, "..", "Snipper"))
+sys.path.append(os.path.join(BASE_DIR, "..", "Benchmarks"))
+sys.path.append(os.path.join(BASE_DIR, "..", "JsonTraitement"))
+
+from sample_payloads import load_catalog, generate_server_data
+
+
+@pytest.fixture(scope="session")
+def catalog():
+    """Catalogue auction_house_data.json livré avec Snipper"""
+    return load_catalog()
+
+
+@pytest.fixture
+def server_data(catalog):
+    """Snapshot décompressé d'un serveur, généré à partir du catalogue"""
+    return generate_server_data(catalog, seed=42)
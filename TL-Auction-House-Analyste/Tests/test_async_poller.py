@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import pytest
+
+from compress_json import compress
+
+from compressed_json import decompress
+from sample_payloads import generate_data_json, generate_prices_response, generate_server_data, mutate_server_data
+from snapshot_delta import apply_events, counter_groups
+from stub_server import StubTldbServer
+
+pytest.importorskip("aiohttp")
+from async_poller import AsyncPoller  # noqa: E402
+
+
+def prices_body(list_data):
+    return json.dumps({"list": list_data, "total": 0, "regions": {}}, separators=(",", ":")).encode()
+
+
+async def collect(poller, queue, until):
+    """Snapshots reçus jusqu'à ce que until(snapshots) soit vrai, puis arrêt du poller."""
+    snapshots = []
+    while not until(snapshots):
+        snapshots.append(await asyncio.wait_for(queue.get(), timeout=10))
+    poller.stop()
+    return snapshots
+
+
+def test_poller_publishes_changed_servers(catalog):
+    generated = generate_prices_response(catalog, servers=("30001", "30002", "30003"))["list"]
+    list_data = {"30001": generated["30001"], "30002": generated["30002"]}
+    changed_list = {"30001": generated["30001"], "30002": generated["30003"]}
+    changed_body = prices_body(changed_list)
+
+    with StubTldbServer(prices_body(list_data), data_body=json.dumps(generate_data_json(catalog)).encode()) as stub:
+        async def scenario():
+            poller = AsyncPoller(["30001", "30002"], base_url=stub.base_url, prices_interval=0.05,
+                                 data_interval=60)
+            queue = poller.subscribe()
+            task = asyncio.create_task(poller.run())
+            first = await asyncio.wait_for(asyncio.gather(*[queue.get() for _ in range(3)]), timeout=10)
+            await asyncio.sleep(0.2)  # Cycles sans changement : 304, rien de publié
+            assert queue.empty()
+            stub.set_prices(changed_body)
+            second = await collect(poller, queue, lambda snapshots: len(snapshots) == 1)
+            await task
+            assert await queue.get() is None
+            return poller, first, second
+
+        poller, first, second = asyncio.run(scenario())
+
+    by_key = {(snapshot.kind, snapshot.server): snapshot for snapshot in first}
+    assert set(by_key) == {("data", None), ("prices", "30001"), ("prices", "30002")}
+    assert by_key["prices", "30001"].data == decompress(json.loads(list_data["30001"]))
+    assert by_key["data", None].data == catalog
+
+    # Seul le serveur modifié est republié
+    assert [(snapshot.server, snapshot.data) for snapshot in second] == \
+           [("30002", decompress(json.loads(changed_list["30002"])))]
+    assert poller.stats.not_modified > 0
+    assert poller.stats.errors == 0
+    # Une seule ClientSession : au plus une connexion keep-alive par endpoint interrogé en parallèle
+    assert stub.connections <= 2
+
+
+def test_poller_backpressure_and_errors(catalog):
+    body = prices_body(generate_prices_response(catalog, servers=("30001", "30002"), seed=1)["list"])
+
+    with StubTldbServer(body, use_etag=False) as stub:
+        async def scenario():
+            poller = AsyncPoller(["30001", "30002"], base_url=stub.base_url, prices_interval=0.01,
+                                 data_interval=0.01, queue_size=1, timeout=1)
+            queue = poller.subscribe()
+            task = asyncio.create_task(poller.run(duration=0.5))
+            await task  # Personne ne lit : le poller reste bloqué sur la file pleine
+            return poller, queue
+
+        poller, queue = asyncio.run(scenario())
+
+    assert poller.stats.published == 1
+    assert poller.stats.errors > 0  # __data.json absent du stub : 404
+    assert queue.get_nowait() is None  # La fin est signalée même si la file était pleine
+
+
+def test_poller_publishes_deltas(catalog):
+    previous = generate_server_data(catalog, seed=5)
+    current = mutate_server_data(previous, rate=0.05, seed=6)
+
+    with StubTldbServer(prices_body({"30001": json.dumps(compress(previous))})) as stub:
+        async def scenario():
+            poller = AsyncPoller(["30001"], base_url=stub.base_url, prices_interval=0.05, data_interval=None,
+                                 deltas=True)
+            queue = poller.subscribe()
+            task = asyncio.create_task(poller.run())
+            first = [await asyncio.wait_for(queue.get(), timeout=10) for _ in range(2)]
+            stub.set_prices(prices_body({"30001": json.dumps(compress(current))}))
+            second = await collect(poller, queue, lambda snapshots: len(snapshots) == 2)
+            await task
+            return first, second
+
+        first, second = asyncio.run(scenario())
+
+    assert [snapshot.kind for snapshot in first + second] == ["prices", "delta", "prices", "delta"]
+    assert apply_events(counter_groups(previous), second[1].data) == counter_groups(current)
@@ -0,0 +1,57 @@
+import pytest
+
+from buyout_planner import BuyoutPlanner, OrderBook
+from data_processor import evaluate_listings, evaluate_units
+from item_index import ItemIndex
+
+
+def unit_prices(rows):
+    """Une entrée par unité, de la moins chère à la plus chère."""
+    return [p for p, c in sorted(rows, key=lambda row: row[0]) for _ in range(c)]
+
+
+def test_costs_and_budgets_match_unit_by_unit_scan(server_data):
+    for item_data in list(server_data.values())[:40]:
+        rows = [(sale['p'], sale['c']) for sale in item_data['sales']]
+        book, units = OrderBook(rows), unit_prices(rows)
+        assert book.total_units == len(units)
+        for count in range(len(units) + 2):
+            assert book.cost_of(count) == (sum(units[:count]) if count <= len(units) else None)
+        for budget in (0, units[0] - 1, units[0], sum(units) // 3, sum(units) - 1, sum(units), 10 ** 9):
+            affordable = max(count for count in range(len(units) + 1) if sum(units[:count]) <= budget)
+            assert book.units_for(budget) == (affordable, sum(units[:affordable]))
+
+
+def test_profit_follows_unit_depth_model():
+    rows = [(30, 3), (10, 2), (20, 1)]
+    book = OrderBook(rows)
+    _, costs, instant_profits, *_ = evaluate_units(sorted(rows), 10)
+    assert [book.cost_of(units) for units in range(6)] == costs
+    assert [round(book.profit(units), 2) for units in range(1, 6)] == instant_profits[1:]
+    assert book.profit(6) is None and book.next_price(2) == 20
+    assert book.units_for(45) == (3, 40)  # 10 + 10 + 20, la première unité à 30 dépasse
+
+
+def test_planner_finds_groups_by_id_and_name(catalog, server_data):
+    index = ItemIndex(catalog)
+    planner = BuyoutPlanner(server_data, index)
+    item_id, item_data = next(iter(server_data.items()))
+    sales = item_data['sales']
+    trait = str(sales[0]['t']) if 't' in sales[0] else "NULL"
+    book = planner.book(item_id, trait)
+    assert book is planner.book(item_id, trait)  # Construit une seule fois par snapshot
+    assert planner.book_by_name(index.name(item_id), index.trait_name(trait)) is book
+    assert planner.book("0", "NULL") is None
+
+
+def test_depth_in_listings_matches_listing_results(server_data):
+    for item_data in list(server_data.values())[:40]:
+        rows = [(sale['p'], sale['c']) for sale in item_data['sales']]
+        book = OrderBook(rows)
+        depths, costs, *_ = evaluate_listings(sorted(rows, key=lambda row: row[0]), 10)
+        for depth, cost in zip(depths, costs):
+            assert book.cost_of(book.depth_units(depth, "listings")) == cost
+        assert book.depth_units(len(rows) + 1, "listings") is None
+        assert book.depth_units(3, "units") == 3
+    with pytest.raises(ValueError):
+        OrderBook([(10, 1)]).depth_units(1, "stacks")
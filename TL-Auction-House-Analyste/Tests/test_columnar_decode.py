@@ -0,0 +1,58 @@
+import copy
+import json
+
+import pytest
+from compress_json import compress
+
+from compressed_json import columns_from_data, decompress, decompress_columns
+from data_processor import DataProcessor
+from item_index import ItemIndex
+from sample_payloads import generate_prices_response
+
+
+@pytest.fixture
+def mixed_traits():
+    # Trait absent sur la première vente, trait nul, vente sans trait au milieu d'un item à traits
+    return {
+        "1": {"quantity": 6, "sales": [{"p": 10, "c": 1}, {"p": 12, "c": 1, "t": 3}] + [{"p": 9, "c": 2}] * 4},
+        "2": {"quantity": 9, "sales": [{"p": p, "c": 1, "t": 3 if p % 2 else 5} for p in range(20, 29)] +
+                                      [{"p": 7, "c": 1}, {"p": 8, "c": 1, "t": 0}]},
+        "3": {"quantity": 0, "sales": [{"p": 5.5, "c": 1, "t": 4}] * 6},
+    }
+
+
+def test_columns_match_decompressed_payload(catalog):
+    for payload in generate_prices_response(catalog, servers=("30001",), seed=4)["list"].values():
+        compressed = json.loads(payload)
+        assert vars(decompress_columns(compressed)) == vars(columns_from_data(decompress(compressed)))
+
+
+def test_columns_layout(mixed_traits):
+    columns = decompress_columns(compress(mixed_traits))
+    assert vars(columns) == vars(columns_from_data(mixed_traits))
+    assert columns.item[:6] == [1] * 6
+    assert columns.trait[:2] == [None, 3]
+    assert columns.quantity[-1] == 0
+    assert columns.price[-1] == 5.5
+
+
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+def test_processor_accepts_columns(catalog, server_data, mixed_traits, engine):
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    index = ItemIndex(catalog)
+
+    for data in (server_data, mixed_traits):
+        expected = DataProcessor().process_data(copy.deepcopy(data), index, -1000, 10 ** 9, 5, -10 ** 9)
+        columns = decompress_columns(compress(data))
+        assert DataProcessor(engine=engine).process_data(columns, index, -1000, 10 ** 9, 5, -10 ** 9) == expected
+
+
+def test_incremental_accepts_columns(catalog, server_data):
+    index = ItemIndex(catalog)
+    processor = DataProcessor(incremental=True)
+    expected = DataProcessor().process_data(server_data, index, 20, 3000, 3, 10)
+
+    assert processor.process_data(columns_from_data(server_data), index, 20, 3000, 3, 10) == expected
+    assert processor.process_data(decompress_columns(compress(server_data)), index, 20, 3000, 3, 10) == expected
+    assert processor.groups_recomputed == 0
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+from compress_json import compress
+from compress_json import decompress as reference_decompress
+
+from compressed_json import decompress
+from sample_payloads import generate_prices_response
+
+
+def assert_same_decode(compressed):
+    expected = reference_decompress(compressed)
+    decoded = decompress(compressed)
+    assert decoded == expected
+    # Égalité octet par octet de la sérialisation (types int / float, ordre des clés)
+    assert json.dumps(decoded, ensure_ascii=False) == json.dumps(expected, ensure_ascii=False)
+
+
+def test_prices_payloads_match_reference(catalog):
+    response = generate_prices_response(catalog, servers=("30001", "30002"), seed=3)
+    for payload in response["list"].values():
+        assert_same_decode(json.loads(payload))
+
+
+def test_catalog_matches_reference(catalog):
+    # Même format que les items de __data.json
+    assert_same_decode(compress(catalog["items"]))
+
+
+@pytest.mark.parametrize("value", [
+    {"a": 1, "b": -2.5, "c": 1.5e-13, "d": 2 ** 60, "e": -0.001, "f": 123456.789},
+    {"s": ["s|texte", "o|x", "n|1", "b|T", "", "|", "_", "é"], "vide": {}, "liste": [], "rien": None},
+    {"b": [True, False, True], "x": {"x": {"x": "x"}}, "k": ["k"], "n": [0, 0.0, -0, 10, 10.0]},
+    [[1, 2], [1, 2], {"p": 1, "c": 1}, {"p": 1, "c": 1}, {"c": 1, "p": 1}],
+    "racine",
+    42,
+])
+def test_edge_cases_match_reference(value):
+    assert_same_decode(compress(value))
+
+
+def test_shared_sub_objects_decoded_once():
+    data = decompress(compress({"a": {"p": 10, "c": 2}, "b": {"p": 10, "c": 2}}))
+    assert data["a"] is data["b"]
@@ -0,0 +1,48 @@
+import pytest
+
+from data_processor import DataProcessor, evaluate_listings, evaluate_units
+from item_index import ItemIndex
+from sample_payloads import generate_server_data
+
+
+def quadratic_costs(prices, depth):
+    """Ancien calcul : le préfixe est resommé à chaque profondeur."""
+    return [sum(p * c for p, c in prices[:depth_incr]) for depth_incr in range(min(depth, len(prices) - 1) + 1)]
+
+
+def test_listings_match_resummed_prefixes(catalog):
+    data = generate_server_data(catalog, seed=8, max_sales=150)
+    for item_data in list(data.values())[:50]:
+        prices = sorted((sale['p'], sale['c']) for sale in item_data['sales'])
+        depths, costs, *_ = evaluate_listings(prices, 100)
+        assert costs == quadratic_costs(prices, 100)
+        assert depths == list(range(len(costs)))
+
+
+def test_units_buy_partial_listings():
+    prices = [(10, 2), (20, 1), (30, 3)]
+    depths, costs, instant_profits, _, item_prices, sale_prices = evaluate_units(prices, 10)
+    assert depths == [0, 1, 2, 3, 4, 5]  # 6 unités : la dernière sert de prix de revente
+    assert costs == [0, 10, 20, 40, 70, 100]
+    assert item_prices == [10, 10, 20, 30, 30, 30]
+    assert sale_prices == [10, 20, 30, 30, 30, -1]
+    assert instant_profits[3] == round(30 * 0.77 * 3 - 40, 2)
+    assert evaluate_units(prices, 10, max_cost=50)[1] == [0, 10, 20, 40]
+
+
+def test_units_with_single_unit_listings_match_listings(catalog):
+    index = ItemIndex(catalog)
+    data = generate_server_data(catalog, seed=4)
+    for item_data in data.values():
+        for sale in item_data['sales']:
+            sale['c'] = 1
+    for top_k in (None, 10):
+        expected = DataProcessor(top_k=top_k).process_data(data, index, 0, 10 ** 6, 12, 0)
+        assert DataProcessor(depth_unit="units", top_k=top_k).process_data(data, index, 0, 10 ** 6, 12, 0) == expected
+
+
+def test_depth_unit_is_checked():
+    with pytest.raises(ValueError):
+        DataProcessor(depth_unit="stacks")
+    with pytest.raises(ValueError):
+        DataProcessor(engine="numpy", depth_unit="units")
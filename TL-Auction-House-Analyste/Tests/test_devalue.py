@@ -0,0 +1,81 @@
+import array
+import base64
+import math
+
+import pytest
+
+from compressed_json import decompress
+from devalue import unflatten
+from sample_payloads import flatten_devalue, generate_data_json
+
+
+def test_round_trip():
+    value = {"a": [1, 2.5, "x", None, True], "b": {"c": [], "d": {}}, "e": float('inf'), "f": -0.0}
+    result = unflatten(flatten_devalue(value))
+    assert result == value
+    assert math.copysign(1, result["f"]) < 0
+    assert math.isnan(unflatten(flatten_devalue([float('nan')]))[0])
+
+
+def test_data_json_node(catalog):
+    node = generate_data_json(catalog)["nodes"][1]
+    data = unflatten(node["data"])
+    assert data["traits"] == catalog["traits"]
+    assert decompress(data["items"]) == catalog["items"]
+
+
+def test_shared_and_none_values_hydrated_once():
+    # Le conteneur partagé (indice 1) est le même objet ; None est mémorisé comme les autres valeurs
+    result = unflatten([{"a": 1, "b": 1, "n": 3, "m": 3}, [2], "x", None])
+    assert result["a"] is result["b"]
+    assert result["n"] is None and result["m"] is None
+
+
+def test_cycles_and_holes():
+    result = unflatten([[0, -2, 1], "x"])
+    assert result[0] is result
+    assert result[1] is None and result[2] == "x"
+
+
+def test_deep_payload_without_recursion():
+    depth = 100_000
+    values = [[i + 1] for i in range(depth)] + [[]]
+    node = unflatten(values)
+    for _ in range(depth):
+        node = node[0]
+    assert node == []
+
+
+def test_typed_values():
+    raw = array.array('i', [1, -2, 3]).tobytes()
+    encoded = base64.b64encode(raw).decode()
+    result = unflatten([
+        {"i": 1, "buffer": 2, "view": 3, "set": 4, "map": 6, "null": 7, "big": 8, "date": 9},
+        ["Int32Array", encoded],
+        ["ArrayBuffer", encoded],
+        ["Int16Array", 2, 4, 2],
+        ["Set", 5, 5],
+        "v",
+        ["Map", 5, 10],
+        ["null", "clé", 10],
+        ["BigInt", "12345678901234567890"],
+        ["Date", "2024-11-24T17:54:01.994Z"],
+        7,
+    ])
+    assert isinstance(result["i"], array.array) and result["i"].tolist() == [1, -2, 3]
+    assert isinstance(result["buffer"], memoryview) and bytes(result["buffer"]) == raw
+    assert result["view"].tolist() == [-2, -1]  # Octets 4 à 8 du buffer, lus en int16
+    assert result["set"] == {"v"}
+    assert result["map"] == {"v": 7}
+    assert result["null"] == {"clé": 7}
+    assert result["big"] == 12345678901234567890
+    assert result["date"] == "2024-11-24T17:54:01.994Z"
+    assert unflatten([["Point", 1], [2, 2], 4], revivers={"Point": tuple}) == (4, 4)
+
+
+def test_invalid_input():
+    with pytest.raises(ValueError):
+        unflatten([])
+    with pytest.raises(ValueError):
+        unflatten(0)
+    assert unflatten(-1) is None
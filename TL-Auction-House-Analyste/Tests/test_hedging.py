@@ -0,0 +1,117 @@
+import itertools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from hedging import HedgingPolicy, latency_summary, percentile
+from prices_client import PricesClient
+from sample_payloads import generate_prices_response
+from stub_server import StubTldbServer
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        yield pool
+
+
+def sender(delays):
+    """send(timeout) qui répond après chaque délai successif, comme requests (Timeout au-delà de timeout).
+
+    Un délai (secondes, exception) lève l'exception après avoir attendu.
+    """
+    delays = iter(delays)
+
+    def send(timeout):
+        delay, error = next(delays), None
+        if isinstance(delay, tuple):
+            delay, error = delay
+        if delay > timeout:
+            time.sleep(timeout)
+            raise requests.exceptions.Timeout()
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return delay
+    return send
+
+
+def test_percentiles():
+    values = [i / 100 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.5
+    assert percentile(values, 99) == 0.99
+    assert latency_summary(values) == "p50: 500 ms | p95: 950 ms | p99: 990 ms"
+
+
+def test_slow_request_is_hedged(executor):
+    policy = HedgingPolicy(initial_delay=0.05, max_hedge_ratio=1.0)
+    start_time = time.perf_counter()
+    assert policy.call(sender([1.0, 0.01]), executor) == 0.01
+    assert time.perf_counter() - start_time < 0.5
+    assert (policy.hedges, policy.hedge_wins) == (1, 1)
+
+
+def test_fast_request_is_not_hedged(executor):
+    policy = HedgingPolicy(initial_delay=0.2, max_hedge_ratio=1.0)
+    assert policy.call(sender([0.01]), executor) == 0.01
+    assert policy.hedges == 0
+
+
+def test_delay_follows_recent_latencies():
+    policy = HedgingPolicy(percentile=95, min_samples=10, initial_delay=1.0)
+    assert policy.hedge_delay() == 1.0
+    policy.latencies.extend([0.1] * 19 + [0.5])
+    assert policy.hedge_delay() == 0.1
+
+
+def test_hedge_ratio_and_budget(executor):
+    policy = HedgingPolicy(initial_delay=0.01, max_hedge_ratio=0.5, budget=0.2)
+    with pytest.raises(requests.exceptions.Timeout):
+        policy.call(sender([1.0]), executor)  # 1 requête : pas encore de droit à une seconde
+    assert policy.hedges == 0
+    with pytest.raises(requests.exceptions.Timeout):
+        policy.call(sender([1.0, 1.0]), executor)  # Les deux requêtes sont bornées par le budget
+    assert policy.hedges == 1
+
+
+def test_failed_first_request_falls_back_to_hedge(executor):
+    policy = HedgingPolicy(initial_delay=0.01, max_hedge_ratio=1.0)
+    reset = requests.exceptions.ConnectionError("reset")
+    # La première échoue après le départ de la seconde
+    assert policy.call(sender([(0.05, reset), 0.1]), executor) == 0.1
+    with pytest.raises(requests.exceptions.ConnectionError):
+        policy.call(sender([(0, reset)]), executor)  # Erreur avant le délai : pas de seconde requête
+
+
+def test_prices_client_with_hedging(catalog):
+    body = json.dumps(generate_prices_response(catalog, servers=("30001",), seed=0), separators=(",", ":")).encode()
+    delays = itertools.cycle([0.0] * 9 + [1.0])  # Une réponse sur dix est lente
+
+    with StubTldbServer(body, use_etag=False, delay=lambda: next(delays)) as stub:
+        client = PricesClient(url=stub.base_url + "/api/ah/prices",
+                              hedging=HedgingPolicy(initial_delay=0.2, max_hedge_ratio=0.5))
+        timings = []
+        for _ in range(10):
+            start_time = time.perf_counter()
+            client.fetch_body()
+            timings.append(time.perf_counter() - start_time)
+        client.close()
+
+    assert max(timings) < 0.8
+    assert client.hedging.hedge_wins == 1
+    # 11 requêtes HTTP : la seconde requête a ouvert la connexion de son propre thread
+    assert (client.stats.requests, client.stats.hedges) == (10, 1)
+    assert client.stats.connections_reused == 11 - client.stats.connections_opened == 9
+
+
+def test_loser_still_running_blocks_new_hedges(executor):
+    policy = HedgingPolicy(initial_delay=0.01, max_hedge_ratio=1.0)
+    assert policy.call(sender([0.5, 0.02]), executor) == 0.02
+    assert len(policy.losers) == 1  # La première requête tourne encore
+    assert policy.call(sender([0.1]), executor) == 0.1  # Lente, mais pas doublée
+    assert policy.hedges == 1
+    policy.losers[0].result()
+    assert policy.allow_hedge()
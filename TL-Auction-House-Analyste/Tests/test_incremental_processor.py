@@ -0,0 +1,40 @@
+import copy
+
+from data_processor import DataProcessor
+from item_index import ItemIndex
+from sample_payloads import mutate_server_data
+
+
+def test_incremental_matches_full_recompute(catalog, server_data):
+    index = ItemIndex(catalog)
+    incremental = DataProcessor(incremental=True)
+    snapshot = server_data
+
+    for step, depth in enumerate([3, 3, 1, 5, 5]):
+        expected = DataProcessor().process_data(copy.deepcopy(snapshot), index, 20, 3000, depth, 10)
+        assert incremental.process_data(snapshot, index, 20, 3000, depth, 10) == expected
+        snapshot = mutate_server_data(snapshot, rate=0.05, seed=step)
+
+
+def test_incremental_counters(catalog, server_data):
+    index = ItemIndex(catalog)
+    processor = DataProcessor(incremental=True)
+
+    processor.process_data(server_data, index, 20, 3000, 3, 10)
+    total_groups = processor.groups_recomputed
+    assert processor.groups_reused == 0
+
+    processor.process_data(copy.deepcopy(server_data), index, 20, 3000, 3, 10)
+    assert processor.groups_reused == total_groups
+    assert processor.groups_recomputed == 0
+
+    # Une profondeur plus faible réutilise le cache, une plus grande force le recalcul
+    processor.process_data(server_data, index, 20, 3000, 1, 10)
+    assert processor.groups_recomputed == 0
+    processor.process_data(server_data, index, 20, 3000, 4, 10)
+    assert processor.groups_reused == 0
+
+    mutated = mutate_server_data(server_data, rate=0.1, seed=7)
+    processor.process_data(mutated, index, 20, 3000, 4, 10)
+    assert 0 < processor.groups_recomputed < total_groups
+    assert processor.groups_reused > processor.groups_recomputed
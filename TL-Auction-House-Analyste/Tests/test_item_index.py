@@ -0,0 +1,45 @@
+from data_processor import DataProcessor
+from item_index import ItemIndex
+
+
+def resolve_name_by_scan(data_name, item_id):
+    temp_name = item_id
+    for info in data_name['items']:
+        if info['num'] == int(item_id):
+            temp_name = info['name']
+    return temp_name
+
+
+def test_item_index_matches_linear_scan(catalog):
+    index = ItemIndex(catalog)
+
+    for info in catalog['items'][::50]:
+        item_id = str(info['num'])
+        assert index.name(item_id) == resolve_name_by_scan(catalog, item_id)
+        assert index.rarity(item_id) == info['rarity']
+        assert index.icon(item_id) == info['icon']
+        assert index.item_key(item_id) == info['id']
+
+    for trait_id, trait in catalog['traits'].items():
+        assert index.trait_name(trait_id) == trait['name']
+
+
+def test_item_index_unknown_values(catalog):
+    index = ItemIndex(catalog)
+
+    assert index.name("123") == "123"
+    assert index.trait_name("NULL") == "NULL"
+    assert index.trait_name("42") == "42"
+    assert index.rarity("123") is None
+    assert not ItemIndex({})
+
+
+def test_process_data_resolves_names(catalog, server_data):
+    results = DataProcessor().process_data(server_data, ItemIndex(catalog), 20, 3000, 3, 10)
+    names = {info['name'] for info in catalog['items']}
+    traits = {trait['name'] for trait in catalog['traits'].values()} | {"NULL"}
+
+    assert results, "Échec : aucun résultat sur le snapshot généré"
+    for result in results:
+        assert result['Name'] in names
+        assert result['Trait'] in traits
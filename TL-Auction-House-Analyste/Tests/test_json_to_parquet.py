@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from Json_to_parquet import (process_deltas_to_parquet, process_json_to_parquet, print_price_spreads,  # noqa: E402
+                             server_columns)
+from price_spread import SpreadMatrix  # noqa: E402
+from sample_payloads import generate_prices_response  # noqa: E402
+
+SERVERS = ("30001", "30002", "30003")
+
+
+@pytest.fixture
+def snapshot_files(catalog, tmp_path):
+    data_file, price_files = tmp_path / "auction_house_data.json", []
+    data_file.write_text(json.dumps(catalog))
+    for seed in range(2):
+        price_file = tmp_path / f"item_prices_{seed}.json"
+        price_file.write_text(json.dumps(generate_prices_response(catalog, SERVERS, seed=seed)))
+        price_files.append(price_file)
+    return data_file, price_files
+
+
+def gaps(matrix):
+    return sorted((spread['Name'], spread['Trait'], spread['Low Price'], spread['High Price'])
+                  for spread in matrix.top(k=10 ** 6))
+
+
+def test_snapshot_parquet_matches_server_columns(catalog, snapshot_files, tmp_path):
+    data_file, price_files = snapshot_files
+    output_file = tmp_path / "sales_price.parquet"
+    process_json_to_parquet(data_file, price_files[0], output_file)
+
+    frame = pd.read_parquet(output_file)
+    names = {item['num']: item['name'] for item in catalog['items']}
+    list_price = json.loads(price_files[0].read_text())['list']
+    expected = {server: server_columns(payload) for server, payload in list_price.items()}
+    assert list(frame.columns) == ['s_id', 'i_name', 's_q', 's_p', 'i_t']
+    for server, columns in expected.items():
+        rows = frame[frame['s_id'] == server]
+        assert rows['s_p'].tolist() == columns.price and rows['s_q'].tolist() == columns.count
+        assert rows['i_name'].tolist() == [names[item] for item in columns.item]
+        assert rows['i_t'].isna().tolist() == [trait is None for trait in columns.trait]
+
+
+def test_parquet_spreads_match_columns(catalog, snapshot_files, tmp_path):
+    # Noms = identifiants : des items homonymes ne sont pas fusionnés dans la DataFrame
+    data_file, price_files = snapshot_files
+    numbered = dict(catalog, items=[dict(item, name=str(item['num'])) for item in catalog['items']])
+    data_file.write_text(json.dumps(numbered))
+    output_file = tmp_path / "sales_price.parquet"
+    process_json_to_parquet(data_file, price_files[0], output_file)
+
+    list_price = json.loads(price_files[0].read_text())['list']
+    from_columns = SpreadMatrix.from_columns({server: server_columns(payload)
+                                              for server, payload in list_price.items()})
+    from_parquet = print_price_spreads(output_file, top=5)
+    assert from_parquet.servers == list(SERVERS)
+    assert gaps(from_parquet) == gaps(from_columns)
+
+
+def test_delta_parquet_records_changes_only(snapshot_files, tmp_path):
+    _, price_files = snapshot_files
+    output_file = tmp_path / "deltas.parquet"
+    process_deltas_to_parquet(price_files[0], price_files[1], output_file)
+    frame = pd.read_parquet(output_file)
+    assert len(frame) > 0
+    assert set(frame['kind']) <= {"add", "remove", "reprice"}
+    assert frame.loc[frame['kind'] != "reprice", 'prev_p'].isna().all()
+
+    process_deltas_to_parquet(price_files[0], price_files[0], output_file)  # Relevé identique : aucun événement
+    assert len(pd.read_parquet(output_file)) == 0
@@ -0,0 +1,68 @@
+import json
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from data_processor import DataProcessor
+from item_index import ItemIndex
+from multi_server_scan import MultiServerScanner, ScanSettings
+from sample_payloads import generate_prices_response, generate_server_data
+
+SERVERS = ("30001", "30002", "30003")
+
+
+@pytest.fixture(scope="module")
+def prices_body(catalog):
+    return json.dumps(generate_prices_response(catalog, SERVERS, seed=11)).encode()
+
+
+def expected_results(catalog, index, settings):
+    merged = []
+    for offset, server in enumerate(SERVERS):
+        results = DataProcessor().process_data(generate_server_data(catalog, 11 + offset), index,
+                                               settings.percentage_threshold, settings.cost_threshold,
+                                               settings.depth, settings.mini_profit)
+        merged.extend(dict(result, Server=server) for result in results)
+    merged.sort(key=lambda result: result['Instant Profit'], reverse=True)  # Stable : ordre des serveurs
+    return merged
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_scan_merges_every_server(catalog, prices_body, workers):
+    index = ItemIndex(catalog)
+    settings = ScanSettings(20, 3000, 5, 10)
+    with MultiServerScanner(index, workers=workers) as scanner:
+        report = scanner.scan(prices_body, settings)
+        assert report.results == expected_results(catalog, index, settings)
+        assert set(report.timings) == set(SERVERS) and not report.errors
+        assert sum(timing.results for timing in report.timings.values()) == len(report.results)
+        assert report.fits(60) and "Intervalle 60 s : OK" in report.summary(60)
+
+        top = scanner.scan(prices_body, ScanSettings(20, 3000, 5, 10, top_k=5), servers=["30002", "30003"])
+        assert top.results == [result for result in report.results if result['Server'] != "30001"][:5]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_scan_reports_broken_servers(catalog, prices_body, workers):
+    body = json.loads(prices_body)
+    body["list"]["30002"] = "not json"
+    body["list"]["30003"] = json.dumps([{}, "x"])  # Table compress_json mal formée : KeyError au décodage
+    with MultiServerScanner(ItemIndex(catalog), workers=workers) as scanner:
+        report = scanner.scan(json.dumps(body).encode(), ScanSettings(20, 3000, 5, 10))
+    assert sorted(report.errors) == ["30002", "30003"] and set(report.timings) == {"30001"}
+    assert isinstance(report.errors["30003"], KeyError)
+
+
+def test_broken_pool_is_reported_and_replaced(catalog, prices_body):
+    with MultiServerScanner(ItemIndex(catalog), workers=2) as scanner:
+        broken = scanner.executor
+        broken.submit(os._exit, 1)  # Un processus du pool meurt : le pool est cassé
+        with pytest.raises(BrokenProcessPool):
+            broken.submit(time.sleep, 10).result()
+        report = scanner.scan(prices_body, ScanSettings(20, 3000, 5, 10))
+        assert set(report.errors) == set(SERVERS)
+        assert all(isinstance(error, BrokenProcessPool) for error in report.errors.values())
+        assert scanner.executor is not broken
+        assert not scanner.scan(prices_body, ScanSettings(20, 3000, 5, 10)).errors
@@ -0,0 +1,42 @@
+import copy
+
+import pytest
+
+from data_processor import DataProcessor
+from item_index import ItemIndex
+from sample_payloads import generate_server_data
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+@pytest.mark.parametrize("depth", [0, 1, 3, 10])
+@pytest.mark.parametrize("thresholds", [(20, 3000, 10), (-1000, 10 ** 9, -10 ** 9), (50, 500, 100)])
+def test_numpy_engine_matches_python_engine(catalog, seed, depth, thresholds):
+    data = generate_server_data(catalog, seed=seed)
+    index = ItemIndex(catalog)
+    percentage_threshold, cost_threshold, mini_profit = thresholds
+
+    expected = DataProcessor(engine="python").process_data(copy.deepcopy(data), index, percentage_threshold,
+                                                           cost_threshold, depth, mini_profit)
+    results = DataProcessor(engine="numpy").process_data(data, index, percentage_threshold,
+                                                         cost_threshold, depth, mini_profit)
+
+    assert results == expected
+    # Même affichage dans l'arbre : les types (int / float) doivent aussi correspondre
+    assert [{k: type(v) for k, v in r.items()} for r in results] == \
+           [{k: type(v) for k, v in r.items()} for r in expected]
+
+
+def test_numpy_engine_equal_prices_keep_payload_order(catalog):
+    sales = [{'p': 10, 'c': c} for c in (3, 1, 2, 5, 4)] + [{'p': 100, 'c': 1}]
+    data = {str(catalog['items'][0]['num']): {'quantity': 16, 'sales': sales}}
+    index = ItemIndex(catalog)
+
+    expected = DataProcessor().process_data(copy.deepcopy(data), index, -1000, 10 ** 9, 5, -10 ** 9)
+    assert DataProcessor(engine="numpy").process_data(data, index, -1000, 10 ** 9, 5, -10 ** 9) == expected
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        DataProcessor(engine="rust")
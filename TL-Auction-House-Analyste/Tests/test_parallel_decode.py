@@ -0,0 +1,26 @@
+import json
+
+from compressed_json import decompress
+from parallel_decode import decompress_servers
+from sample_payloads import generate_prices_response
+
+
+def test_parallel_matches_serial(catalog):
+    list_data = generate_prices_response(catalog, servers=("30003", "30001", "30002"), seed=2)["list"]
+    list_data["30004"] = "pas du json"
+    list_data["30005"] = json.dumps([{}, "x"])  # Table compress_json mal formée : KeyError
+
+    serial, serial_errors = decompress_servers(list_data)
+    parallel, parallel_errors = decompress_servers(list_data, workers=2)
+
+    assert parallel == serial
+    assert list(parallel) == ["30003", "30001", "30002"]  # Ordre des serveurs de "list"
+    assert parallel["30001"] == decompress(json.loads(list_data["30001"]))
+    assert set(serial_errors) == set(parallel_errors) == {"30004", "30005"}
+
+
+def test_parallel_columns(catalog):
+    list_data = generate_prices_response(catalog, servers=("30001", "30002"), seed=2)["list"]
+    serial, _ = decompress_servers(list_data, columnar=True)
+    parallel, _ = decompress_servers(list_data, workers=2, columnar=True)
+    assert [vars(columns) for columns in parallel.values()] == [vars(columns) for columns in serial.values()]
@@ -0,0 +1,120 @@
+import threading
+import time
+
+from pipeline import FetchProcessPipeline, HandoffSlot
+from poll_scheduler import AdaptivePollScheduler
+
+
+def test_handoff_slot_drops_stale_snapshots():
+    slot = HandoffSlot(capacity=1)
+    slot.put("a")
+    slot.put("b")
+    assert slot.dropped == 1
+    assert slot.take(timeout=0) == "b"
+    assert slot.take(timeout=0) is None
+
+    slot.close()
+    assert slot.take() is None  # Ne bloque plus une fois fermé
+
+
+def run_pipeline(fetch_time, process_time, nb_results, **kwargs):
+    counter = iter(range(10 ** 6))
+    results = []
+    done = threading.Event()
+
+    def fetch():
+        time.sleep(fetch_time)
+        return next(counter)
+
+    def process(snapshot):
+        time.sleep(process_time)
+        return snapshot
+
+    def on_result(result, timings):
+        results.append(result)
+        if len(results) == nb_results:
+            done.set()
+
+    pipeline = FetchProcessPipeline(fetch, process, on_result, **kwargs).start()
+    assert done.wait(10)
+    pipeline.stop(timeout=1)
+    return pipeline.timings, results
+
+
+def test_cycle_is_max_of_stages_not_sum():
+    timings, results = run_pipeline(fetch_time=0.05, process_time=0.05, nb_results=8)
+    assert results == sorted(results)
+    # En série le cycle serait ~100 ms ; les étages se recouvrent
+    assert timings.cycle < 0.085
+    assert timings.fetch > 0.04 and timings.process > 0.04
+
+
+def test_slow_processing_skips_stale_snapshots():
+    timings, results = run_pipeline(fetch_time=0.01, process_time=0.06, nb_results=4)
+    assert timings.dropped > 0
+    assert results == sorted(results) and results[-1] - results[0] > len(results)  # Des snapshots sautés
+
+
+def test_unchanged_and_errors_keep_the_loop_running():
+    events = []
+    calls = iter([None, ValueError("réseau"), "snapshot"] + [None] * 1000)
+    done = threading.Event()
+
+    def fetch():
+        value = next(calls)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def on_result(result, timings):
+        events.append(("result", result))
+        done.set()
+
+    pipeline = FetchProcessPipeline(fetch, lambda snapshot: snapshot.upper(), on_result,
+                                    on_error=lambda stage, error: events.append((stage, str(error))),
+                                    on_unchanged=lambda timings: events.append(("unchanged", None)),
+                                    error_delay=0.01, min_interval=0.01).start()
+    assert done.wait(5)
+    pipeline.stop(timeout=1)
+    assert events[:2] == [("unchanged", None), ("fetch", "réseau")]
+    assert ("result", "SNAPSHOT") in events
+    assert pipeline.timings.errors == 1
+
+
+def test_scheduler_spaces_unchanged_fetches():
+    fetch_times = []
+
+    def fetch():
+        fetch_times.append(time.perf_counter())
+        return None
+
+    scheduler = AdaptivePollScheduler(min_interval=0.05, max_interval=0.2, backoff=2.0)
+    pipeline = FetchProcessPipeline(fetch, lambda snapshot: snapshot, lambda result, timings: None,
+                                    scheduler=scheduler).start()
+    time.sleep(0.5)
+    pipeline.stop(timeout=1)
+    gaps = [later - earlier for earlier, later in zip(fetch_times, fetch_times[1:])]
+    assert 2 <= len(fetch_times) <= 6  # Sans scheduler : une boucle serrée sur l'endpoint
+    assert gaps[0] >= 0.09 and scheduler.interval == 0.2  # Intervalle allongé à chaque fetch sans changement
+
+
+def test_stop_processes_the_last_handed_off_snapshot():
+    snapshots = iter(["premier", "dernier"])
+    processing, results = threading.Event(), []
+
+    def fetch():
+        snapshot = next(snapshots, None)
+        if snapshot == "dernier":
+            assert processing.wait(1)  # "dernier" attend dans le slot pendant le traitement de "premier"
+        return snapshot
+
+    def process(snapshot):
+        processing.set()
+        time.sleep(0.1)
+        return snapshot
+
+    pipeline = FetchProcessPipeline(fetch, process, lambda result, timings: results.append(result)).start()
+    while pipeline.timings.fetched < 2:
+        time.sleep(0.001)
+    pipeline.stop()
+    assert results == ["premier", "dernier"]
@@ -0,0 +1,41 @@
+import pytest
+
+from poll_scheduler import AdaptivePollScheduler
+
+
+def test_single_fetch_in_flight_per_server():
+    scheduler = AdaptivePollScheduler()
+
+    assert scheduler.try_start("30001")
+    assert not scheduler.try_start("30001")  # Fetch lent : les ticks suivants sont sautés
+    assert not scheduler.try_start("30001")
+    assert scheduler.try_start("30002")  # Les autres serveurs ne sont pas bloqués
+    assert scheduler.skipped_ticks == 2
+
+    scheduler.finish("30001", changed=True)
+    assert scheduler.try_start("30001")
+    assert scheduler.in_flight == {"30001", "30002"}
+
+
+def test_interval_backs_off_and_tightens():
+    scheduler = AdaptivePollScheduler(min_interval=0.5, max_interval=4.0, backoff=2.0, tighten=0.5)
+    assert scheduler.interval == 0.5
+
+    for expected in (1.0, 2.0, 4.0, 4.0):  # Données inchangées : on espace jusqu'au plafond
+        scheduler.try_start("30001")
+        assert scheduler.finish("30001", changed=False) == expected
+    assert scheduler.interval_ms == 4000
+
+    for expected in (2.0, 1.0, 0.5, 0.5):  # Les données bougent : on resserre jusqu'au plancher
+        scheduler.try_start("30001")
+        assert scheduler.finish("30001", changed=True) == expected
+
+    assert scheduler.fetches == 8 and scheduler.changes == 4
+    assert 0 < scheduler.change_rate < 1
+    assert "Ticks sautés: 0" in scheduler.summary()
+
+
+def test_invalid_bounds():
+    with pytest.raises(ValueError):
+        AdaptivePollScheduler(min_interval=5, max_interval=1)
+    assert AdaptivePollScheduler(min_interval=1, max_interval=2, initial_interval=10).interval == 2
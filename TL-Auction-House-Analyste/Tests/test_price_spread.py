@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from compressed_json import columns_from_data
+from item_index import ItemIndex
+from multi_server_scan import MultiServerScanner, ScanSettings
+from price_spread import SpreadMatrix
+from sample_payloads import generate_prices_response, generate_server_data
+
+SERVERS = ("30001", "30002", "30003")
+
+
+def reference_spreads(servers_data):
+    """Calcul direct : dict des prix les plus bas par (item, trait), puis écart groupe par groupe."""
+    lowest = {}
+    for server, data in servers_data.items():
+        for item_id, item_data in data.items():
+            for sale in item_data['sales']:
+                asks = lowest.setdefault((int(item_id), sale.get('t')), {})
+                asks[server] = min(asks.get(server, sale['p']), sale['p'])
+    return {key: max(asks.values()) - min(asks.values()) for key, asks in lowest.items() if len(asks) >= 2}
+
+
+def test_matrix_matches_direct_computation(catalog):
+    servers_data = {server: generate_server_data(catalog, seed) for seed, server in enumerate(SERVERS)}
+    matrix = SpreadMatrix.from_columns({server: columns_from_data(data) for server, data in servers_data.items()})
+    expected = reference_spreads(servers_data)
+
+    top = matrix.top(k=len(expected) + 10)
+    assert len(top) == len(expected)
+    assert [spread['Gap'] for spread in top] == sorted(expected.values(), reverse=True)
+    widest = top[0]
+    column = matrix.find(widest['Name'], widest['Trait'])
+    asks = matrix.server_asks(column)
+    assert asks[widest['Low Server']] == widest['Low Price'] == min(asks.values())
+    assert asks[widest['High Server']] == widest['High Price'] == max(asks.values())
+    assert matrix.top(k=5, by="percent")[0]['Gap (%)'] == max(spread['Gap (%)'] for spread in top)
+
+
+def test_single_server_groups_are_not_ranked():
+    matrix = SpreadMatrix.from_columns({
+        "a": columns_from_data({"1": {'sales': [{'p': 10, 'c': 1}, {'p': 8, 'c': 2}]},
+                                "2": {'sales': [{'p': 5, 'c': 1}]}}),
+        "b": columns_from_data({"1": {'sales': [{'p': 20, 'c': 1}]}}),
+    })
+    assert matrix.top() == [{'Name': '1', 'Trait': 'NULL', 'Low Server': 'a', 'Low Price': 8, 'High Server': 'b',
+                             'High Price': 20, 'Gap': 12, 'Gap (%)': 150.0, 'Servers': 2}]
+    assert matrix.top(min_servers=1)[-1]['Gap'] == 0
+    with pytest.raises(ValueError):
+        matrix.top(by="ratio")
+    assert SpreadMatrix.from_columns({"a": columns_from_data({})}).top() == []
+
+
+def test_scan_keeps_lowest_asks_for_the_matrix(catalog):
+    index = ItemIndex(catalog)
+    body = json.dumps(generate_prices_response(catalog, SERVERS, seed=5)).encode()
+    with MultiServerScanner(index, workers=1) as scanner:
+        report = scanner.scan(body, ScanSettings(20, 3000, 5, 10, spreads=True))
+        assert scanner.scan(body, ScanSettings(20, 3000, 5, 10)).spread_matrix() is None
+    matrix = report.spread_matrix()
+    expected = SpreadMatrix.from_body(body)
+    assert matrix.servers == list(SERVERS)
+    assert matrix.top(k=50, item_index=index) == expected.top(k=50, item_index=index)
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+from compress_json import decompress
+
+from prices_client import PricesClient
+from sample_payloads import generate_prices_response
+from stub_server import StubTldbServer
+
+
+@pytest.fixture(scope="module")
+def prices_bodies(catalog):
+    servers = ("30001", "30002")
+    first = json.dumps(generate_prices_response(catalog, servers, seed=0)).encode()
+    second = json.loads(first)
+    second["list"]["30002"] = generate_prices_response(catalog, servers, seed=5)["list"]["30002"]
+    third = json.dumps(generate_prices_response(catalog, servers, seed=9)).encode()
+    return first, json.dumps(second).encode(), third
+
+
+@pytest.mark.parametrize("use_etag", [True, False])
+def test_prices_client_skips_unchanged_payloads(prices_bodies, use_etag):
+    first, other_server_changed, third = prices_bodies
+
+    with StubTldbServer(first, use_etag=use_etag) as stub:
+        client = PricesClient(stub.base_url + "/api/ah/prices")
+
+        data = client.fetch_server("30001")
+        assert data == decompress(json.loads(json.loads(first)["list"]["30001"]))
+
+        assert client.fetch_server("30001") is None
+        if use_etag:
+            assert client.stats.not_modified == 1
+        else:
+            assert client.stats.unchanged_body == 1
+
+        stub.set_prices(other_server_changed)
+        assert client.fetch_server("30001") is None
+        assert client.stats.unchanged_server == 1
+
+        stub.set_prices(third)
+        assert client.fetch_server("30001") is not None
+        assert client.stats.decoded == 2
+        assert client.stats.skipped == 2
+
+        # Une seule connexion TCP pour les quatre requêtes
+        assert client.stats.requests == 4
+        assert client.stats.connections_opened == 1
+        assert client.stats.connections_reused == 3
+        assert stub.connections == 1
+        client.close()
+
+
+@pytest.mark.parametrize("use_etag", [True, False])
+def test_failed_decode_is_retried(prices_bodies, use_etag):
+    first = prices_bodies[0]
+    broken = json.loads(first)
+    broken["list"]["30001"] = "not json"
+
+    with StubTldbServer(json.dumps(broken).encode(), use_etag=use_etag) as stub:
+        client = PricesClient(stub.base_url + "/api/ah/prices")
+        for _ in range(2):  # Corps identique : relu et de nouveau en erreur, pas "inchangé"
+            with pytest.raises(ValueError):
+                client.fetch_server("30001")
+        with pytest.raises(KeyError):
+            client.fetch_server("30003")
+        assert client.stats.skipped == 0
+
+        stub.set_prices(first)
+        assert client.fetch_server("30001") == decompress(json.loads(json.loads(first)["list"]["30001"]))
+        assert client.fetch_server("30001") is None
+        client.close()
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from prices_parser import extract_server_payload, extract_server_payloads, iter_list_entries
+
+
+@pytest.fixture
+def tricky_body():
+    list_data = {
+        "30001": json.dumps([["a", "b\",", "c\"}", "\\", "d\\\",\""], "0"]),
+        "30002": 'fin en backslash \\',
+        "30003": '","}{"list":{"30001":"piège"}}',
+        "30004": "",
+    }
+    return json.dumps({"list": list_data, "total": 4, "regions": {"30001": "eu"}}, separators=(",", ":"))
+
+
+def test_extract_matches_full_parse(tricky_body):
+    expected = json.loads(tricky_body)["list"]
+
+    assert extract_server_payloads(tricky_body) == expected
+    for server in expected:
+        assert extract_server_payload(tricky_body.encode(), server) == expected[server]
+    assert extract_server_payloads(tricky_body, ["30004", "30002"]) == {"30004": "", "30002": expected["30002"]}
+
+
+def test_list_entries_without_fallback(tricky_body):
+    body = tricky_body.encode()
+    expected = json.loads(body)["list"]
+
+    entries = {server: json.loads(body[start:end]) for server, start, end in iter_list_entries(body)}
+    assert entries == expected
+
+    # "list" en dernière clé, après un objet contenant les mêmes identifiants
+    reordered = json.dumps({"regions": {"30001": "eu"}, "list": expected}, separators=(",", ":")).encode()
+    assert {server: json.loads(reordered[start:end])
+            for server, start, end in iter_list_entries(reordered)} == expected
+
+
+def test_extract_falls_back_on_unusual_layout(tricky_body):
+    indented = json.dumps(json.loads(tricky_body), indent=2)
+
+    assert extract_server_payloads(indented) == json.loads(tricky_body)["list"]
+
+
+def test_extract_unknown_server(tricky_body):
+    with pytest.raises(KeyError):
+        extract_server_payload(tricky_body, "99999")
@@ -0,0 +1,77 @@
+import json
+import threading
+import time
+
+import pytest
+
+from compressed_json import decompress
+from data_processor import DataProcessor
+from item_index import ItemIndex
+from pipeline import FetchProcessPipeline
+from replay import ReplayClient, ReplayFinished
+from sample_payloads import generate_prices_response
+from snapshot_log import SnapshotLog
+
+
+@pytest.fixture
+def recorded(tmp_path, catalog):
+    """Trois relevés à 1 s d'intervalle ; 30001 ne change pas au deuxième."""
+    generated = generate_prices_response(catalog, servers=("30001", "30002", "30003"))["list"]
+    lists = [{"30001": generated["30001"], "30002": generated["30002"]},
+             {"30001": generated["30001"], "30002": generated["30003"]},
+             {"30001": generated["30002"], "30002": generated["30003"]}]
+    with SnapshotLog(tmp_path) as log:
+        for timestamp, list_data in enumerate(lists):
+            log.append(json.dumps({"list": list_data}).encode(), timestamp=1000.0 + timestamp)
+    return tmp_path, lists
+
+
+def test_replay_as_fast_as_possible(recorded):
+    directory, lists = recorded
+    client = ReplayClient(SnapshotLog(directory, readonly=True), speed=None)
+    assert client.fetch_server("30001") == decompress(json.loads(lists[0]["30001"]))
+    assert client.fetch_server("30001") is None
+    assert client.fetch_server("30001") == decompress(json.loads(lists[2]["30001"]))
+    with pytest.raises(ReplayFinished):
+        client.fetch_server("30001")
+    assert (client.stats.snapshots, client.stats.decoded, client.stats.unchanged) == (3, 2, 1)
+    assert client.stats.elapsed < 1.0
+    client.close()
+
+
+def test_replay_speed_and_loop(recorded):
+    directory, _ = recorded
+    client = ReplayClient(SnapshotLog(directory, readonly=True), speed=20.0, loop=True)
+    start_time = time.perf_counter()
+    for _ in range(4):
+        client.fetch_server("30002")
+    assert time.perf_counter() - start_time >= 2 / 20  # Deux intervalles de 1 s rejoués à 20×
+    assert client.stats.snapshots == 4
+    client.close()
+
+    with pytest.raises(ValueError):
+        ReplayClient(SnapshotLog(directory, readonly=True), start=5000.0)
+
+
+def test_replay_drives_pipeline(recorded, catalog):
+    directory, _ = recorded
+    client = ReplayClient(SnapshotLog(directory, readonly=True), speed=None, columnar=True)
+    processor, index = DataProcessor(), ItemIndex(catalog)
+    results, finished = [], threading.Event()
+
+    def on_error(stage, error):
+        assert isinstance(error, ReplayFinished), error
+        finished.set()
+
+    pipeline = FetchProcessPipeline(lambda: client.fetch_server("30001"),
+                                    lambda data: processor.process_data(data, index, 20, 3000, 5, 10),
+                                    lambda result, timings: results.append(result), on_error=on_error,
+                                    slot_capacity=4)
+    pipeline.start()
+    assert finished.wait(30)
+    deadline = time.monotonic() + 30
+    while len(results) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)  # Dernier snapshot en cours de traitement
+    pipeline.stop(timeout=5)
+    assert len(results) == 2 and pipeline.timings.unchanged == 1
+    client.close()
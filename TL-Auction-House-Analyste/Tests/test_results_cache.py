@@ -0,0 +1,30 @@
+import copy
+
+import pytest
+
+from data_processor import DataProcessor
+from item_index import ItemIndex
+
+
+@pytest.mark.parametrize("engine,incremental", [("python", False), ("python", True), ("numpy", False)])
+def test_refilter_matches_full_analysis(catalog, server_data, engine, incremental):
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    index = ItemIndex(catalog)
+    processor = DataProcessor(engine=engine, incremental=incremental)
+    processor.process_data(server_data, index, 20, 3000, 5, 10)
+
+    for percentage_threshold, cost_threshold, depth, mini_profit in [(20, 3000, 5, 10), (0, 500, 2, 0),
+                                                                     (50, 10 ** 6, 5, 200), (20, 3000, 0, 10)]:
+        expected = DataProcessor().process_data(copy.deepcopy(server_data), index, percentage_threshold,
+                                                cost_threshold, depth, mini_profit)
+        assert processor.refilter(percentage_threshold, cost_threshold, depth, mini_profit) == expected
+
+
+def test_refilter_needs_analysis_for_deeper_depth(catalog, server_data):
+    processor = DataProcessor()
+    assert processor.refilter(20, 3000, 1, 10) is None
+
+    processor.process_data(server_data, ItemIndex(catalog), 20, 3000, 2, 10)
+    assert processor.results_cache.covers(2)
+    assert processor.refilter(20, 3000, 3, 10) is None
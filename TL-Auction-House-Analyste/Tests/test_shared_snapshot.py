@@ -0,0 +1,113 @@
+import itertools
+import multiprocessing
+import os
+
+import pytest
+
+from compressed_json import columns_from_data
+from data_processor import DataProcessor
+from item_index import ItemIndex
+from sample_payloads import generate_server_data
+
+np = pytest.importorskip("numpy")
+from shared_snapshot import SharedSnapshotReader, SharedSnapshotWriter, StaleSnapshotError  # noqa: E402
+
+_servers = itertools.count()
+
+
+@pytest.fixture
+def writer():
+    writer = SharedSnapshotWriter(f"test{os.getpid()}_{next(_servers)}", capacity=1 << 16)
+    yield writer
+    writer.close()
+
+
+def read_price_sum(server):
+    """Lecture depuis un autre processus."""
+    reader = SharedSnapshotReader(server)
+    view = reader.read()
+    result = (view.generation, int(view.price.sum()), len(view))
+    del view
+    reader.close()
+    return result
+
+
+def test_reader_maps_published_columns(writer, server_data):
+    reader = SharedSnapshotReader(writer.server)
+    assert reader.read() is None
+    assert writer.publish(server_data, fetched_at=123.0) == 1
+
+    view = reader.read()
+    expected = columns_from_data(server_data)
+    assert view.generation == 1 and view.fetched_at == 123.0
+    assert view.price.base is not None  # Vue sur le bloc partagé, pas une copie
+    assert view.item.tolist() == expected.item and view.price.tolist() == expected.price
+    assert vars(view.to_columns()) == vars(expected)
+    assert reader.wait_for_new(timeout=0.05) is None  # Pas de nouvelle génération
+    del view
+    reader.close()
+
+
+def test_views_become_stale_two_generations_later(writer, catalog):
+    reader = SharedSnapshotReader(writer.server)
+    writer.publish(generate_server_data(catalog, seed=1))
+    view = reader.read()
+    writer.publish(generate_server_data(catalog, seed=2))
+    assert view.is_valid()  # Seul l'autre emplacement a été écrit
+    assert reader.wait_for_new(timeout=1).generation == 2
+    writer.publish(generate_server_data(catalog, seed=3))
+    assert not view.is_valid()
+    with pytest.raises(StaleSnapshotError):
+        view.to_columns()
+    del view
+    reader.close()
+
+
+def test_engines_read_views(writer, catalog, server_data):
+    index = ItemIndex(catalog)
+    writer.publish(server_data)
+    reader = SharedSnapshotReader(writer.server)
+    view = reader.read()
+
+    expected = DataProcessor().process_data(server_data, index, 20, 3000, 5, 10)
+    assert DataProcessor(engine="numpy").process_data(view, index, 20, 3000, 5, 10) == expected
+    assert DataProcessor(incremental=True).process_data(view, index, 20, 3000, 5, 10) == expected
+    del view
+    reader.close()
+
+
+def test_other_process_reads_without_unlinking(writer, server_data):
+    writer.publish(server_data)
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        generation, price_sum, rows = pool.apply(read_price_sum, (writer.server,))
+    assert (generation, rows) == (1, len(columns_from_data(server_data)))
+    assert price_sum == sum(sale['p'] for item in server_data.values() for sale in item['sales'])
+    # Le bloc existe toujours après la sortie du lecteur
+    assert read_price_sum(writer.server)[0] == 1
+
+
+def test_capacity_and_prices_are_checked(catalog):
+    writer = SharedSnapshotWriter(f"test{os.getpid()}_{next(_servers)}", capacity=10)
+    try:
+        with pytest.raises(ValueError):
+            writer.publish(generate_server_data(catalog))
+        with pytest.raises(ValueError):
+            writer.publish({"1": {"quantity": 1, "sales": [{"p": 1.5, "c": 1}]}})
+    finally:
+        writer.close()
+
+
+def test_reader_stats_track_generations(writer, catalog):
+    reader = SharedSnapshotReader(writer.server)
+    assert reader.wait_for_new(timeout=0.01) is None
+    writer.publish(generate_server_data(catalog, seed=0))
+    reader.read()
+    for seed in (1, 2):
+        writer.publish(generate_server_data(catalog, seed=seed))
+    reader.wait_for_new(timeout=1)  # Génération 3 : la génération 2 n'a jamais été lue
+    writer.publish(generate_server_data(catalog, seed=3))
+    reader.read()
+    stats = reader.stats
+    assert (stats.generation, stats.reads, stats.skipped, stats.timeouts) == (4, 3, 1, 1)
+    assert stats.summary().startswith("Mémoire partagée: génération 4 | Lectures: 3 (sautées: 1")
+    reader.close()
@@ -0,0 +1,135 @@
+import asyncio
+import inspect
+import json
+import os
+import socket
+import threading
+
+import pytest
+
+from compressed_json import columns_from_data, decompress
+from sample_payloads import generate_prices_response, generate_server_data
+from stub_server import StubTldbServer
+
+pytest.importorskip("aiohttp")
+from async_poller import AsyncPoller  # noqa: E402
+from async_poller import Snapshot  # noqa: E402
+from snapshot_daemon import (SnapshotClient, SnapshotDaemon, encode_frame, parse_args, run_daemon,  # noqa: E402
+                             snapshot_from_json, snapshot_to_json)
+from snapshot_delta import DeltaEvent  # noqa: E402
+
+
+class DaemonThread:
+    """Démon servi dans sa propre boucle asyncio, dans un thread."""
+
+    def __init__(self, poller, address):
+        self.poller = poller
+        self.daemon = SnapshotDaemon(poller, address)
+        self.started = threading.Event()
+        self.loop = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        async def serve():
+            self.loop = asyncio.get_running_loop()
+            serve_task = asyncio.create_task(self.daemon.serve())
+            while self.daemon.ready is None or not self.daemon.ready.is_set():
+                await asyncio.sleep(0.01)
+            self.started.set()
+            await serve_task
+        asyncio.run(serve())
+
+    def __enter__(self):
+        self.thread.start()
+        assert self.started.wait(10)
+        return self.daemon
+
+    def __exit__(self, *exc_info):
+        self.loop.call_soon_threadsafe(self.poller.stop)
+        self.thread.join(10)
+
+
+@pytest.fixture
+def address(tmp_path):
+    if hasattr(socket, "AF_UNIX"):
+        return str(tmp_path / "snapshots.sock")
+    return "127.0.0.1:0"
+
+
+def test_clients_share_one_fetch(catalog, address):
+    list_data = generate_prices_response(catalog, servers=("30001", "30002"))["list"]
+    body = json.dumps({"list": list_data}, separators=(",", ":")).encode()
+
+    with StubTldbServer(body) as stub:
+        poller = AsyncPoller(["30001", "30002"], base_url=stub.base_url, prices_interval=0.05, data_interval=None)
+        with DaemonThread(poller, address) as daemon:
+            clients = [SnapshotClient(daemon.address, servers=["30001"]) for _ in range(3)]
+            everything = SnapshotClient(daemon.address)
+            results = [client.fetch_server("30001", timeout=10) for client in clients]
+            received = {everything.receive(timeout=10).server for _ in range(2)}
+            assert clients[0].fetch_server("30001", timeout=0.2) is None  # Rien de nouveau
+
+    expected = decompress(json.loads(list_data["30001"]))
+    assert all(result == expected for result in results)
+    assert received == {"30001", "30002"}
+    assert poller.stats.published == 2  # Un décodage par serveur, quel que soit le nombre de clients
+    assert stub.requests_by_path["/api/ah/prices"] >= 1
+    assert clients[0].receive(timeout=1) is None and clients[0].closed  # Fin de flux à l'arrêt du démon
+    if isinstance(daemon.address, str):
+        assert not os.path.exists(daemon.address)
+    for client in clients + [everything]:
+        client.close()
+
+
+def test_client_requesting_new_server_is_added(catalog, address):
+    list_data = generate_prices_response(catalog, servers=("30001", "30002"))["list"]
+    body = json.dumps({"list": list_data}, separators=(",", ":")).encode()
+
+    with StubTldbServer(body) as stub:
+        poller = AsyncPoller(["30001"], base_url=stub.base_url, prices_interval=0.05, data_interval=None)
+        with DaemonThread(poller, address) as daemon:
+            with SnapshotClient(daemon.address, servers=["30002"]) as client:
+                data = client.fetch_server("30002", timeout=10)
+
+    assert data == decompress(json.loads(list_data["30002"]))
+    assert "30002" in poller.servers
+
+
+def test_command_line_matches_run_daemon():
+    args = parse_args(["--deltas", "--shared", "30001"], environ={"SNAPSHOT_LOG": "prices_log"})
+    inspect.signature(run_daemon).bind(**args)  # TypeError si la ligne de commande passe un argument inconnu
+    assert args["servers"] == ["30001"] and args["deltas"] and args["shared_memory"]
+    assert args["log_dir"] == "prices_log"
+
+
+def test_frames_are_json_not_pickles(catalog):
+    data = generate_server_data(catalog, max_sales=3)
+    columns = columns_from_data(data)
+    events = [DeltaEvent("reprice", "30001", "1", "NULL", 120, 2, previous_price=100)]
+    for snapshot in (Snapshot("prices", "30001", data, 1.0, 0.1), Snapshot("delta", "30001", events, 1.0, 0.1)):
+        assert snapshot_from_json(json.loads(encode_frame(snapshot)[4:])) == snapshot
+    decoded = snapshot_from_json(snapshot_to_json(Snapshot("prices", "30001", columns, 1.0, 0.1))).data
+    assert (decoded.item, decoded.trait, decoded.price) == (columns.item, columns.trait, columns.price)
+    assert json.loads(encode_frame(None)[4:]) is None
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="socket Unix uniquement")
+def test_daemon_does_not_take_over_a_running_one(tmp_path):
+    address = str(tmp_path / "snapshots.sock")
+    with StubTldbServer(b'{"list": {}}') as stub:
+        poller = AsyncPoller([], base_url=stub.base_url, prices_interval=0.05, data_interval=None)
+        with DaemonThread(poller, address):
+            assert os.stat(address).st_mode & 0o777 == 0o600
+            with pytest.raises(OSError):
+                asyncio.run(SnapshotDaemon(poller, address).start_server())
+            assert os.path.exists(address)  # Le socket du démon en marche n'a pas été supprimé
+
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(address)  # Socket abandonné : plus personne n'écoute
+    stale.close()
+    daemon = SnapshotDaemon(poller, address)
+
+    async def start_and_close():
+        await daemon.start_server()
+        daemon.server.close()
+    asyncio.run(start_and_close())
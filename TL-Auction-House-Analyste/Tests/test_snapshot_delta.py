@@ -0,0 +1,48 @@
+from compressed_json import columns_from_data
+from sample_payloads import generate_server_data, mutate_server_data
+from snapshot_delta import ADD, REMOVE, REPRICE, DeltaEvent, SnapshotDiffer, apply_events, counter_groups
+
+
+def test_identical_snapshot_has_no_events(server_data):
+    differ = SnapshotDiffer()
+    first = differ.diff("30001", server_data)
+    assert {event.kind for event in first} == {ADD}
+    assert sum(event.listings for event in first) == sum(len(item['sales']) for item in server_data.values())
+
+    assert differ.diff("30001", server_data) == []
+    assert differ.stats.groups_changed == len(counter_groups(server_data))
+    assert differ.stats.groups_unchanged == len(counter_groups(server_data))
+
+
+def test_events_rebuild_next_snapshot(catalog):
+    previous = generate_server_data(catalog, seed=3)
+    current = mutate_server_data(previous, rate=0.1, seed=4)
+
+    differ = SnapshotDiffer()
+    differ.diff("30001", previous)
+    events = differ.diff("30001", current)
+    assert 0 < len(events) < sum(len(item['sales']) for item in current.values()) // 10
+    assert apply_events(counter_groups(previous), events) == counter_groups(current)
+
+    # Même résultat depuis les colonnes décompressées
+    column_differ = SnapshotDiffer()
+    column_differ.diff("30001", columns_from_data(previous))
+    assert column_differ.diff("30001", columns_from_data(current)) == events
+
+
+def test_reprice_pairs_listings_of_same_count():
+    before = {"1": {"quantity": 4, "sales": [{"p": 100, "c": 1}, {"p": 200, "c": 2}, {"p": 300, "c": 1}]},
+              "2": {"quantity": 1, "sales": [{"p": 5, "c": 1, "t": 7}]}}
+    after = {"1": {"quantity": 5, "sales": [{"p": 90, "c": 1}, {"p": 200, "c": 2}, {"p": 300, "c": 1},
+                                            {"p": 300, "c": 1}, {"p": 250, "c": 5}]}}
+    differ = SnapshotDiffer()
+    differ.diff("30001", before)
+    events = differ.diff("30001", after)
+
+    assert set(events) == {
+        DeltaEvent(REPRICE, "30001", "1", "NULL", 90, 1, previous_price=100),
+        DeltaEvent(ADD, "30001", "1", "NULL", 300, 1),
+        DeltaEvent(ADD, "30001", "1", "NULL", 250, 5),
+        DeltaEvent(REMOVE, "30001", "2", "7", 5, 1),
+    }
+    assert differ.stats.summary().startswith("Deltas: +")
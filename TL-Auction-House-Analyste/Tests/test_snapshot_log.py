@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from snapshot_log import INDEX_ENTRY, SnapshotLog
+
+
+def bodies(count):
+    return [b'{"list": {"30001": "%d"}, "total": 0}' % number * 50 for number in range(count)]
+
+
+def test_append_skips_unchanged_and_deduplicates(tmp_path):
+    a, b = bodies(2)
+    with SnapshotLog(tmp_path) as log:
+        assert log.append(a, timestamp=10.0)
+        assert not log.append(a, timestamp=11.0)  # Identique au précédent
+        assert log.append(b, timestamp=12.0)
+        assert log.append(a, timestamp=13.0)  # Déjà vu : entrée d'index seule
+        assert len(log) == 3
+        assert log.stats.unchanged == 1 and log.stats.deduplicated == 1
+        assert log.entries[2].offset == log.entries[0].offset
+
+        assert log.entry_at(9.9) is None
+        assert log.body_at(10.0) == a
+        assert log.body_at(12.5) == b
+        assert log.body_at(1e12) == a
+        assert [timestamp for timestamp, _ in log.replay(11.0, 13.0)] == [12.0, 13.0]
+        assert log.stats.raw_bytes == len(a) + len(b)  # Corps inchangé ou dédupliqué : rien d'écrit
+
+        assert log.append(b, timestamp=5.0)  # Horloge reculée : ramené à la dernière entrée
+        assert log.entries[-1].timestamp == 13.0 and log.stats.clamped == 1
+        assert log.body_at(13.0) == b
+    assert os.path.getsize(tmp_path / "segment-000001.log") < len(a) + len(b)  # Compressé
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_reopen_rotates_segments_and_reads_back(tmp_path, codec):
+    payloads = bodies(20)
+    with SnapshotLog(tmp_path, codec=codec, segment_size=200) as log:
+        for timestamp, body in enumerate(payloads):
+            log.append(body, timestamp=float(timestamp))
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("segment-")]) > 1
+
+    with SnapshotLog(tmp_path, readonly=True) as log:
+        assert [body for _, body in log.replay()] == payloads
+        with pytest.raises(ValueError):
+            log.append(b"x")
+
+
+def test_recovers_unindexed_records_and_truncated_tail(tmp_path):
+    payloads = bodies(3)
+    with SnapshotLog(tmp_path) as log:
+        for timestamp, body in enumerate(payloads):
+            log.append(body, timestamp=float(timestamp))
+    index_path, segment_path = tmp_path / "index.bin", tmp_path / "segment-000001.log"
+    # Arrêt brutal : dernière entrée d'index à moitié écrite, enregistrement suivant tronqué
+    with open(index_path, "r+b") as index_file:
+        index_file.truncate(2 * INDEX_ENTRY.size + 5)
+    segment_size = os.path.getsize(segment_path)
+    with open(segment_path, "ab") as segment_file:
+        segment_file.write(b"\x00" * 10)
+
+    with SnapshotLog(tmp_path) as log:
+        assert [body for _, body in log.replay()] == payloads
+        assert os.path.getsize(segment_path) == segment_size
+        assert log.append(b"nouveau", timestamp=10.0)
+    with SnapshotLog(tmp_path, readonly=True) as log:
+        assert log.body_at(10.0) == b"nouveau" and len(log) == 4
@@ -0,0 +1,56 @@
+import json
+import time
+
+import requests
+
+from compressed_json import decompress
+from prices_client import PricesClient
+from sample_payloads import generate_prices_response
+from stub_server import StubTldbServer, mutate_prices_body
+from tldb_urls import data_url, icon_url, prices_url
+
+
+def test_urls_follow_base():
+    assert prices_url("http://127.0.0.1:8000/") == "http://127.0.0.1:8000/api/ah/prices"
+    assert data_url("http://127.0.0.1:8000") == "http://127.0.0.1:8000/auction-house/__data.json"
+    assert (icon_url("icons/weapon/sword_01", "http://cdn")
+            == "http://cdn/db/images/ags/v8/128/icons/weapon/sword_01.png")
+
+
+def test_icons_from_directory_or_placeholder(tmp_path):
+    (tmp_path / "sword_01.png").write_bytes(b"\x89PNG fake")
+    with StubTldbServer() as stub:
+        response = requests.get(icon_url("icons/weapon/sword_01", stub.base_url))
+        assert response.status_code == 200 and response.headers["Content-Type"] == "image/png"
+        assert response.content.startswith(b"\x89PNG\r\n\x1a\n")  # PNG 1×1 généré
+    with StubTldbServer(icons_dir=str(tmp_path)) as stub:
+        assert requests.get(icon_url("icons/weapon/sword_01", stub.base_url)).content == b"\x89PNG fake"
+        assert requests.get(icon_url("icons/weapon/missing", stub.base_url)).status_code == 404
+
+
+def test_errors_and_bandwidth_are_simulated():
+    body = b"x" * 20000
+    with StubTldbServer(body, error_rate=1.0) as stub:
+        assert requests.get(prices_url(stub.base_url)).status_code == 503
+        assert stub.errors == 1
+    with StubTldbServer(body, bandwidth=100000) as stub:
+        start_time = time.perf_counter()
+        assert requests.get(prices_url(stub.base_url)).content == body
+        assert time.perf_counter() - start_time >= 0.19  # 20 ko à 100 ko/s
+        assert stub.bytes_sent == len(body)
+
+
+def test_mutated_prices_rotate(catalog):
+    body = json.dumps(generate_prices_response(catalog, servers=("30001",))).encode()
+    mutated = mutate_prices_body(body, rate=0.5, seed=1)
+    before, after = (decompress(json.loads(json.loads(raw)["list"]["30001"])) for raw in (body, mutated))
+    assert before.keys() == after.keys() and before != after
+
+    with StubTldbServer(body) as stub:
+        stub.set_prices_history([body, mutated], interval=1.0)
+        client = PricesClient(prices_url(stub.base_url))
+        assert client.fetch_server("30001") == before
+        assert client.fetch_server("30001") is None
+        time.sleep(max(0.0, stub.history_started + 1.0 - time.monotonic()))
+        assert client.fetch_server("30001") == after
+        client.close()
@@ -0,0 +1,35 @@
+import pytest
+
+from data_processor import DataProcessor
+from item_index import ItemIndex
+from results_cache import TopResults
+from sample_payloads import generate_server_data
+
+
+@pytest.mark.parametrize("engine,incremental", [("python", False), ("python", True), ("numpy", False)])
+@pytest.mark.parametrize("thresholds", [(20, 3000, 5, 10), (0, 10 ** 6, 10, 0), (50, 500, 3, 100)])
+@pytest.mark.parametrize("k", [1, 7, 100000])
+def test_top_k_matches_head_of_full_results(catalog, engine, incremental, thresholds, k):
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    index = ItemIndex(catalog)
+    data = generate_server_data(catalog, seed=3)
+    expected = DataProcessor().process_data(data, index, *thresholds)[:k]
+
+    processor = DataProcessor(engine=engine, incremental=incremental, top_k=k)
+    assert processor.process_data(data, index, *thresholds) == expected
+    assert processor.results_cache is None
+    if incremental:  # Second passage depuis le cache des groupes
+        assert processor.process_data(data, index, *thresholds) == expected
+        assert processor.groups_recomputed == 0
+
+
+def test_equal_profits_keep_generation_order():
+    top = TopResults(2)
+    built = []
+    for number, profit in enumerate([5, 9, 5, 9, 1]):
+        top.push(profit, lambda: built.append(number) or number)
+    assert top.results() == [1, 3]
+    assert built == [0, 1, 3]  # Les lignes refusées ne sont jamais construites
+    with pytest.raises(ValueError):
+        TopResults(0)
@@ -1,11 +1,16 @@
 import json
 import os
+import sys
 import requests
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Snipper"))
+from tldb_urls import CDN_URL, icon_url
+
 with open('data.json', 'r') as file:
     data = json.load(file)
 
-base_url = "https://cdn.tldb.info/db/images/ags/v8/128/"
+# Base du CDN (variable d'environnement TLDB_CDN_URL) : http://127.0.0.1:8000 pour Benchmarks/stub_server.py
+cdn_url = CDN_URL
 
 save_dir = "icons"
 os.makedirs(save_dir, exist_ok=True)
@@ -35,7 +40,7 @@ downloaded_files = set()
 for item in data["items"]:
     icon_path = item["icon"].lower()
     image_name = icon_path.split('/')[-1]
-    full_url = base_url + icon_path + ".png" 
+    full_url = icon_url(icon_path, cdn_url)
     filepath = os.path.join(save_dir, f"{image_name}.png")
     
     if image_name not in downloaded_files: